@@ -1,52 +1,318 @@
+import io
 import os
+import json
+import asyncio
+import uuid
+import mmap
+import queue
 import logging
-from azure.storage.blob import BlobServiceClient
+import functools
+import threading
+from azure.core.exceptions import ResourceExistsError
+from azure.storage.blob import BlobBlock, BlobServiceClient, ContainerClient
 from config import AZURE_STORAGE_CONNECTION_STRING
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib json module
+    orjson = None
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+# Transfer tuning: legal documents are frequently tens of MB, so use larger
+# range GETs / staged blocks than the SDK's 4 MiB default and move them in parallel.
+MAX_CHUNK_GET_SIZE = 16 * 1024 * 1024
+MAX_SINGLE_GET_SIZE = 64 * 1024 * 1024
+MAX_BLOCK_SIZE = 16 * 1024 * 1024
+MAX_SINGLE_PUT_SIZE = 64 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = max(4, (os.cpu_count() or 1) * 2)
+
+# Reusable whole-blob download buffers (see BlobService.download_to_buffer)
+MIN_BUFFER_SIZE = 4 * 1024 * 1024
+BUFFER_POOL_SIZE = 8
+
+@functools.lru_cache(maxsize=1)
+def _get_service_client() -> BlobServiceClient:
+    """Build the process-wide BlobServiceClient once so every BlobService shares
+    its HTTP pipeline and connection pool."""
+    # from_connection_string handles every connection string form (account key,
+    # SAS, UseDevelopmentStorage=true); the client is built once, so it is parsed once
+    if not AZURE_STORAGE_CONNECTION_STRING:
+        raise ValueError("AZURE_STORAGE_CONNECTION_STRING environment variable is required")
+    return BlobServiceClient.from_connection_string(
+        AZURE_STORAGE_CONNECTION_STRING,
+        max_chunk_get_size=MAX_CHUNK_GET_SIZE,
+        max_single_get_size=MAX_SINGLE_GET_SIZE,
+        max_block_size=MAX_BLOCK_SIZE,
+        max_single_put_size=MAX_SINGLE_PUT_SIZE,
+    )
+
+def _dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+def _loads(data):
+    # orjson accepts bytes/bytearray/memoryview directly, without decoding first
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data))
+
+class _BufferWriter(io.RawIOBase):
+    """Seekable, writable stream over a preallocated bytearray so that
+    StorageStreamDownloader.readinto() fills it in place, including the
+    out-of-order writes made by parallel range downloads."""
+
+    def __init__(self, buf: bytearray):
+        self._buf = buf
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._buf)
+        self._pos = offset
+        return self._pos
+
+    def write(self, data):
+        n = len(data)
+        # Same-length slice assignment never resizes the buffer
+        self._buf[self._pos:self._pos + n] = data
+        self._pos += n
+        return n
+
 class BlobService:
     def __init__(self):
         try:
-            self.blob_service_client = BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
+            self.blob_service_client = _get_service_client()
         except Exception as e:
-            logger.exception(f"Error initializing BlobServiceClient: {e}")
+            logger.exception("Error initializing BlobServiceClient: %s", e)
             raise e
 
-    def upload_file(self, file_path, tenant_id, project_id, blob_name=None):
+        # Container clients are cached by container name; containers in _ensured
+        # are known to exist, so create_container() is skipped for them.
+        self._container_clients: dict[str, ContainerClient] = {}
+        self._ensured: set[str] = set()
+        self._container_lock = threading.Lock()
+
+        # Download buffers handed back through release_buffer() for reuse
+        self._buffer_pool: queue.LifoQueue[bytearray] = queue.LifoQueue(maxsize=BUFFER_POOL_SIZE)
+
+    def warmup(self):
+        """Open a pooled connection to the account (auth + TLS handshake) before the first transfer."""
+        self.blob_service_client.get_account_information()
+
+    def upload_file(self, file_path, tenant_id, project_id, blob_name=None, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """Upload a local file. Files larger than MAX_SINGLE_PUT_SIZE are sent as
+        staged blocks of MAX_BLOCK_SIZE, up to max_concurrency at a time."""
         if blob_name is None:
             blob_name = os.path.basename(file_path)
         
         try:
             container_client = self._get_or_create_container(tenant_id, project_id)
-            with open(file_path, "rb") as data:
-                container_client.upload_blob(blob_name, data, overwrite=True)
-            logger.info(f"File {blob_name} uploaded successfully to {container_client.url}")
+            # Passing the length up front keeps the SDK on its seekable upload path
+            # instead of buffering the stream to discover its size.
+            length = os.path.getsize(file_path)
+            with open(file_path, "rb") as f:
+                if length == 0:
+                    # mmap cannot map an empty file
+                    container_client.upload_blob(blob_name, b"", overwrite=True)
+                else:
+                    # The read-only mapping is a seekable file-like object backed by the
+                    # page cache, so block reads skip Python's buffered I/O layer.
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        container_client.upload_blob(
+                            blob_name,
+                            data,
+                            overwrite=True,
+                            length=length,
+                            max_concurrency=max_concurrency,
+                        )
+            logger.info("File %s uploaded successfully to %s", blob_name, container_client.url)
+        except Exception as e:
+            logger.exception("Error uploading file %s: %s", blob_name, e)
+
+    def upload_text(self, blob_path, text, encoding="utf-8"):
+        """Upload text to a "<container>/<blob name>" path, replacing any existing blob."""
+        try:
+            blob_client = self._get_blob_client(blob_path)
+            data = text.encode(encoding)
+            blob_client.upload_blob(data, overwrite=True, length=len(data))
+            logger.info("Text %s uploaded successfully (%s bytes)", blob_path, len(data))
+        except Exception as e:
+            logger.exception("Error uploading text %s: %s", blob_path, e)
+            raise e
+
+    def download_text(self, blob_path, encoding="utf-8", max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """Download a whole blob at a "<container>/<blob name>" path as text."""
+        try:
+            blob_client = self._get_blob_client(blob_path)
+            text = blob_client.download_blob(max_concurrency=max_concurrency, encoding=encoding).readall()
+            logger.info("Text %s downloaded successfully", blob_path)
+            return text
+        except Exception as e:
+            logger.exception("Error downloading text %s: %s", blob_path, e)
+            raise e
+
+    def upload_stream(self, blob_path, chunks, encoding="utf-8"):
+        """Upload an iterable of str/bytes chunks to a "<container>/<blob name>"
+        path as staged blocks of up to MAX_BLOCK_SIZE, committed once at the end.
+        At most one block is held in memory, so the full payload is never
+        materialized. If iterating chunks raises, nothing is committed and an
+        existing blob is left as it was.
+        Returns the number of bytes uploaded."""
+        try:
+            blob_client = self._get_blob_client(blob_path)
+            # Block ids must all have the same length within a blob; the SDK
+            # base64-encodes them
+            prefix = uuid.uuid4().hex
+            block_ids = []
+            pending = bytearray()
+            total = 0
+
+            def stage(data):
+                block_id = f"{prefix}-{len(block_ids):08d}"
+                blob_client.stage_block(block_id, bytes(data), length=len(data))
+                block_ids.append(BlobBlock(block_id=block_id))
+
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode(encoding)
+                pending += chunk
+                total += len(chunk)
+                while len(pending) >= MAX_BLOCK_SIZE:
+                    stage(pending[:MAX_BLOCK_SIZE])
+                    del pending[:MAX_BLOCK_SIZE]
+            if pending:
+                stage(pending)
+
+            # An empty block list commits a zero-length blob
+            blob_client.commit_block_list(block_ids)
+            logger.info("Stream %s uploaded successfully (%s bytes)", blob_path, total)
+            return total
         except Exception as e:
-            logger.exception(f"Error uploading file {blob_name}: {e}")
+            logger.exception("Error uploading stream %s: %s", blob_path, e)
+            raise e
 
-    def download_file(self, tenant_id, project_id, blob_name):
+    def download_file(self, tenant_id, project_id, blob_name, max_concurrency=DEFAULT_MAX_CONCURRENCY):
         """Download a file from blob storage and return it as a stream.
-        Returns the blob stream that can be read in chunks."""
+        Returns the blob stream that can be read in chunks.
+
+        Blobs larger than MAX_SINGLE_GET_SIZE are fetched as parallel range GETs:
+        reading the stream (readall/readinto/chunks) fans out to an internal
+        thread pool of up to max_concurrency workers."""
         try:
             container_client = self._get_or_create_container(tenant_id, project_id)
             blob_client = container_client.get_blob_client(blob=blob_name)
-            stream = blob_client.download_blob()
-            logger.info(f"File {blob_name} stream created successfully from {container_client.url}")
+            stream = blob_client.download_blob(max_concurrency=max_concurrency)
+            logger.info("File %s stream created successfully from %s", blob_name, container_client.url)
             return stream
         except Exception as e:
-            logger.exception(f"Error downloading file {blob_name}: {e}")
+            logger.exception("Error downloading file %s: %s", blob_name, e)
             raise e
 
+    def upload_json(self, blob_path, data):
+        """Serialize data to JSON (orjson when installed) and upload it in one PUT
+        to a "<container>/<blob name>" path."""
+        try:
+            blob_client = self._get_blob_client(blob_path)
+            payload = _dumps(data)
+            blob_client.upload_blob(payload, overwrite=True, length=len(payload))
+            logger.info("JSON %s uploaded successfully (%s bytes)", blob_path, len(payload))
+        except Exception as e:
+            logger.exception("Error uploading JSON %s: %s", blob_path, e)
+            raise e
+
+    def download_json(self, blob_path, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """Download a JSON blob at a "<container>/<blob name>" path into a pooled
+        buffer and parse it (orjson when installed)."""
+        try:
+            blob_client = self._get_blob_client(blob_path)
+            view = self._download_into_buffer(blob_client, max_concurrency)
+        except Exception as e:
+            logger.exception("Error downloading JSON %s: %s", blob_path, e)
+            raise e
+        try:
+            return _loads(view)
+        finally:
+            self.release_buffer(view)
+
+    async def download_json_async(self, blob_path, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """download_json run in a worker thread, so neither the transfer nor the
+        parse blocks the event loop."""
+        return await asyncio.to_thread(self.download_json, blob_path, max_concurrency=max_concurrency)
+
+    def download_text_range(self, blob_path, offset, length, encoding="utf-8"):
+        """Download length bytes starting at offset of a "<container>/<blob name>"
+        path with a single range GET (x-ms-range) and decode them. Fewer bytes are
+        read at the end of the blob; a multi-byte character cut at the range
+        boundary is dropped."""
+        try:
+            blob_client = self._get_blob_client(blob_path)
+            data = blob_client.download_blob(offset=offset, length=length).readall()
+            logger.info("Range %s+%s of %s downloaded successfully", offset, len(data), blob_path)
+            return data.decode(encoding, errors="ignore")
+        except Exception as e:
+            logger.exception("Error downloading range of %s: %s", blob_path, e)
+            raise e
+
+    def download_to_buffer(self, tenant_id, project_id, blob_name, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """Download a whole blob into a pooled buffer in one parallel transfer.
+        Returns a memoryview over the blob's bytes; pass it to release_buffer()
+        once done so the underlying buffer can be reused by later downloads."""
+        try:
+            container_client = self._get_or_create_container(tenant_id, project_id)
+            blob_client = container_client.get_blob_client(blob=blob_name)
+            view = self._download_into_buffer(blob_client, max_concurrency)
+            logger.info("File %s downloaded successfully from %s", blob_name, container_client.url)
+            return view
+        except Exception as e:
+            logger.exception("Error downloading file %s: %s", blob_name, e)
+            raise e
+
+    def release_buffer(self, view):
+        """Return a buffer obtained from download_to_buffer() to the pool."""
+        buf = view.obj
+        view.release()
+        try:
+            self._buffer_pool.put_nowait(buf)
+        except queue.Full:
+            pass
+
+    def _download_into_buffer(self, blob_client, max_concurrency):
+        stream = blob_client.download_blob(max_concurrency=max_concurrency)
+        buf = self._get_buf(stream.size)
+        stream.readinto(_BufferWriter(buf))
+        return memoryview(buf)[:stream.size]
+
+    def _get_buf(self, n):
+        """Get a pooled buffer of at least n bytes, allocating if none fits."""
+        try:
+            buf = self._buffer_pool.get_nowait()
+            if len(buf) >= n:
+                return buf
+        except queue.Empty:
+            pass
+        return bytearray(max(n, MIN_BUFFER_SIZE))
+
     def delete_file(self, tenant_id, project_id, blob_name):
         try:
             container_client = self._get_or_create_container(tenant_id, project_id)
             blob_client = container_client.get_blob_client(blob=blob_name)
             blob_client.delete_blob()
-            logger.info(f"File {blob_name} deleted successfully from {container_client.url}")
+            logger.info("File %s deleted successfully from %s", blob_name, container_client.url)
         except Exception as e:
-            logger.exception(f"Error deleting file {blob_name}: {e}")
+            logger.exception("Error deleting file %s: %s", blob_name, e)
             raise e
 
     def _validate_tenant_and_project(self, tenant_id, project_id):
@@ -62,11 +328,36 @@ class BlobService:
 
     def _get_or_create_container(self, tenant_id, project_id):
         self._validate_tenant_and_project(tenant_id, project_id)
-        
-        container_name = f"{tenant_id}-{project_id}".lower()
-        container_client = self.blob_service_client.get_container_client(container_name)
-        try:
-            container_client.create_container()
-        except Exception:
-            logger.exception(f"Error creating container {container_name}")
+        return self._get_container(f"{tenant_id}-{project_id}".lower())
+
+    def _get_blob_client(self, blob_path):
+        """Resolve a "<container>/<blob name>" path, as used by the workflow
+        activities, to a blob client; the container is created on first use."""
+        container_name, _, blob_name = blob_path.partition("/")
+        if not container_name or not blob_name:
+            raise ValueError(f"Blob path must be <container>/<blob name>: {blob_path!r}")
+        return self._get_container(container_name.lower()).get_blob_client(blob=blob_name)
+
+    def _get_container(self, container_name):
+        container_client = self._container_clients.get(container_name)
+        if container_client is not None and container_name in self._ensured:
+            return container_client
+
+        with self._container_lock:
+            container_client = self._container_clients.get(container_name)
+            if container_client is None:
+                container_client = self.blob_service_client.get_container_client(container_name)
+                self._container_clients[container_name] = container_client
+
+            if container_name not in self._ensured:
+                try:
+                    container_client.create_container()
+                except ResourceExistsError:
+                    # Expected for every container after its first use.
+                    pass
+                except Exception as e:
+                    logger.error("Error creating container %s: %s", container_client.container_name, e)
+                    raise
+                self._ensured.add(container_name)
+
         return container_client
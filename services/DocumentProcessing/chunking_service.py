@@ -1,6 +1,7 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from transformers import AutoTokenizer
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+import functools
 import logging
 from config import Config
 
@@ -32,21 +33,27 @@ class ChunkingService:
         
         # Initialize tokenizer for precise token counting
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
-            logger.info(f"Initialized tokenizer from {self.model_path}")
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_path, use_fast=True)
+            if not self.tokenizer.is_fast:
+                logger.warning("No fast tokenizer available for %s, falling back to slow tokenizer", self.model_path)
+            logger.info("Initialized tokenizer from %s", self.model_path)
         except Exception as e:
-            logger.error(f"Failed to initialize tokenizer: {str(e)}")
+            logger.error("Failed to initialize tokenizer: %s", e)
             raise ChunkingError(f"Tokenizer initialization failed: {str(e)}")
         
+        # The splitter probes overlapping sub-segments repeatedly while recursing,
+        # so memoize its length function; cleared after every chunk_text call
+        self._cached_token_count = functools.lru_cache(maxsize=Config.TOKEN_COUNT_CACHE_SIZE)(self._token_count)
+        
         # Initialize text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
-            length_function=self._token_count,
+            length_function=self._cached_token_count,
             separators=["\n\n", "\n", ". ", " ", ""]  # Try to split at paragraph breaks first, then sentences, then words
         )
         
-        logger.info(f"Initialized chunking service with chunk_size={self.chunk_size}, overlap={self.chunk_overlap}")
+        logger.info("Initialized chunking service with chunk_size=%s, overlap=%s", self.chunk_size, self.chunk_overlap)
     
     def _token_count(self, text: str) -> int:
         """
@@ -59,12 +66,49 @@ class ChunkingService:
             Number of tokens
         """
         try:
+            if self.tokenizer.is_fast:
+                # Counting only: ask the Rust backend for the length instead of
+                # materializing the token id list. Special tokens are counted,
+                # matching len(tokenizer.encode(text))
+                return self.tokenizer(
+                    text,
+                    return_length=True,
+                    return_attention_mask=False,
+                    return_token_type_ids=False
+                )["length"][0]
             return len(self.tokenizer.encode(text))
         except Exception as e:
-            logger.error(f"Token counting failed: {str(e)}")
+            logger.error("Token counting failed: %s", e)
             # Fallback to character count as rough approximation
             return len(text)
     
+    def _token_counts(self, texts: List[str]) -> List[int]:
+        """
+        Count tokens for many texts with a single batched tokenizer call
+        
+        Args:
+            texts: Texts to count tokens for
+            
+        Returns:
+            Number of tokens for each text, in order
+        """
+        if not texts:
+            return []
+        try:
+            # Special tokens are counted, as in _token_count
+            if self.tokenizer.is_fast:
+                return list(self.tokenizer(
+                    texts,
+                    return_length=True,
+                    return_attention_mask=False,
+                    return_token_type_ids=False
+                )["length"])
+            encodings = self.tokenizer(texts, return_attention_mask=False)["input_ids"]
+            return [len(ids) for ids in encodings]
+        except Exception as e:
+            logger.error("Batch token counting failed: %s", e)
+            return [self._token_count(text) for text in texts]
+    
     def chunk_text(self, text: str) -> Tuple[List[str], Dict[str, Any]]:
         """
         Chunk text into smaller pieces
@@ -79,7 +123,7 @@ class ChunkingService:
             EmptyTextError: If text is empty or contains no meaningful content
             ChunkingError: If chunking fails
         """
-        logger.info(f"Starting text chunking. Input text length: {len(text)} characters")
+        logger.info("Starting text chunking. Input text length: %s characters", len(text))
         
         # Validate input
         if not text or not text.strip():
@@ -89,13 +133,13 @@ class ChunkingService:
         # Check if text is too short to chunk meaningfully
         token_count = self._token_count(text)
         if token_count <= self.chunk_size:
-            logger.info(f"Text is shorter than chunk size ({token_count} tokens), returning as single chunk")
+            logger.info("Text is shorter than chunk size (%s tokens), returning as single chunk", token_count)
             chunks = [text]
         else:
             try:
                 # Perform chunking
                 chunks = self.text_splitter.split_text(text)
-                logger.info(f"Successfully chunked text into {len(chunks)} chunks")
+                logger.info("Successfully chunked text into %s chunks", len(chunks))
                 
                 # Validate chunks
                 if not chunks:
@@ -109,28 +153,114 @@ class ChunkingService:
                 chunks = non_empty_chunks
                 
             except Exception as e:
-                logger.error(f"Chunking failed: {str(e)}")
+                logger.error("Chunking failed: %s", e)
                 raise ChunkingError(f"Text chunking failed: {str(e)}")
+            finally:
+                self._cached_token_count.cache_clear()
         
         # Generate metadata
-        metadata = self._generate_metadata(text, chunks)
+        metadata = self._generate_metadata(text, chunks, original_tokens=token_count)
         
-        logger.info(f"Chunking completed. Generated {len(chunks)} chunks with {metadata['total_tokens']} total tokens")
+        logger.info("Chunking completed. Generated %s chunks with %s total tokens", len(chunks), metadata['total_tokens'])
         return chunks, metadata
     
-    def _generate_metadata(self, original_text: str, chunks: List[str]) -> Dict[str, Any]:
+    def chunk_stream(self, segments: Iterable[str]) -> Iterator[str]:
+        """
+        Chunk text that arrives as segments (e.g. pages from
+        TextExtractionService.iter_extract) without materializing the whole text
+        
+        Segments are buffered until roughly CHUNK_STREAM_WINDOW chunks' worth of
+        tokens is held, then split; every chunk but the last is emitted and the
+        last is carried over so it can merge with the text that follows. The
+        carried chunk starts with the splitter's overlap from the last emitted
+        chunk, so chunks keep chunk_overlap across buffer boundaries as in
+        chunk_text. Each segment is tokenized once for the window; the buffer
+        is not re-counted before splitting.
+        
+        Args:
+            segments: Text segments in document order
+            
+        Yields:
+            Non-empty chunks of at most chunk_size tokens, in document order
+            
+        Raises:
+            EmptyTextError: If the segments contain no meaningful content
+            ChunkingError: If chunking fails
+        """
+        window_tokens = self.chunk_size * max(Config.CHUNK_STREAM_WINDOW, 2)
+        buffer = []
+        buffered_tokens = 0
+        emitted = 0
+        
+        try:
+            for segment in segments:
+                if not segment or not segment.strip():
+                    continue
+                buffer.append(segment)
+                buffered_tokens += self._token_count(segment)
+                if buffered_tokens < window_tokens:
+                    continue
+                
+                chunks, tail_tokens = self._split_buffer("\n".join(buffer), buffered_tokens)
+                for chunk in chunks[:-1]:
+                    emitted += 1
+                    yield chunk
+                # Keep only the sliding tail (with its overlap) in memory
+                buffer = chunks[-1:]
+                buffered_tokens = tail_tokens
+            
+            if buffer:
+                chunks, _ = self._split_buffer("\n".join(buffer), buffered_tokens)
+                for chunk in chunks:
+                    emitted += 1
+                    yield chunk
+        except (EmptyTextError, ChunkingError):
+            raise
+        except Exception as e:
+            logger.error("Stream chunking failed: %s", e)
+            raise ChunkingError(f"Text chunking failed: {str(e)}")
+        
+        if not emitted:
+            logger.error("Streamed text is empty or contains only whitespace")
+            raise EmptyTextError("Text is empty or contains no meaningful content")
+        logger.info("Stream chunking completed. Generated %s chunks", emitted)
+    
+    def _split_buffer(self, text: str, token_count: int) -> Tuple[List[str], int]:
+        """
+        Split buffered text into non-empty chunks, single chunk if it already fits
+        
+        Args:
+            text: Buffered text
+            token_count: Sum of the buffered segments' token counts, an upper
+                bound for text's own count (each segment adds special tokens)
+            
+        Returns:
+            Tuple of (chunks, token count of the last chunk)
+        """
+        if token_count <= self.chunk_size:
+            return ([text], token_count) if text.strip() else ([], 0)
+        try:
+            chunks = [chunk for chunk in self.text_splitter.split_text(text) if chunk.strip()]
+            # Usually already measured by the splitter, so served from its cache
+            return chunks, self._cached_token_count(chunks[-1]) if chunks else 0
+        finally:
+            self._cached_token_count.cache_clear()
+    
+    def _generate_metadata(self, original_text: str, chunks: List[str], original_tokens: int = None) -> Dict[str, Any]:
         """
         Generate metadata about the chunking process
         
         Args:
             original_text: Original text that was chunked
             chunks: List of chunks
+            original_tokens: Token count of original_text if already known
             
         Returns:
             Dictionary containing chunking metadata
         """
-        original_tokens = self._token_count(original_text)
-        chunk_tokens = [self._token_count(chunk) for chunk in chunks]
+        if original_tokens is None:
+            original_tokens = self._token_count(original_text)
+        chunk_tokens = self._token_counts(chunks)
         total_chunk_tokens = sum(chunk_tokens)
         
         return {
@@ -148,12 +278,14 @@ class ChunkingService:
             "chunking_successful": True
         }
     
-    def validate_chunks(self, chunks: List[str]) -> bool:
+    def validate_chunks(self, chunks: List[str], chunk_sizes: List[int] = None) -> bool:
         """
         Validate that chunks are reasonable
         
         Args:
             chunks: List of chunks to validate
+            chunk_sizes: Token count per chunk, e.g. metadata["chunk_sizes"] from
+                chunk_text; counted in one batched call if not provided
             
         Returns:
             True if chunks are valid, False otherwise
@@ -162,15 +294,19 @@ class ChunkingService:
             logger.warning("No chunks to validate")
             return False
         
+        # Cheap whitespace check first so invalid input never reaches the tokenizer
         for i, chunk in enumerate(chunks):
             if not chunk.strip():
-                logger.warning(f"Chunk {i} is empty or contains only whitespace")
+                logger.warning("Chunk %s is empty or contains only whitespace", i)
                 return False
-            
-            token_count = self._token_count(chunk)
+        
+        if chunk_sizes is None:
+            chunk_sizes = self._token_counts(chunks)
+        
+        for i, token_count in enumerate(chunk_sizes):
             if token_count > self.chunk_size:
-                logger.warning(f"Chunk {i} exceeds token limit: {token_count} > {self.chunk_size}")
+                logger.warning("Chunk %s exceeds token limit: %s > %s", i, token_count, self.chunk_size)
                 return False
         
-        logger.debug(f"Validated {len(chunks)} chunks successfully")
+        logger.debug("Validated %s chunks successfully", len(chunks))
         return True 
\ No newline at end of file
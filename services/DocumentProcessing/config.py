@@ -10,9 +10,15 @@ class Config:
     # Chunking configuration
     CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', '400'))  # Default for BART (~512 token limit)
     CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '50'))  # Overlap between chunks
+    TOKEN_COUNT_CACHE_SIZE = int(os.getenv('TOKEN_COUNT_CACHE_SIZE', '4096'))  # Memoized length_function probes per chunk_text call
+    CHUNK_STREAM_WINDOW = int(os.getenv('CHUNK_STREAM_WINDOW', '8'))  # chunk_stream splits once ~this many chunks of tokens are buffered
     
     # Classification configuration
     CLASSIFICATION_CONFIDENCE_THRESHOLD = float(os.getenv('CLASSIFICATION_CONFIDENCE_THRESHOLD', '0.3'))
+    CLASSIFICATION_QUANTIZE_CPU = os.getenv('CLASSIFICATION_QUANTIZE_CPU', 'true').lower() == 'true'  # Dynamic int8 Linear layers when no GPU
+    CLASSIFICATION_COMPILE = os.getenv('CLASSIFICATION_COMPILE', 'true').lower() == 'true'  # torch.compile on GPU
+    CLASSIFICATION_BATCH_SIZE = int(os.getenv('CLASSIFICATION_BATCH_SIZE', '16'))  # Chunks per forward pass
+    CLASSIFICATION_CACHE_SIZE = int(os.getenv('CLASSIFICATION_CACHE_SIZE', '4096'))  # Per-chunk results kept, keyed by text hash (0 disables)
     
     # Model configuration
     LLM_MODEL_PATH = os.getenv('LLM_MODEL_PATH', 'llm-models/bart-large-mnli')
@@ -1,5 +1,8 @@
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 from typing import List, Dict, Any, Tuple
+from collections import Counter, OrderedDict, defaultdict
+import hashlib
+import threading
 import torch
 import logging
 from config import Config
@@ -24,15 +27,32 @@ class DocumentClassificationService:
         
         # Initialize model and tokenizer
         try:
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
-            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_path)
-            logger.info(f"Initialized classification model from {self.model_path}")
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_path, use_fast=True)
+            if not self.tokenizer.is_fast:
+                logger.warning("No fast tokenizer available for %s, falling back to slow tokenizer", self.model_path)
+            
+            # Inference only: run on GPU in half precision when available. Weights are
+            # loaded from safetensors (mmap'd) directly in the target dtype.
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self.model = AutoModelForSequenceClassification.from_pretrained(
+                self.model_path,
+                torch_dtype=torch.float16 if self.device.type == "cuda" else torch.float32,
+                low_cpu_mem_usage=True,
+                use_safetensors=True
+            )
+            self.model.to(self.device).eval()
+            if self.device.type == "cpu" and Config.CLASSIFICATION_QUANTIZE_CPU:
+                # CPU fallback: int8 weights for Linear layers (VNNI-friendly GEMMs)
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            logger.info("Initialized classification model from %s on %s", self.model_path, self.device)
         except Exception as e:
-            logger.error(f"Failed to initialize classification model: {str(e)}")
+            logger.error("Failed to initialize classification model: %s", e)
             raise ClassificationError(f"Model initialization failed: {str(e)}")
         
-        # Define document type candidates
-        self.document_types = [
+        # Define document type candidates (immutable; shared with callers without copying)
+        self.document_types = (
             "contract",
             "legal brief",
             "court filing",
@@ -49,12 +69,36 @@ class DocumentClassificationService:
             "order",
             "judgment",
             "email"
-        ]
+        )
         
         # Add "unknown" as a valid classification for failed classifications
         self.unknown_type = "unknown"
         
-        logger.info(f"Initialized classification service with {len(self.document_types)} document types")
+        # BART-MNLI is an entailment model (entailment/neutral/contradiction), not a
+        # document-type classifier, so each chunk is scored as an NLI premise against
+        # one hypothesis per document type. Hypotheses are tokenized once here and
+        # reused for every chunk instead of re-tokenizing each (chunk, label) pair.
+        self.max_length = 512
+        self.hypothesis_template = "This example is {}."
+        self._label_token_ids = [
+            self.tokenizer(self.hypothesis_template.format(label), add_special_tokens=False)["input_ids"]
+            for label in self.document_types
+        ]
+        self._pair_special_tokens = self.tokenizer.num_special_tokens_to_add(pair=True)
+        self._entailment_id = self._get_entailment_id()
+        
+        # Per-chunk (document_type, confidence) keyed by a hash of the chunk text,
+        # so re-uploaded or boilerplate chunks skip the model
+        self._chunk_cache = OrderedDict()
+        self._chunk_cache_lock = threading.Lock()
+        
+        # On GPU, compile for the fixed (batch, max_length) shape; batches are then
+        # padded to max_length and a full batch so the captured graph is reused
+        self._pad_to_max_length = False
+        if self.device.type == "cuda" and Config.CLASSIFICATION_COMPILE:
+            self._compile_model()
+        
+        logger.info("Initialized classification service with %s document types", len(self.document_types))
     
     def classify_document(self, chunks: List[str]) -> Tuple[str, Dict[str, Any]]:
         """
@@ -69,22 +113,15 @@ class DocumentClassificationService:
         Raises:
             ClassificationError: If classification fails
         """
-        logger.info(f"Starting document classification with {len(chunks)} chunks")
+        logger.info("Starting document classification with %s chunks", len(chunks))
         
         if not chunks:
             logger.error("No chunks provided for classification")
             raise ClassificationError("No chunks provided for classification")
         
         try:
-            # Classify each chunk
-            chunk_classifications = []
-            chunk_scores = []
-            
-            for i, chunk in enumerate(chunks):
-                logger.debug(f"Classifying chunk {i+1}/{len(chunks)}")
-                chunk_type, chunk_score = self._classify_chunk(chunk)
-                chunk_classifications.append(chunk_type)
-                chunk_scores.append(chunk_score)
+            # Classify all chunks; (chunk, label) pairs are batched internally
+            chunk_classifications, chunk_scores = self._classify_chunks(chunks)
             
             # Determine final classification using majority voting
             final_type, confidence = self._majority_vote(chunk_classifications, chunk_scores)
@@ -92,11 +129,56 @@ class DocumentClassificationService:
             # Generate metadata
             metadata = self._generate_metadata(chunks, chunk_classifications, chunk_scores, final_type, confidence)
             
-            logger.info(f"Document classified as '{final_type}' with confidence {confidence:.2f}")
+            logger.info("Document classified as '%s' with confidence %.2f", final_type, confidence)
             return final_type, metadata
             
         except Exception as e:
-            logger.error(f"Document classification failed: {str(e)}")
+            logger.error("Document classification failed: %s", e)
+            raise ClassificationError(f"Classification failed: {str(e)}")
+    
+    def classify_batch(self, chunk_lists: List[List[str]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Classify several documents, scoring all of their chunks in shared batches
+        
+        Args:
+            chunk_lists: One list of text chunks per document
+            
+        Returns:
+            List of (document_type, metadata) tuples in input order
+            
+        Raises:
+            ClassificationError: If any document has no chunks or classification fails
+        """
+        logger.info("Starting batch classification of %s documents", len(chunk_lists))
+        
+        if any(not chunks for chunks in chunk_lists):
+            logger.error("No chunks provided for classification")
+            raise ClassificationError("No chunks provided for classification")
+        
+        try:
+            # Flatten so batches are filled across document boundaries
+            texts = []
+            offsets = [0]
+            for chunks in chunk_lists:
+                texts.extend(chunks)
+                offsets.append(len(texts))
+            
+            all_classifications, all_scores = self._classify_chunks(texts)
+            
+            results = []
+            for i, chunks in enumerate(chunk_lists):
+                start, end = offsets[i], offsets[i + 1]
+                chunk_classifications = all_classifications[start:end]
+                chunk_scores = all_scores[start:end]
+                final_type, confidence = self._majority_vote(chunk_classifications, chunk_scores)
+                metadata = self._generate_metadata(chunks, chunk_classifications, chunk_scores, final_type, confidence)
+                results.append((final_type, metadata))
+            
+            logger.info("Batch classified %s documents (%s chunks)", len(chunk_lists), len(texts))
+            return results
+            
+        except Exception as e:
+            logger.error("Batch classification failed: %s", e)
             raise ClassificationError(f"Classification failed: {str(e)}")
     
     def _classify_chunk(self, chunk: str) -> Tuple[str, float]:
@@ -109,36 +191,127 @@ class DocumentClassificationService:
         Returns:
             Tuple of (document_type, confidence_score)
         """
-        try:
-            # Prepare inputs for the model
-            inputs = self.tokenizer(
-                chunk,
-                return_tensors="pt",
-                truncation=True,
-                max_length=512,
-                padding=True
-            )
-            
-            # Get model predictions
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                logits = outputs.logits
-                probabilities = torch.softmax(logits, dim=1)
-            
-            # Get the predicted class and confidence
-            predicted_class = torch.argmax(probabilities, dim=1).item()
-            confidence = probabilities[0][predicted_class].item()
+        document_types, confidences = self._classify_chunks([chunk])
+        return document_types[0], confidences[0]
+    
+    def _classify_chunks(self, chunks: List[str]) -> Tuple[List[str], List[float]]:
+        """
+        Classify chunks with zero-shot entailment scoring against the document types
+        
+        Results are cached per chunk text; only unseen chunks reach the model.
+        
+        Args:
+            chunks: Text chunks to classify
             
-            # Map to document type (simplified for MVP)
-            # In a real implementation, you'd have a proper mapping
-            document_type = self.document_types[predicted_class % len(self.document_types)]
+        Returns:
+            Tuple of (document_types, confidence_scores), one entry per chunk
+        """
+        keys = [hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest() for chunk in chunks]
+        results = {}
+        if Config.CLASSIFICATION_CACHE_SIZE > 0:
+            with self._chunk_cache_lock:
+                for key in keys:
+                    cached = self._chunk_cache.get(key)
+                    if cached is not None:
+                        self._chunk_cache.move_to_end(key)
+                        results[key] = cached
+        
+        # Score each distinct unseen chunk once
+        misses = {}
+        for key, chunk in zip(keys, chunks):
+            if key not in results:
+                misses.setdefault(key, chunk)
+        
+        if misses:
+            try:
+                document_types, confidences = self._score_chunks(list(misses.values()))
+            except Exception as e:
+                logger.error("Chunk classification failed: %s", e)
+                # Return unknown classification with low confidence for these chunks
+                return [self.unknown_type] * len(chunks), [0.0] * len(chunks)
             
-            return document_type, confidence
+            scored = dict(zip(misses, zip(document_types, confidences)))
+            results.update(scored)
+            if Config.CLASSIFICATION_CACHE_SIZE > 0:
+                with self._chunk_cache_lock:
+                    self._chunk_cache.update(scored)
+                    while len(self._chunk_cache) > Config.CLASSIFICATION_CACHE_SIZE:
+                        self._chunk_cache.popitem(last=False)
+        
+        return [results[key][0] for key in keys], [results[key][1] for key in keys]
+    
+    def _score_chunks(self, chunks: List[str]) -> Tuple[List[str], List[float]]:
+        """
+        Run the entailment model over chunks (no caching, raises on failure)
+        
+        Args:
+            chunks: Text chunks to classify
+        
+        Returns:
+            Tuple of (document_types, confidence_scores), one entry per chunk
+        """
+        # Tokenize every chunk once, then pair it with each cached hypothesis
+        chunk_token_ids = self.tokenizer(list(chunks), add_special_tokens=False)["input_ids"]
+        pair_ids = []
+        for chunk_ids in chunk_token_ids:
+            for label_ids in self._label_token_ids:
+                budget = self.max_length - len(label_ids) - self._pair_special_tokens
+                pair_ids.append(self.tokenizer.build_inputs_with_special_tokens(chunk_ids[:budget], label_ids))
+        
+        # Score the (chunk, hypothesis) pairs in padded batches
+        entailment_logits = []
+        batch_size = Config.CLASSIFICATION_BATCH_SIZE
+        with torch.inference_mode():
+            for start in range(0, len(pair_ids), batch_size):
+                batch_ids = pair_ids[start:start + batch_size]
+                num_pairs = len(batch_ids)
+                if self._pad_to_max_length and num_pairs < batch_size:
+                    # Fill the short tail batch with copies of its first pair, so the
+                    # compiled graph sees the (batch, max_length) shape it was
+                    # captured for instead of recompiling; the copies are dropped
+                    batch_ids = batch_ids + [batch_ids[0]] * (batch_size - num_pairs)
+                batch = self.tokenizer.pad(
+                    {"input_ids": batch_ids},
+                    padding="max_length" if self._pad_to_max_length else True,
+                    max_length=self.max_length,
+                    return_tensors="pt"
+                )
+                batch = {name: tensor.to(self.device) for name, tensor in batch.items()}
+                logits = self.model(**batch).logits[:num_pairs]
+                entailment_logits.append(logits[:, self._entailment_id].float())
             
+            # Single-label zero-shot: softmax of entailment logits across labels
+            scores = torch.cat(entailment_logits).view(len(chunks), len(self.document_types)).softmax(dim=-1)
+            confidences, predicted_labels = scores.max(dim=-1)
+        
+        document_types = [self.document_types[i] for i in predicted_labels.tolist()]
+        return document_types, confidences.tolist()
+    
+    def _compile_model(self) -> None:
+        """Compile the model with torch.compile and warm it up before serving requests"""
+        try:
+            compiled_model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False)
+            dummy_ids = torch.full(
+                (Config.CLASSIFICATION_BATCH_SIZE, self.max_length),
+                self.tokenizer.pad_token_id,
+                dtype=torch.long,
+                device=self.device
+            )
+            with torch.inference_mode():
+                compiled_model(input_ids=dummy_ids, attention_mask=torch.ones_like(dummy_ids))
+            self.model = compiled_model
+            self._pad_to_max_length = True
+            logger.info("Compiled classification model for batch=%s, seq_len=%s", Config.CLASSIFICATION_BATCH_SIZE, self.max_length)
         except Exception as e:
-            logger.error(f"Chunk classification failed: {str(e)}")
-            # Return unknown classification with low confidence for this chunk
-            return self.unknown_type, 0.0
+            logger.warning("torch.compile failed, using eager model: %s", e)
+    
+    def _get_entailment_id(self) -> int:
+        """Get the index of the entailment logit from the model config"""
+        for label, label_id in self.model.config.label2id.items():
+            if label.lower().startswith("entail"):
+                return label_id
+        # MNLI checkpoints conventionally put entailment last
+        return -1
     
     def _majority_vote(self, classifications: List[str], scores: List[float]) -> Tuple[str, float]:
         """
@@ -152,22 +325,16 @@ class DocumentClassificationService:
             Tuple of (final_type, overall_confidence)
         """
         # Count votes for each type
-        vote_counts = {}
-        weighted_scores = {}
-        
+        vote_counts = Counter(classifications)
+        weighted_scores = defaultdict(float)
         for doc_type, score in zip(classifications, scores):
-            if doc_type not in vote_counts:
-                vote_counts[doc_type] = 0
-                weighted_scores[doc_type] = 0.0
-            
-            vote_counts[doc_type] += 1
             weighted_scores[doc_type] += score
         
         # Find the type with the most votes
         if not vote_counts:
             return self.unknown_type, 0.0
         
-        max_votes = max(vote_counts.values())
+        max_votes = vote_counts.most_common(1)[0][1]
         most_voted_types = [doc_type for doc_type, votes in vote_counts.items() if votes == max_votes]
         
         # If tie, choose the one with highest weighted score
@@ -185,7 +352,7 @@ class DocumentClassificationService:
         
         # If confidence is too low, mark as unknown
         if overall_confidence < Config.CLASSIFICATION_CONFIDENCE_THRESHOLD:
-            logger.warning(f"Low confidence classification ({overall_confidence:.2f}), marking as unknown")
+            logger.warning("Low confidence classification (%.2f), marking as unknown", overall_confidence)
             return self.unknown_type, overall_confidence
         
         return final_type, overall_confidence
@@ -206,9 +373,7 @@ class DocumentClassificationService:
             Dictionary containing classification metadata
         """
         # Count votes for each type
-        vote_counts = {}
-        for doc_type in classifications:
-            vote_counts[doc_type] = vote_counts.get(doc_type, 0) + 1
+        vote_counts = dict(Counter(classifications))
         
         return {
             "final_document_type": final_type,
@@ -219,10 +384,10 @@ class DocumentClassificationService:
             "vote_distribution": vote_counts,
             "classification_method": "majority_vote_with_confidence",
             "model_used": self.model_path,
-            "available_document_types": self.document_types,
+            "available_document_types": list(self.document_types),
             "classification_successful": True
         }
     
     def get_available_document_types(self) -> List[str]:
         """Get list of available document types for classification"""
-        return self.document_types.copy() 
\ No newline at end of file
+        return list(self.document_types) 
\ No newline at end of file
@@ -6,13 +6,16 @@ models_dir = "llm-models"
 if not os.path.exists(models_dir):
     os.makedirs(models_dir)
 
-# Download the complete model to a local directory
+# Download only the files needed for inference: configs, tokenizer files and the
+# safetensors weights (mmap'd at load). Skips pytorch_model.bin and the
+# TF/Flax/Rust weight variants, which would otherwise multiply the download size.
 model_path = snapshot_download(
     repo_id="facebook/bart-large-mnli",
     local_dir=os.path.join(models_dir, "bart-large-mnli"),
+    allow_patterns=["*.json", "tokenizer*", "*.safetensors", "vocab*", "merges*"],
+    max_workers=(os.cpu_count() or 1) * 4,  # Fetch files in parallel
     local_dir_use_symlinks=False  # This ensures actual files are downloaded, not symlinks
 )
 
 print(f"Model downloaded to: {model_path}")
 print("You can now use this local path in your code instead of downloading each time.")
-
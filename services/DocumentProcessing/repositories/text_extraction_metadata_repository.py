@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import uuid
 import logging
 from models.text_extraction_metadata import TextExtractionMetadata
@@ -64,6 +64,31 @@ class TextExtractionMetadataRepository:
             logger.error(f"Failed to retrieve text extraction metadata for document {document_id}: {str(e)}")
             raise
     
+    def get_by_document_ids(self, document_ids: List[uuid.UUID]) -> Dict[uuid.UUID, TextExtractionMetadata]:
+        """
+        Get text extraction metadata for several documents in one query
+        
+        Args:
+            document_ids: Document UUIDs
+            
+        Returns:
+            Mapping of document ID to TextExtractionMetadata; documents without
+            metadata are omitted
+        """
+        if not document_ids:
+            return {}
+        try:
+            rows = self.db_session.query(TextExtractionMetadata).filter(
+                TextExtractionMetadata.document_id.in_(document_ids)
+            ).all()
+            
+            logger.debug(f"Retrieved text extraction metadata for {len(rows)} of {len(document_ids)} documents")
+            return {row.document_id: row for row in rows}
+            
+        except Exception as e:
+            logger.error(f"Failed to retrieve text extraction metadata for {len(document_ids)} documents: {str(e)}")
+            raise
+    
     def delete(self, document_id: uuid.UUID) -> bool:
         """
         Delete text extraction metadata
@@ -75,14 +100,15 @@ class TextExtractionMetadataRepository:
             True if deleted, False if not found
         """
         try:
-            metadata = self.get_by_document_id(document_id)
-            if not metadata:
+            deleted = self.db_session.query(TextExtractionMetadata).filter(
+                TextExtractionMetadata.document_id == document_id
+            ).delete(synchronize_session=False)
+            self.db_session.commit()
+            
+            if not deleted:
                 logger.warning(f"No text extraction metadata found to delete for document {document_id}")
                 return False
             
-            self.db_session.delete(metadata)
-            self.db_session.commit()
-            
             logger.info(f"Deleted text extraction metadata for document {document_id}")
             return True
             
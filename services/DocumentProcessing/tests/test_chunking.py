@@ -55,6 +55,10 @@ def test_chunking_service():
             print(chunk.strip())
             print(f"Tokens: {len(chunking_service.tokenizer.encode(chunk))}")
         
+        # Token counts match the tokenizer's own encoding, special tokens included
+        assert metadata['original_token_count'] == len(chunking_service.tokenizer.encode(sample_text))
+        assert metadata['chunk_sizes'] == [len(chunking_service.tokenizer.encode(chunk)) for chunk in chunks]
+        
         # Test validation
         is_valid = chunking_service.validate_chunks(chunks)
         print(f"\nChunks validation: {'PASSED' if is_valid else 'FAILED'}")
@@ -72,5 +76,20 @@ def test_chunking_service():
         logger.error(f"Test failed: {str(e)}")
         raise
 
+def test_chunk_stream_keeps_overlap_across_buffers():
+    """Streamed chunks stay within the limit and overlap across buffer boundaries"""
+    chunking_service = ChunkingService(chunk_size=40, chunk_overlap=10)
+    pages = [" ".join(f"page{page}word{i}" for i in range(60)) for page in range(6)]
+    
+    chunks = list(chunking_service.chunk_stream(pages))
+    
+    assert chunking_service.validate_chunks(chunks)
+    # Within a page the splitter overlaps consecutive chunks; this must also
+    # hold where one stream buffer ended and the next began
+    same_page = [(a, b) for a, b in zip(chunks, chunks[1:]) if a.split()[-1][:6] == b.split()[0][:6]]
+    assert same_page
+    for previous, current in same_page:
+        assert current.split()[0] in previous.split()
+
 if __name__ == "__main__":
     test_chunking_service() 
\ No newline at end of file
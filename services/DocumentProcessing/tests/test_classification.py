@@ -49,6 +49,12 @@ def test_classification_service():
         print(f"Confidence: {brief_metadata['overall_confidence']:.2f}")
         print(f"Vote distribution: {brief_metadata['vote_distribution']}")
         
+        # Test batch classification matches per-document results
+        print("\n=== Testing Batch Classification ===")
+        batch_results = classification_service.classify_batch([contract_chunks, brief_chunks])
+        assert [doc_type for doc_type, _ in batch_results] == [contract_type, brief_type]
+        print(f"Batch classified as: {', '.join(doc_type for doc_type, _ in batch_results)}")
+        
         # Test empty chunks error
         print("\n=== Testing Empty Chunks Error ===")
         try:
@@ -1,10 +1,17 @@
 import os
+import re
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 import logging
+from concurrent.futures import ProcessPoolExecutor
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r"\S+")
+
+# Files handed to each worker per dispatch in extract_text_batch
+BATCH_CHUNKSIZE = 4
+
 class TextExtractionError(Exception):
     """Raised when text extraction fails"""
     pass
@@ -17,6 +24,57 @@ class EmptyTextError(TextExtractionError):
     """Raised when text extraction produces empty content"""
     pass
 
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # optional accelerator
+    njit = None
+
+# Document backends are resolved once at import; None means not installed
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+try:
+    from docx import Document as DocxDocument
+except ImportError:
+    DocxDocument = None
+
+if njit is not None:
+    @njit(cache=True)
+    def _count_words_njit(buf):
+        n = 0
+        in_word = False
+        for b in buf:
+            # Same set as ASCII \s: space, \t-\r, \x1c-\x1f
+            ws = b == 32 or 9 <= b <= 13 or 28 <= b <= 31
+            if not ws and not in_word:
+                n += 1
+                in_word = True
+            elif ws:
+                in_word = False
+        return n
+
+def count_words(text: str) -> int:
+    """Count whitespace-separated words without building a list of substrings"""
+    if njit is not None and text.isascii():
+        return int(_count_words_njit(np.frombuffer(text.encode('ascii'), dtype=np.uint8)))
+    return sum(1 for _ in _WORD_RE.finditer(text))
+
+def _text_stats(text: str) -> Tuple[int, int]:
+    """Return (character_count, word_count); len() is O(1), so the word scan is the only pass"""
+    return len(text), count_words(text)
+
+def _file_size(file_path: str, file_size: Optional[int]) -> int:
+    """Only stats when the caller (normally extract_text) did not already"""
+    return file_size if file_size is not None else os.path.getsize(file_path)
+
 class TextExtractor(ABC):
     """Abstract base class for text extractors"""
     
@@ -26,116 +84,198 @@ class TextExtractor(ABC):
         pass
     
     @abstractmethod
-    def get_metadata(self, file_path: str) -> Dict[str, Any]:
-        """Get metadata about the extraction process"""
+    def get_metadata(self, file_path: str, file_size: int) -> Dict[str, Any]:
+        """Get metadata about the extraction process for a file of file_size bytes"""
         pass
+    
+    def extract_with_metadata(self, file_path: str, file_size: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """Extract text and metadata in one pass over the file.
+        Extractors whose metadata requires parsing the document override this."""
+        return self.extract(file_path), self.get_metadata(file_path, _file_size(file_path, file_size))
+    
+    def iter_chunks(self, file_path: str) -> Iterator[str]:
+        """Yield the text in natural segments (pages, paragraphs) without joining it.
+        Formats that cannot be segmented cheaply yield the whole text once."""
+        yield self.extract(file_path)
 
 class TxtExtractor(TextExtractor):
     """Extract text from plain text files"""
     
+    ENCODINGS = ('utf-8', 'latin-1', 'cp1252', 'iso-8859-1')
+    
     def extract(self, file_path: str) -> str:
-        try:
-            # Try UTF-8 first
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-        except UnicodeDecodeError:
-            # Fallback to other encodings
-            for encoding in ['latin-1', 'cp1252', 'iso-8859-1']:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        text = f.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
-            else:
-                raise TextExtractionError(f"Could not decode text file: {file_path}")
+        text, _ = self.extract_with_metadata(file_path)
+        return text
+    
+    def extract_with_metadata(self, file_path: str, file_size: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        # Read once; fallback decodes run on the in-memory buffer
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        
+        for encoding in self.ENCODINGS:
+            try:
+                text = data.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise TextExtractionError(f"Could not decode text file: {file_path}")
         
         if not text.strip():
             raise EmptyTextError(f"Text file is empty: {file_path}")
         
-        return text
-    
-    def get_metadata(self, file_path: str) -> Dict[str, Any]:
-        return {
+        return text, {
             "extraction_method": "plain_text",
-            "encoding": "utf-8",  # Simplified for MVP
-            "file_size": os.path.getsize(file_path)
+            "encoding": encoding,
+            "file_size": file_size if file_size is not None else len(data)
         }
+    
+    def get_metadata(self, file_path: str, file_size: int) -> Dict[str, Any]:
+        _, metadata = self.extract_with_metadata(file_path, file_size)
+        return metadata
 
 class PdfExtractor(TextExtractor):
     """Extract text from PDF files"""
     
     def extract(self, file_path: str) -> str:
+        text, _ = self.extract_with_metadata(file_path)
+        return text
+    
+    def extract_with_metadata(self, file_path: str, file_size: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        if pdfium is None and PyPDF2 is None:
+            raise TextExtractionError("pypdfium2 or PyPDF2 is required for PDF extraction")
         try:
-            import PyPDF2
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            parts = []
+            page_count = 0
+            for page_text in self._iter_pages(file_path):
+                page_count += 1
+                if page_text:
+                    parts.append(page_text)
+            text = "\n".join(parts).strip()
             
-            if not text.strip():
+            if not text:
                 raise EmptyTextError(f"PDF contains no extractable text: {file_path}")
             
-            return text.strip()
+            return text, {
+                "extraction_method": "pdf_text",
+                "page_count": page_count,
+                "file_size": _file_size(file_path, file_size)
+            }
             
-        except ImportError:
-            raise TextExtractionError("PyPDF2 is required for PDF extraction")
         except Exception as e:
             raise TextExtractionError(f"PDF extraction failed: {str(e)}")
     
-    def get_metadata(self, file_path: str) -> Dict[str, Any]:
+    def iter_chunks(self, file_path: str) -> Iterator[str]:
+        if pdfium is None and PyPDF2 is None:
+            raise TextExtractionError("pypdfium2 or PyPDF2 is required for PDF extraction")
+        try:
+            for page_text in self._iter_pages(file_path):
+                if page_text and page_text.strip():
+                    yield page_text
+        except Exception as e:
+            raise TextExtractionError(f"PDF extraction failed: {str(e)}")
+    
+    def _iter_pages(self, file_path: str) -> Iterator[str]:
+        """Yield each page's text (possibly empty), one page held at a time"""
+        if pdfium is not None:
+            return self._iter_pages_pdfium(file_path)
+        return self._iter_pages_pypdf2(file_path)
+    
+    @staticmethod
+    def _iter_pages_pdfium(file_path: str) -> Iterator[str]:
+        """Native PDFium backend; much faster than PyPDF2 and releases the GIL"""
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                try:
+                    page_text = textpage.get_text_range()
+                finally:
+                    textpage.close()
+                    page.close()
+                yield page_text
+        finally:
+            pdf.close()
+    
+    @staticmethod
+    def _iter_pages_pypdf2(file_path: str) -> Iterator[str]:
+        with open(file_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            for page in pdf_reader.pages:
+                yield page.extract_text()
+    
+    def get_metadata(self, file_path: str, file_size: int) -> Dict[str, Any]:
         try:
-            import PyPDF2
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                return {
-                    "extraction_method": "pdf_text",
-                    "page_count": len(pdf_reader.pages),
-                    "file_size": os.path.getsize(file_path)
-                }
+            if pdfium is not None:
+                pdf = pdfium.PdfDocument(file_path)
+                try:
+                    page_count = len(pdf)
+                finally:
+                    pdf.close()
+            else:
+                with open(file_path, 'rb') as file:
+                    page_count = len(PyPDF2.PdfReader(file).pages)
+            return {
+                "extraction_method": "pdf_text",
+                "page_count": page_count,
+                "file_size": file_size
+            }
         except:
             return {
                 "extraction_method": "pdf_text",
-                "file_size": os.path.getsize(file_path)
+                "file_size": file_size
             }
 
 class DocxExtractor(TextExtractor):
     """Extract text from DOCX files"""
     
     def extract(self, file_path: str) -> str:
+        text, _ = self.extract_with_metadata(file_path)
+        return text
+    
+    def extract_with_metadata(self, file_path: str, file_size: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        if DocxDocument is None:
+            raise TextExtractionError("python-docx is required for DOCX extraction")
         try:
-            from docx import Document
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
+            doc = DocxDocument(file_path)
+            paragraphs = doc.paragraphs
+            text = "\n".join(paragraph.text for paragraph in paragraphs).strip()
             
-            if not text.strip():
+            if not text:
                 raise EmptyTextError(f"DOCX contains no extractable text: {file_path}")
             
-            return text.strip()
+            return text, {
+                "extraction_method": "docx_text",
+                "paragraph_count": len(paragraphs),
+                "file_size": _file_size(file_path, file_size)
+            }
             
-        except ImportError:
+        except Exception as e:
+            raise TextExtractionError(f"DOCX extraction failed: {str(e)}")
+    
+    def iter_chunks(self, file_path: str) -> Iterator[str]:
+        if DocxDocument is None:
             raise TextExtractionError("python-docx is required for DOCX extraction")
+        try:
+            doc = DocxDocument(file_path)
         except Exception as e:
             raise TextExtractionError(f"DOCX extraction failed: {str(e)}")
+        for paragraph in doc.paragraphs:
+            if paragraph.text.strip():
+                yield paragraph.text
     
-    def get_metadata(self, file_path: str) -> Dict[str, Any]:
+    def get_metadata(self, file_path: str, file_size: int) -> Dict[str, Any]:
         try:
-            from docx import Document
-            doc = Document(file_path)
+            doc = DocxDocument(file_path)
             return {
                 "extraction_method": "docx_text",
                 "paragraph_count": len(doc.paragraphs),
-                "file_size": os.path.getsize(file_path)
+                "file_size": file_size
             }
         except:
             return {
                 "extraction_method": "docx_text",
-                "file_size": os.path.getsize(file_path)
+                "file_size": file_size
             }
 
 class TextExtractionService:
@@ -165,48 +305,108 @@ class TextExtractionService:
         """
         logger.info(f"Starting text extraction for file: {file_path}")
         
-        if not os.path.exists(file_path):
+        try:
+            file_size = os.stat(file_path).st_size
+        except FileNotFoundError:
             logger.error(f"File not found: {file_path}")
             raise TextExtractionError(f"File not found: {file_path}")
         
-        # Get file extension
-        _, file_extension = os.path.splitext(file_path)
-        file_extension = file_extension.lower()
-        logger.debug(f"Detected file extension: {file_extension}")
-        
-        # Get appropriate extractor
-        extractor = self.extractors.get(file_extension)
-        if not extractor:
-            logger.error(f"Unsupported file type: {file_extension}")
-            raise UnsupportedFileTypeError(f"Unsupported file type: {file_extension}")
-        
+        file_extension, extractor = self._get_extractor(file_path)
         logger.info(f"Using {extractor.__class__.__name__} for extraction")
         
         # Extract text and metadata
         try:
-            text = extractor.extract(file_path)
-            metadata = extractor.get_metadata(file_path)
+            text, metadata = extractor.extract_with_metadata(file_path, file_size)
+            character_count, word_count = _text_stats(text)
             
             # Add common metadata
             metadata.update({
                 "file_name": os.path.basename(file_path),
                 "file_extension": file_extension,
-                "character_count": len(text),
-                "word_count": len(text.split()),
+                "character_count": character_count,
+                "word_count": word_count,
                 "extraction_successful": True
             })
             
-            logger.info(f"Text extraction completed successfully. Extracted {len(text)} characters, {len(text.split())} words")
+            logger.info(f"Text extraction completed successfully. Extracted {character_count} characters, {word_count} words")
             return text, metadata
             
         except Exception as e:
             logger.error(f"Text extraction failed for {file_path}: {str(e)}", exc_info=True)
             raise
     
+    def iter_extract(self, file_path: str) -> Iterator[str]:
+        """
+        Stream extracted text as page/paragraph segments instead of one string
+        
+        Args:
+            file_path: Path to the file to extract text from
+            
+        Yields:
+            Non-empty text segments in document order, suitable for
+            ChunkingService.chunk_stream
+            
+        Raises:
+            UnsupportedFileTypeError: If file type is not supported
+            TextExtractionError: If extraction fails
+        """
+        if not os.path.isfile(file_path):
+            logger.error(f"File not found: {file_path}")
+            raise TextExtractionError(f"File not found: {file_path}")
+        
+        _, extractor = self._get_extractor(file_path)
+        logger.info(f"Streaming text from {file_path} with {extractor.__class__.__name__}")
+        return extractor.iter_chunks(file_path)
+    
+    def _get_extractor(self, file_path: str) -> Tuple[str, TextExtractor]:
+        """Resolve (lowered extension, extractor) for a path"""
+        _, file_extension = os.path.splitext(file_path)
+        file_extension = file_extension.lower()
+        logger.debug(f"Detected file extension: {file_extension}")
+        
+        extractor = self.extractors.get(file_extension)
+        if not extractor:
+            logger.error(f"Unsupported file type: {file_extension}")
+            raise UnsupportedFileTypeError(f"Unsupported file type: {file_extension}")
+        return file_extension, extractor
+    
+    def extract_text_batch(self, file_paths: List[str], max_workers: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Extract text from several files in parallel worker processes
+        
+        Args:
+            file_paths: Paths of the files to extract text from
+            max_workers: Worker process count (defaults to the CPU count)
+            
+        Returns:
+            List of (extracted_text, metadata) tuples in input order
+            
+        Raises:
+            The first extraction error encountered, as in extract_text
+        """
+        if not file_paths:
+            return []
+        if len(file_paths) == 1:
+            return [self.extract_text(file_paths[0])]
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(file_paths))
+        logger.info(f"Starting batch text extraction for {len(file_paths)} files with {workers} workers")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_extract_one, file_paths, chunksize=BATCH_CHUNKSIZE))
+    
     def get_supported_extensions(self) -> list[str]:
         """Get list of supported file extensions"""
         return list(self.extractors.keys())
     
     def is_supported(self, file_extension: str) -> bool:
         """Check if file extension is supported"""
-        return file_extension.lower() in self.extractors 
\ No newline at end of file
+        return file_extension.lower() in self.extractors
+
+_worker_service: Optional[TextExtractionService] = None
+
+def _extract_one(file_path: str) -> Tuple[str, Dict[str, Any]]:
+    """Process-pool entry point; must stay module-level so it can be pickled"""
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = TextExtractionService()
+    return _worker_service.extract_text(file_path)
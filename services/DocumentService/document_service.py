@@ -1,136 +1,269 @@
-from sqlalchemy import create_engine
+from datetime import datetime
+from contextlib import contextmanager
+from sqlalchemy import create_engine, insert, update
 from sqlalchemy.orm import sessionmaker
-from repositories.document_repository import DocumentRepository
+from repositories.document_repository import DocumentRepository, DocumentCache
 from repositories.document_history_repository import DocumentHistoryRepository
 from repositories.document_metadata_repository import DocumentMetadataRepository
 from models.document import Document
 from models.document_history import DocumentHistory
 from models.document_metadata import DocumentMetadata
+from models.text_extraction_metadata import TextExtractionMetadata
 from sqlalchemy.exc import SQLAlchemyError
+try:
+    import orjson
+except ImportError:  # fall back to SQLAlchemy's stdlib json
+    orjson = None
+from config import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT,
+    DOCUMENT_CACHE_SIZE, DOCUMENT_CACHE_TTL,
+)
 
 class DocumentService:
     def __init__(self, db_url: str):
-        self.engine = create_engine(db_url, pool_pre_ping=True)
+        # LIFO checkout keeps a small set of hot connections in use under light load
+        self.engine = create_engine(
+            db_url,
+            pool_pre_ping=True,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_use_lifo=True,
+            **self._json_options(),
+        )
         self.Session = sessionmaker(bind=self.engine)
+        # Reads never flush and hand back objects that stay loaded after close
+        self.ReadSession = sessionmaker(bind=self.engine, autoflush=False, expire_on_commit=False)
+        self.document_cache = DocumentCache(DOCUMENT_CACHE_SIZE, DOCUMENT_CACHE_TTL) if DOCUMENT_CACHE_TTL > 0 else None
 
-    def create_document(self, doc_data: dict):
-        session = self.Session()
+    def close(self):
+        """Release pooled DB connections; connections checked out right now are dropped on return"""
+        self.engine.dispose()
+
+    @staticmethod
+    def _json_options() -> dict:
+        """Use orjson for JSON/JSONB columns (error_details etc.) when it is installed"""
+        if orjson is None:
+            return {}
+        return {
+            "json_serializer": lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode(),
+            "json_deserializer": orjson.loads,
+        }
+
+    @contextmanager
+    def _session(self, readonly: bool = False):
+        """Yield a session that is always closed (returned to the pool) on exit"""
+        session = self.ReadSession() if readonly else self.Session()
         try:
-            repo = DocumentRepository(session)
+            yield session
+        finally:
+            session.close()
+
+    def _invalidate_cached(self, document_ids):
+        """Drop cached documents; call after the commit, so a concurrent read cannot re-cache the old row"""
+        if self.document_cache is not None:
+            for document_id in document_ids:
+                self.document_cache.invalidate(str(document_id))
+
+    def create_document(self, doc_data: dict):
+        with self._session() as session:
+            repo = DocumentRepository(session, self.document_cache)
             document = Document(**doc_data)
             repo.add(document)
             return document
-        finally:
-            session.close()
 
     def get_document(self, document_id: str):
-        session = self.Session()
-        try:
-            repo = DocumentRepository(session)
+        with self._session(readonly=True) as session:
+            repo = DocumentRepository(session, self.document_cache)
             return repo.get_by_id(document_id)
-        finally:
-            session.close()
+
+    def document_exists(self, document_id: str) -> bool:
+        """Check for an active document without loading the row"""
+        with self._session(readonly=True) as session:
+            repo = DocumentRepository(session, self.document_cache)
+            return repo.exists(document_id)
+
+    def get_documents(self, document_ids: list[str]):
+        with self._session(readonly=True) as session:
+            repo = DocumentRepository(session, self.document_cache)
+            return repo.get_many_by_ids(document_ids)
 
     def update_document(self, document: Document):
-        session = self.Session()
-        try:
-            repo = DocumentRepository(session)
+        with self._session() as session:
+            repo = DocumentRepository(session, self.document_cache)
             repo.update(document)
-        finally:
-            session.close()
 
     def delete_document(self, document_id: str, updated_by: str):
-        session = self.Session()
-        try:
-            repo = DocumentRepository(session)
+        with self._session() as session:
+            repo = DocumentRepository(session, self.document_cache)
             repo.soft_delete(document_id, updated_by)
-        finally:
-            session.close()
 
     def list_documents_by_status(self, status: str = None, is_active: bool = True):
-        session = self.Session()
-        try:
-            repo = DocumentRepository(session)
-            return repo.list_by_status(status=status, is_active=is_active)
-        finally:
-            session.close()
+        """Yield documents lazily; the session stays open until iteration finishes"""
+        with self._session(readonly=True) as session:
+            repo = DocumentRepository(session, self.document_cache)
+            yield from repo.list_by_status(status=status, is_active=is_active)
 
     def add_history(self, history_data: dict):
-        session = self.Session()
-        try:
+        with self._session() as session:
             repo = DocumentHistoryRepository(session)
             history = DocumentHistory(**history_data)
             repo.add(history)
             return history
-        finally:
-            session.close()
+
+    def add_history_many(self, history_rows: list[dict]):
+        with self._session() as session:
+            repo = DocumentHistoryRepository(session)
+            repo.add_many(history_rows)
 
     def list_history(self, document_id: str):
-        session = self.Session()
-        try:
+        with self._session(readonly=True) as session:
             repo = DocumentHistoryRepository(session)
             return repo.list_by_document_id(document_id)
-        finally:
-            session.close()
+
+    def list_history_for_documents(self, document_ids: list[str]):
+        with self._session(readonly=True) as session:
+            repo = DocumentHistoryRepository(session)
+            return repo.list_history_for_documents(document_ids)
 
     def add_metadata(self, metadata_data: dict):
-        session = self.Session()
-        try:
+        with self._session() as session:
             repo = DocumentMetadataRepository(session)
             metadata = DocumentMetadata(**metadata_data)
             repo.add(metadata)
             return metadata
-        finally:
-            session.close()
+
+    def add_metadata_many(self, metadata_rows: list[dict]):
+        with self._session() as session:
+            repo = DocumentMetadataRepository(session)
+            repo.add_many(metadata_rows)
 
     def update_metadata(self, metadata: DocumentMetadata):
-        session = self.Session()
-        try:
+        with self._session() as session:
             repo = DocumentMetadataRepository(session)
             repo.update(metadata)
-        finally:
-            session.close()
 
     def list_metadata(self, document_id: str):
-        session = self.Session()
-        try:
+        with self._session(readonly=True) as session:
             repo = DocumentMetadataRepository(session)
             return repo.list_by_document_id(document_id)
-        finally:
-            session.close()
 
     def get_metadata_by_key(self, document_id: str, key: str):
-        session = self.Session()
-        try:
+        with self._session(readonly=True) as session:
             repo = DocumentMetadataRepository(session)
             return repo.get_by_key(document_id, key)
-        finally:
-            session.close()
     
-    def update_document_status(self, document_id: str, status: str, step: str = None, error_details: dict = None):
-        """Update document status and step"""
-        session = self.Session()
-        try:
-            repo = DocumentRepository(session)
-            document = repo.get_by_id(document_id)
-            if document:
-                document.update_status(status, step, error_details)
-                repo.update(document)
-                return document
-            return None
-        finally:
-            session.close()
+    def update_document_status(self, document_id: str, status: str, step: str = None, error_details: dict = None) -> bool:
+        """Update document status and step (and error_details, only when given) with a single UPDATE
+
+        Returns True if an active document was updated, False otherwise. The
+        updated Document is not loaded; use get_document when it is needed.
+        """
+        fields = {
+            "status": status,
+            "processing_step": step,
+            "updated_at": datetime.utcnow(),
+        }
+        if error_details is not None:
+            fields["error_details"] = error_details
+        with self._session() as session:
+            repo = DocumentRepository(session, self.document_cache)
+            return repo.update_status(document_id, fields)
     
-    def mark_document_failed(self, document_id: str, step: str, error_type: str, error_message: str, retryable: bool = True):
+    def update_document_statuses(self, updates: list[dict]) -> int:
+        """Batch form of update_document_status: updates is a list of {"id", "status", "processing_step"} dicts,
+        written with one executemany UPDATE by primary key and one commit; error_details is left unchanged.
+        Returns the number of rows submitted"""
+        if not updates:
+            return 0
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": row["id"],
+                "status": row["status"],
+                "processing_step": row.get("processing_step"),
+                "updated_at": now,
+            }
+            for row in updates
+        ]
+        with self._session() as session:
+            try:
+                # ORM bulk UPDATE by primary key, limited to active documents
+                session.execute(
+                    update(Document).where(Document.is_active.is_(True)),
+                    rows,
+                    execution_options={"synchronize_session": False},
+                )
+                session.commit()
+                self._invalidate_cached(row["id"] for row in rows)
+                return len(rows)
+            except SQLAlchemyError:
+                session.rollback()
+                raise
+
+    def mark_document_failed(self, document_id: str, step: str, error_type: str, error_message: str, retryable: bool = True) -> bool:
         """Mark document as failed with error details"""
-        session = self.Session()
-        try:
-            repo = DocumentRepository(session)
-            document = repo.get_by_id(document_id)
-            if document:
-                document.mark_failed(step, error_type, error_message, retryable)
-                repo.update(document)
-                return document
-            return None
-        finally:
-            session.close() 
\ No newline at end of file
+        error_details = {
+            "step": step,
+            "error_type": error_type,
+            "message": error_message,
+            "retryable": retryable,
+        }
+        return self.update_document_status(document_id, "failed", step, error_details)
+
+    def add_metadata_and_update_status(self, document_id: str, metadata_entries: list[dict], status: str,
+                                       step: str = None, document_fields: dict = None) -> bool:
+        """Insert metadata rows and update the document's status (plus any document_fields) in one transaction"""
+        fields = {
+            **(document_fields or {}),
+            "status": status,
+            "processing_step": step,
+            "updated_at": datetime.utcnow(),
+        }
+        rows = [{**entry, "document_id": document_id} for entry in metadata_entries]
+        with self._session() as session:
+            try:
+                if rows:
+                    session.execute(insert(DocumentMetadata), rows)
+                result = session.execute(
+                    update(Document)
+                    .where(Document.id == document_id, Document.is_active.is_(True))
+                    .values(**fields)
+                    .execution_options(synchronize_session=False)
+                )
+                session.commit()
+                self._invalidate_cached([document_id])
+                return result.rowcount > 0
+            except SQLAlchemyError:
+                session.rollback()
+                raise
+
+    def finalize_extraction(self, document_id: str, metadata_data: dict, history_data: dict,
+                            status: str = "text_extracted", step: str = "text_extraction") -> None:
+        """Record a finished extraction (status, extraction metadata, history) in one transaction"""
+        self.finalize_extractions([(document_id, metadata_data, history_data)], status, step)
+
+    def finalize_extractions(self, results: list[tuple[str, dict, dict]],
+                             status: str = "text_extracted", step: str = "text_extraction") -> None:
+        """Batch form of finalize_extraction: one executemany per table, one commit"""
+        if not results:
+            return
+        now = datetime.utcnow()
+        document_rows = [
+            {"id": document_id, "status": status, "processing_step": step, "updated_at": now}
+            for document_id, _, _ in results
+        ]
+        metadata_rows = [{**metadata_data, "document_id": document_id} for document_id, metadata_data, _ in results]
+        history_rows = [{**history_data, "document_id": document_id} for document_id, _, history_data in results]
+        with self._session() as session:
+            try:
+                # ORM bulk UPDATE by primary key
+                session.execute(update(Document), document_rows)
+                session.execute(insert(TextExtractionMetadata), metadata_rows)
+                session.execute(insert(DocumentHistory), history_rows)
+                session.commit()
+                self._invalidate_cached(document_id for document_id, _, _ in results)
+            except SQLAlchemyError:
+                session.rollback()
+                raise
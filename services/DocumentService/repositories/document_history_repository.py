@@ -1,7 +1,11 @@
+from collections import defaultdict
 from sqlalchemy.orm import Session
 from models.document_history import DocumentHistory
 from sqlalchemy.exc import SQLAlchemyError
 
+# Rows per executemany batch; bounds memory for very large inserts
+BULK_INSERT_CHUNK_SIZE = 1000
+
 class DocumentHistoryRepository:
     def __init__(self, session: Session):
         self.session = session
@@ -14,10 +18,34 @@ class DocumentHistoryRepository:
             self.session.rollback()
             raise e
 
+    def add_many(self, rows: list[dict]):
+        for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+            chunk = rows[start:start + BULK_INSERT_CHUNK_SIZE]
+            try:
+                self.session.bulk_insert_mappings(DocumentHistory, chunk)
+                self.session.commit()
+            except SQLAlchemyError as e:
+                self.session.rollback()
+                raise e
+
     def list_by_document_id(self, document_id: str):
         return (
             self.session.query(DocumentHistory)
             .filter_by(document_id=document_id)
             .order_by(DocumentHistory.created_at)
             .all()
-        ) 
\ No newline at end of file
+        )
+
+    def list_history_for_documents(self, document_ids: list[str]) -> dict:
+        if not document_ids:
+            return {}
+        rows = (
+            self.session.query(DocumentHistory)
+            .filter(DocumentHistory.document_id.in_(document_ids))
+            .order_by(DocumentHistory.document_id, DocumentHistory.created_at)
+            .all()
+        )
+        history = defaultdict(list)
+        for row in rows:
+            history[row.document_id].append(row)
+        return dict(history)
@@ -2,6 +2,9 @@ from sqlalchemy.orm import Session
 from models.document_metadata import DocumentMetadata
 from sqlalchemy.exc import SQLAlchemyError
 
+# Rows per executemany batch; bounds memory for very large inserts
+BULK_INSERT_CHUNK_SIZE = 1000
+
 class DocumentMetadataRepository:
     def __init__(self, session: Session):
         self.session = session
@@ -14,6 +17,16 @@ class DocumentMetadataRepository:
             self.session.rollback()
             raise e
 
+    def add_many(self, rows: list[dict]):
+        for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+            chunk = rows[start:start + BULK_INSERT_CHUNK_SIZE]
+            try:
+                self.session.bulk_insert_mappings(DocumentMetadata, chunk)
+                self.session.commit()
+            except SQLAlchemyError as e:
+                self.session.rollback()
+                raise e
+
     def update(self, metadata: DocumentMetadata):
         try:
             self.session.merge(metadata)
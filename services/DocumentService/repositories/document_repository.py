@@ -1,10 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import exists, select, update
 from sqlalchemy.orm import Session
 from models.document import Document
 from sqlalchemy.exc import SQLAlchemyError
 
+VALID_STATUSES = frozenset(['uploaded', 'processing', 'failed', 'completed'])
+
+# Rows fetched per round trip when streaming list_by_status results
+LIST_BATCH_SIZE = 1000
+
+class DocumentCache:
+    """Small thread-safe LRU with per-entry TTL, shared across repository instances"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
 class DocumentRepository:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, cache: DocumentCache = None):
         self.session = session
+        self.cache = cache
+
+    def _invalidate(self, document_id):
+        # Called after the commit, so a concurrent read cannot re-cache the old row
+        if self.cache is not None:
+            self.cache.invalidate(str(document_id))
 
     def add(self, document: Document):
         try:
@@ -15,33 +63,90 @@ class DocumentRepository:
             raise e
 
     def get_by_id(self, document_id: str) -> Document:
-        return self.session.query(Document).filter_by(id=document_id, is_active=True).first()
+        if self.cache is not None:
+            document = self.cache.get(str(document_id))
+            if document is not None:
+                return document
+        document = self.session.query(Document).filter_by(id=document_id, is_active=True).first()
+        if document is not None and self.cache is not None:
+            self.cache.set(str(document_id), document)
+        return document
+
+    def exists(self, document_id: str) -> bool:
+        if self.cache is not None and self.cache.get(str(document_id)) is not None:
+            return True
+        stmt = select(exists().where(Document.id == document_id, Document.is_active.is_(True)))
+        return self.session.execute(stmt).scalar()
+
+    def get_many_by_ids(self, document_ids: list[str]) -> dict:
+        if not document_ids:
+            return {}
+        rows = (
+            self.session.query(Document)
+            .filter(Document.id.in_(document_ids), Document.is_active.is_(True))
+            .all()
+        )
+        return {doc.id: doc for doc in rows}
 
     def update(self, document: Document):
         try:
             self.session.merge(document)
             self.session.commit()
+            self._invalidate(document.id)
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise e
+
+    def update_status(self, document_id: str, fields: dict) -> bool:
+        """Patch columns on an active document with a single UPDATE (no prior SELECT)"""
+        try:
+            result = self.session.execute(
+                update(Document)
+                .where(Document.id == document_id, Document.is_active.is_(True))
+                .values(**fields)
+                .execution_options(synchronize_session=False)
+            )
+            self.session.commit()
+            self._invalidate(document_id)
+            return result.rowcount > 0
         except SQLAlchemyError as e:
             self.session.rollback()
             raise e
 
-    def soft_delete(self, document_id: str, updated_by: str):
-        doc = self.get_by_id(document_id)
-        if doc:
-            doc.is_active = False
-            doc.updated_by = updated_by
-            from datetime import datetime
-            doc.updated_at = datetime.utcnow()
-            self.update(doc)
+    def soft_delete(self, document_id: str, updated_by: str) -> bool:
+        try:
+            updated = (
+                self.session.query(Document)
+                .filter_by(id=document_id, is_active=True)
+                .update(
+                    {
+                        Document.is_active: False,
+                        Document.updated_by: updated_by,
+                        Document.updated_at: datetime.utcnow(),
+                    },
+                    synchronize_session=False,
+                )
+            )
+            self.session.commit()
+            self._invalidate(document_id)
+            return updated > 0
+        except SQLAlchemyError as e:
+            self.session.rollback()
+            raise e
 
     def list_by_status(self, status: str = None, is_active: bool = True):
-        query = self.session.query(Document)
+        """Stream matching documents; callers must iterate rather than index.
+
+        Relies on a composite index on documents (is_active, status) --
+        the migration adding it must accompany this query pattern.
+        """
+        stmt = select(Document)
         if is_active is not None:
-            query = query.filter_by(is_active=is_active)
+            stmt = stmt.where(Document.is_active == is_active)
         if status:
             # Validate status before filtering
-            valid_statuses = ['uploaded', 'processing', 'failed', 'completed']
-            if status not in valid_statuses:
-                raise ValueError(f"Invalid status: {status}. Must be one of {valid_statuses}")
-            query = query.filter_by(status=status)
-        return query.all() 
\ No newline at end of file
+            if status not in VALID_STATUSES:
+                raise ValueError(f"Invalid status: {status}. Must be one of {sorted(VALID_STATUSES)}")
+            stmt = stmt.where(Document.status == status)
+        # yield_per implies stream_results (server-side cursor)
+        return self.session.execute(stmt.execution_options(yield_per=LIST_BATCH_SIZE)).scalars()
@@ -0,0 +1,58 @@
+import pytest
+
+from repositories import document_repository
+from repositories.document_repository import DocumentCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(document_repository.time, "monotonic", fake)
+    return fake
+
+def test_get_returns_cached_value(clock):
+    cache = DocumentCache(maxsize=4, ttl=30)
+    cache.set("doc-1", "document one")
+    assert cache.get("doc-1") == "document one"
+    assert cache.get("doc-2") is None
+
+def test_entries_expire_after_ttl(clock):
+    cache = DocumentCache(maxsize=4, ttl=30)
+    cache.set("doc-1", "document one")
+    clock.now += 30
+    assert cache.get("doc-1") == "document one"
+    clock.now += 1
+    assert cache.get("doc-1") is None
+
+def test_evicts_least_recently_used(clock):
+    cache = DocumentCache(maxsize=2, ttl=30)
+    cache.set("doc-1", "one")
+    cache.set("doc-2", "two")
+    # Reading doc-1 makes doc-2 the least recently used
+    cache.get("doc-1")
+    cache.set("doc-3", "three")
+    assert cache.get("doc-2") is None
+    assert cache.get("doc-1") == "one"
+    assert cache.get("doc-3") == "three"
+
+def test_invalidate_drops_only_that_entry(clock):
+    cache = DocumentCache(maxsize=4, ttl=30)
+    cache.set("doc-1", "one")
+    cache.set("doc-2", "two")
+    cache.invalidate("doc-1")
+    assert cache.get("doc-1") is None
+    assert cache.get("doc-2") == "two"
+    # Invalidating a missing key is harmless
+    cache.invalidate("doc-1")
+
+def test_repository_invalidate_uses_string_ids(clock):
+    cache = DocumentCache(maxsize=4, ttl=30)
+    cache.set("42", "document")
+    document_repository.DocumentRepository(session=None, cache=cache)._invalidate(42)
+    assert cache.get("42") is None
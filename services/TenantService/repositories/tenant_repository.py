@@ -1,23 +1,83 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import bindparam, create_engine, exists, insert, lambda_stmt, select, text, update
+from sqlalchemy.orm import sessionmaker, Session, raiseload
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from typing import List, Optional
+from typing import Iterator, List, Optional, Union
 import logging
+import threading
 
 from models.tenant import Tenant, Base
+from config import DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, TENANT_AUTO_CREATE_SCHEMA
 
 logger = logging.getLogger(__name__)
 
+# Rows per multi-VALUES INSERT statement for bulk creates
+INSERT_PAGE_SIZE = 1000
+
+# Rows per fetch when streaming get_all_tenants results
+STREAM_BATCH_SIZE = 500
+
+# Hot lookups built once; lambda_stmt skips per-call statement construction
+# and cache-key generation, and the compiled SQL is reused across calls
+_TENANT_EXISTS = lambda_stmt(lambda: select(exists().where(Tenant.id == bindparam('tenant_id'))))
+_PINECONE_CONFIG = lambda_stmt(
+    lambda: select(Tenant.pinecone_index_name, Tenant.pinecone_environment)
+    .where(Tenant.id == bindparam('tenant_id'))
+)
+
+# Engines (and their pools) are shared by every repository for the same URL
+_engines = {}
+_engines_lock = threading.Lock()
+# URLs whose schema has been created in this process
+_schema_initialized = set()
+
+def _get_engine(database_url: str):
+    """Return the pooled engine for database_url, creating it on first use."""
+    engine = _engines.get(database_url)
+    if engine is not None:
+        return engine
+    with _engines_lock:
+        engine = _engines.get(database_url)
+        if engine is None:
+            # LIFO checkout keeps a small set of hot connections in use under light load
+            engine = create_engine(
+                database_url,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_pre_ping=True,
+                pool_use_lifo=True,
+                pool_recycle=DB_POOL_RECYCLE,
+                insertmanyvalues_page_size=INSERT_PAGE_SIZE,
+            )
+            _engines[database_url] = engine
+    return engine
+
 class TenantRepository:
     """Repository for tenant CRUD operations."""
     
     def __init__(self, database_url: str):
         """Initialize repository with database connection."""
-        self.engine = create_engine(database_url)
+        self.engine = _get_engine(database_url)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
-        # Create tables if they don't exist
-        Base.metadata.create_all(bind=self.engine)
+        if TENANT_AUTO_CREATE_SCHEMA:
+            self.init_schema(database_url)
+    
+    @classmethod
+    def init_schema(cls, database_url: str) -> None:
+        """Create tenant tables if they don't exist.
+        
+        Meant to run once from a deploy/startup step; repeated calls in the
+        same process are no-ops.
+        """
+        if database_url in _schema_initialized:
+            return
+        engine = _get_engine(database_url)
+        with _engines_lock:
+            if database_url in _schema_initialized:
+                return
+            Base.metadata.create_all(bind=engine)
+            _schema_initialized.add(database_url)
+        logger.info("Tenant schema initialized")
     
     def _get_session(self) -> Session:
         """Get a database session."""
@@ -44,37 +104,96 @@ class TenantRepository:
         finally:
             session.close()
     
+    def bulk_create_tenants(self, tenants: List[dict]) -> int:
+        """Insert many tenants with batched multi-row INSERTs in one transaction."""
+        if not tenants:
+            return 0
+        session = self._get_session()
+        try:
+            session.execute(insert(Tenant), tenants)
+            session.commit()
+            logger.info(f"Created {len(tenants)} tenants")
+            return len(tenants)
+        except IntegrityError as e:
+            session.rollback()
+            if "duplicate key" in str(e).lower():
+                raise ValueError("One or more tenant IDs already exist")
+            raise
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Database error bulk creating tenants: {e}")
+            raise
+        finally:
+            session.close()
+    
     def get_tenant_by_id(self, tenant_id: str) -> Optional[Tenant]:
         """Get tenant by ID."""
         session = self._get_session()
         try:
-            tenant = session.query(Tenant).filter(Tenant.id == tenant_id).first()
-            return tenant
+            return session.get(Tenant, tenant_id)
         except SQLAlchemyError as e:
             logger.error(f"Database error getting tenant {tenant_id}: {e}")
             raise
         finally:
             session.close()
     
-    def get_all_tenants(self, status: Optional[str] = None) -> List[Tenant]:
-        """Get all tenants, optionally filtered by status."""
+    def get_pinecone_config(self, tenant_id: str) -> Optional[tuple]:
+        """Get (pinecone_index_name, pinecone_environment) without loading the full tenant."""
+        session = self._get_session()
+        try:
+            row = session.execute(_PINECONE_CONFIG, {'tenant_id': tenant_id}).first()
+            return tuple(row) if row is not None else None
+        except SQLAlchemyError as e:
+            logger.error(f"Database error getting Pinecone config for tenant {tenant_id}: {e}")
+            raise
+        finally:
+            session.close()
+    
+    def get_all_tenants(self, status: Optional[str] = None, limit: Optional[int] = None,
+                        offset: Optional[int] = None, stream: bool = False) -> Union[List[Tenant], Iterator[Tenant]]:
+        """Get all tenants, optionally filtered by status and paginated.
+        
+        With stream=True rows are fetched from a server-side cursor in
+        STREAM_BATCH_SIZE batches and returned as an iterator; the session is
+        closed once iteration finishes.
+        """
+        # List queries never lazy-load relationships: any future relationship
+        # must be requested explicitly (selectinload) or access raises
+        stmt = select(Tenant).options(raiseload('*'))
+        if status:
+            stmt = stmt.where(Tenant.status == status)
+        if limit is not None or offset is not None:
+            # Stable ordering so pages do not overlap
+            stmt = stmt.order_by(Tenant.id).limit(limit).offset(offset)
+        
+        if stream:
+            return self._stream_tenants(stmt)
+        
         session = self._get_session()
         try:
-            query = session.query(Tenant)
-            if status:
-                query = query.filter(Tenant.status == status)
-            return query.all()
+            return list(session.scalars(stmt))
         except SQLAlchemyError as e:
             logger.error(f"Database error getting tenants: {e}")
             raise
         finally:
             session.close()
     
+    def _stream_tenants(self, stmt) -> Iterator[Tenant]:
+        """Yield tenants from a server-side cursor, holding the session until exhausted."""
+        session = self._get_session()
+        try:
+            yield from session.scalars(stmt.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE))
+        except SQLAlchemyError as e:
+            logger.error(f"Database error streaming tenants: {e}")
+            raise
+        finally:
+            session.close()
+    
     def update_tenant(self, tenant_id: str, **kwargs) -> Optional[Tenant]:
         """Update tenant by ID."""
         session = self._get_session()
         try:
-            tenant = session.query(Tenant).filter(Tenant.id == tenant_id).first()
+            tenant = session.get(Tenant, tenant_id)
             if not tenant:
                 return None
             
@@ -111,11 +230,38 @@ class TenantRepository:
         finally:
             session.close()
     
+    def update_status(self, tenant_id: str, status: str) -> Optional[Tenant]:
+        """Set a tenant's status with one UPDATE ... RETURNING (no prior SELECT).
+        
+        The status is not re-validated here; callers pass one of the model's statuses.
+        """
+        session = self._get_session()
+        try:
+            tenant = session.execute(
+                update(Tenant)
+                .where(Tenant.id == tenant_id)
+                .values(status=status)
+                .returning(Tenant)
+            ).scalar_one_or_none()
+            if tenant is not None:
+                # Detach before commit so the returned row is not expired
+                session.expunge(tenant)
+            session.commit()
+            if tenant is not None:
+                logger.info(f"Updated tenant {tenant_id} status to {status}")
+            return tenant
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Database error updating tenant {tenant_id} status: {e}")
+            raise
+        finally:
+            session.close()
+    
     def delete_tenant(self, tenant_id: str) -> bool:
         """Delete tenant by ID."""
         session = self._get_session()
         try:
-            tenant = session.query(Tenant).filter(Tenant.id == tenant_id).first()
+            tenant = session.get(Tenant, tenant_id)
             if not tenant:
                 return False
             
@@ -134,7 +280,8 @@ class TenantRepository:
         """Check if tenant exists."""
         session = self._get_session()
         try:
-            return session.query(Tenant).filter(Tenant.id == tenant_id).first() is not None
+            # SELECT EXISTS(...) instead of materializing the row
+            return session.execute(_TENANT_EXISTS, {'tenant_id': tenant_id}).scalar()
         except SQLAlchemyError as e:
             logger.error(f"Database error checking tenant existence {tenant_id}: {e}")
             raise
@@ -143,4 +290,9 @@ class TenantRepository:
     
     def get_active_tenants(self) -> List[Tenant]:
         """Get all active tenants."""
-        return self.get_all_tenants(status='active') 
\ No newline at end of file
+        return self.get_all_tenants(status='active')
+    
+    def ping(self) -> None:
+        """Open a pooled connection and run a no-op query (pool warmup/health check)."""
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1")) 
\ No newline at end of file
@@ -1,11 +1,55 @@
+import functools
+import json
 import logging
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Dict, Any, Union
 from models.tenant import Tenant
 from repositories.tenant_repository import TenantRepository
-from config import DATABASE_URL
+from config import DATABASE_URL, TENANT_CACHE_SIZE, TENANT_CACHE_TTL
 
 logger = logging.getLogger(__name__)
 
+def _serialize_metadata(metadata: Optional[Dict[str, Any]]) -> str:
+    """Encode tenant metadata as compact JSON (not Python repr) so it round-trips."""
+    if not metadata:
+        return '{}'
+    return json.dumps(metadata, separators=(',', ':'))
+
+class TenantCache:
+    """Small thread-safe LRU with per-entry TTL for read-heavy tenant lookups."""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate_tenant(self, tenant_id: str):
+        with self._lock:
+            for kind in ('tenant', 'exists', 'pinecone'):
+                self._entries.pop((kind, tenant_id), None)
+
 class TenantService:
     """Main service for tenant management operations."""
     
@@ -13,6 +57,7 @@ class TenantService:
         """Initialize tenant service with database connection."""
         self.database_url = database_url or DATABASE_URL
         self.repository = TenantRepository(self.database_url)
+        self._tenant_cache = TenantCache(TENANT_CACHE_SIZE, TENANT_CACHE_TTL) if TENANT_CACHE_TTL > 0 else None
         logger.info("TenantService initialized")
     
     def create_tenant(self, 
@@ -23,36 +68,61 @@ class TenantService:
                      status: str = 'active',
                      metadata: Dict[str, Any] = None) -> Tenant:
         """Create a new tenant."""
-        try:
-            tenant = Tenant(
-                id=tenant_id,
-                name=name,
-                status=status,
-                pinecone_index_name=pinecone_index_name,
-                pinecone_environment=pinecone_environment,
-                metadata=str(metadata) if metadata else '{}'
-            )
-            
-            return self.repository.create_tenant(tenant)
-        except Exception as e:
-            logger.error(f"Error creating tenant {tenant_id}: {e}")
-            raise
+        tenant = Tenant(
+            id=tenant_id,
+            name=name,
+            status=status,
+            pinecone_index_name=pinecone_index_name,
+            pinecone_environment=pinecone_environment,
+            metadata=_serialize_metadata(metadata)
+        )
+        
+        created = self.repository.create_tenant(tenant)
+        self._invalidate(tenant_id)
+        return created
+    
+    def create_tenants_bulk(self, tenants: List[Dict[str, Any]]) -> int:
+        """Create many tenants in one transaction.
+        
+        Each dict takes the create_tenant arguments (tenant_id, name,
+        pinecone_index_name, pinecone_environment, optional status/metadata).
+        Every row is validated before anything is written.
+        """
+        rows = []
+        for data in tenants:
+            row = {
+                'id': data['tenant_id'],
+                'name': data['name'],
+                'status': data.get('status', 'active'),
+                'pinecone_index_name': data['pinecone_index_name'],
+                'pinecone_environment': data['pinecone_environment'],
+                'metadata': _serialize_metadata(data.get('metadata'))
+            }
+            # Transient instance only for validation; rows are inserted as dicts
+            tenant = Tenant(**row)
+            tenant._validate_name(row['name'])
+            tenant._validate_status(row['status'])
+            tenant._validate_pinecone_config(row['pinecone_index_name'], row['pinecone_environment'])
+            rows.append(row)
+        
+        count = self.repository.bulk_create_tenants(rows)
+        for row in rows:
+            self._invalidate(row['id'])
+        return count
     
     def get_tenant(self, tenant_id: str) -> Optional[Tenant]:
         """Get tenant by ID."""
-        try:
-            return self.repository.get_tenant_by_id(tenant_id)
-        except Exception as e:
-            logger.error(f"Error getting tenant {tenant_id}: {e}")
-            raise
-    
-    def get_all_tenants(self, status: Optional[str] = None) -> List[Tenant]:
-        """Get all tenants, optionally filtered by status."""
-        try:
-            return self.repository.get_all_tenants(status)
-        except Exception as e:
-            logger.error(f"Error getting tenants: {e}")
-            raise
+        tenant = self._cache_get('tenant', tenant_id)
+        if tenant is None:
+            tenant = self.repository.get_tenant_by_id(tenant_id)
+            if tenant is not None:
+                self._cache_set('tenant', tenant_id, tenant)
+        return tenant
+    
+    def get_all_tenants(self, status: Optional[str] = None, limit: Optional[int] = None,
+                        offset: Optional[int] = None, stream: bool = False) -> Union[List[Tenant], Iterator[Tenant]]:
+        """Get all tenants, optionally filtered by status; paginate with limit/offset or stream=True."""
+        return self.repository.get_all_tenants(status, limit=limit, offset=offset, stream=stream)
     
     def get_active_tenants(self) -> List[Tenant]:
         """Get all active tenants."""
@@ -60,53 +130,96 @@ class TenantService:
     
     def update_tenant(self, tenant_id: str, **kwargs) -> Optional[Tenant]:
         """Update tenant by ID."""
-        try:
-            return self.repository.update_tenant(tenant_id, **kwargs)
-        except Exception as e:
-            logger.error(f"Error updating tenant {tenant_id}: {e}")
-            raise
+        if isinstance(kwargs.get('metadata'), dict):
+            kwargs['metadata'] = _serialize_metadata(kwargs['metadata'])
+        tenant = self.repository.update_tenant(tenant_id, **kwargs)
+        self._invalidate(tenant_id)
+        return tenant
     
     def delete_tenant(self, tenant_id: str) -> bool:
         """Delete tenant by ID."""
-        try:
-            return self.repository.delete_tenant(tenant_id)
-        except Exception as e:
-            logger.error(f"Error deleting tenant {tenant_id}: {e}")
-            raise
+        deleted = self.repository.delete_tenant(tenant_id)
+        self._invalidate(tenant_id)
+        return deleted
     
     def tenant_exists(self, tenant_id: str) -> bool:
         """Check if tenant exists."""
-        try:
-            return self.repository.tenant_exists(tenant_id)
-        except Exception as e:
-            logger.error(f"Error checking tenant existence {tenant_id}: {e}")
-            raise
+        # Only positive answers are cached so newly created tenants are seen at once
+        if self._cache_get('exists', tenant_id) or self._cache_get('tenant', tenant_id) is not None:
+            return True
+        exists = self.repository.tenant_exists(tenant_id)
+        if exists:
+            self._cache_set('exists', tenant_id, True)
+        return exists
     
     def activate_tenant(self, tenant_id: str) -> Optional[Tenant]:
         """Activate a tenant."""
-        return self.update_tenant(tenant_id, status='active')
+        return self._set_status(tenant_id, 'active')
     
     def deactivate_tenant(self, tenant_id: str) -> Optional[Tenant]:
         """Deactivate a tenant."""
-        return self.update_tenant(tenant_id, status='inactive')
+        return self._set_status(tenant_id, 'inactive')
     
     def suspend_tenant(self, tenant_id: str) -> Optional[Tenant]:
         """Suspend a tenant."""
-        return self.update_tenant(tenant_id, status='suspended')
+        return self._set_status(tenant_id, 'suspended')
+    
+    def _set_status(self, tenant_id: str, status: str) -> Optional[Tenant]:
+        """Single-statement status change for the fixed, known-valid helper statuses."""
+        tenant = self.repository.update_status(tenant_id, status)
+        self._invalidate(tenant_id)
+        return tenant
     
     def get_tenant_pinecone_config(self, tenant_id: str) -> Optional[Dict[str, str]]:
         """Get tenant's Pinecone configuration."""
-        tenant = self.get_tenant(tenant_id)
-        if not tenant:
+        config = self._cache_get('pinecone', tenant_id)
+        if config is not None:
+            return dict(config)
+        
+        row = self.repository.get_pinecone_config(tenant_id)
+        if row is None:
             return None
         
-        return {
-            'index_name': tenant.pinecone_index_name,
-            'environment': tenant.pinecone_environment
+        index_name, environment = row
+        config = {
+            'index_name': index_name,
+            'environment': environment
         }
+        self._cache_set('pinecone', tenant_id, config)
+        return dict(config)
     
     def update_tenant_pinecone_config(self, tenant_id: str, index_name: str, environment: str) -> Optional[Tenant]:
         """Update tenant's Pinecone configuration."""
         return self.update_tenant(tenant_id, 
                                 pinecone_index_name=index_name, 
-                                pinecone_environment=environment) 
\ No newline at end of file
+                                pinecone_environment=environment)
+    
+    def init_schema(self) -> None:
+        """Create the tenant tables if they don't exist (deploy/startup step)."""
+        TenantRepository.init_schema(self.database_url)
+    
+    def warmup(self) -> None:
+        """Establish a tenant DB connection up front so the first lookup skips the connect."""
+        self.repository.ping()
+    
+    def _cache_get(self, kind: str, tenant_id: str):
+        if self._tenant_cache is None:
+            return None
+        return self._tenant_cache.get((kind, tenant_id))
+    
+    def _cache_set(self, kind: str, tenant_id: str, value):
+        if self._tenant_cache is not None:
+            self._tenant_cache.set((kind, tenant_id), value)
+    
+    def _invalidate(self, tenant_id: str):
+        # Called after the repository write, so a concurrent read cannot re-cache the old row
+        if self._tenant_cache is not None:
+            self._tenant_cache.invalidate_tenant(tenant_id)
+
+def get_tenant_service(database_url: str = None) -> TenantService:
+    """Return the process-wide TenantService for database_url (defaults to config)."""
+    return _get_tenant_service(database_url or DATABASE_URL)
+
+@functools.lru_cache(maxsize=None)
+def _get_tenant_service(database_url: str) -> TenantService:
+    return TenantService(database_url)
@@ -0,0 +1,88 @@
+import pytest
+
+import tenant_service
+from tenant_service import TenantCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(tenant_service.time, "monotonic", fake)
+    return fake
+
+def test_get_returns_cached_value(clock):
+    cache = TenantCache(maxsize=4, ttl=60)
+    cache.set(("tenant", "t1"), "tenant one")
+    assert cache.get(("tenant", "t1")) == "tenant one"
+    assert cache.get(("tenant", "t2")) is None
+
+def test_entries_expire_after_ttl(clock):
+    cache = TenantCache(maxsize=4, ttl=60)
+    cache.set(("tenant", "t1"), "tenant one")
+    clock.now += 60
+    assert cache.get(("tenant", "t1")) == "tenant one"
+    clock.now += 1
+    assert cache.get(("tenant", "t1")) is None
+
+def test_set_refreshes_ttl(clock):
+    cache = TenantCache(maxsize=4, ttl=60)
+    cache.set(("tenant", "t1"), "old")
+    clock.now += 50
+    cache.set(("tenant", "t1"), "new")
+    clock.now += 50
+    assert cache.get(("tenant", "t1")) == "new"
+
+def test_evicts_least_recently_used(clock):
+    cache = TenantCache(maxsize=2, ttl=60)
+    cache.set(("tenant", "t1"), "one")
+    cache.set(("tenant", "t2"), "two")
+    # Reading t1 makes t2 the least recently used
+    cache.get(("tenant", "t1"))
+    cache.set(("tenant", "t3"), "three")
+    assert cache.get(("tenant", "t2")) is None
+    assert cache.get(("tenant", "t1")) == "one"
+    assert cache.get(("tenant", "t3")) == "three"
+
+def test_invalidate_tenant_drops_every_kind(clock):
+    cache = TenantCache(maxsize=8, ttl=60)
+    for kind in ("tenant", "exists", "pinecone"):
+        cache.set((kind, "t1"), kind)
+        cache.set((kind, "t2"), kind)
+    cache.invalidate_tenant("t1")
+    for kind in ("tenant", "exists", "pinecone"):
+        assert cache.get((kind, "t1")) is None
+        assert cache.get((kind, "t2")) == kind
+
+def test_invalidate_unknown_tenant_is_a_no_op(clock):
+    cache = TenantCache(maxsize=4, ttl=60)
+    cache.invalidate_tenant("missing")
+
+class RacingRepository:
+    """Reads the tenant through the service mid-write, like a concurrent get_tenant"""
+
+    def __init__(self):
+        self.status = 'active'
+        self.service = None
+
+    def get_tenant_by_id(self, tenant_id):
+        return {'id': tenant_id, 'status': self.status}
+
+    def update_status(self, tenant_id, status):
+        self.service.get_tenant(tenant_id)
+        self.status = status
+        return self.get_tenant_by_id(tenant_id)
+
+def test_status_change_is_not_hidden_by_a_concurrent_read(clock):
+    service = tenant_service.TenantService.__new__(tenant_service.TenantService)
+    service.repository = RacingRepository()
+    service.repository.service = service
+    service._tenant_cache = TenantCache(maxsize=4, ttl=60)
+
+    service.suspend_tenant('t1')
+    assert service.get_tenant('t1')['status'] == 'suspended'
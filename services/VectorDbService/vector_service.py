@@ -3,6 +3,17 @@ from pinecone import Pinecone
 from config import PINECONE_API_KEY
 from typing import List, Dict, Any
 import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+def _require_nonblank(**values):
+    """Raise ValueError naming the first blank (None/empty/whitespace) argument."""
+    for name, value in values.items():
+        if not value or not value.strip():
+            raise ValueError(f"{name} cannot be blank")
 
 class VectorDbService:
     """Vector database service for upserting and searching document chunks."""
@@ -13,14 +24,67 @@ class VectorDbService:
             raise ValueError("PINECONE_API_KEY environment variable is required")
         
         self.pc = Pinecone(api_key=PINECONE_API_KEY, pool_threads=pool_threads)
+        self.pool_threads = pool_threads
+        # Upsert HTTP calls run here; in-flight batches are capped at 2x this
+        self._executor = ThreadPoolExecutor(max_workers=pool_threads, thread_name_prefix="pinecone-upsert")
+        # Index handles keep their HTTP connections alive, so reuse one per host
+        self._index_cache = {}
+        self._index_lock = threading.Lock()
+        # index name -> (host, dimension), resolved once per index
+        self._index_descriptions = {}
+    
+    def _get_index(self, index_host: str):
+        """Return the cached Index handle for index_host, creating it on first use."""
+        index = self._index_cache.get(index_host)
+        if index is None:
+            with self._index_lock:
+                index = self._index_cache.get(index_host)
+                if index is None:
+                    index = self.pc.Index(host=index_host)
+                    self._index_cache[index_host] = index
+        return index
+    
+    def _describe_index(self, index_name: str):
+        """Return (host, dimension) for index_name, asking the control plane once per index."""
+        description = self._index_descriptions.get(index_name)
+        if description is None:
+            model = self.pc.describe_index(index_name)
+            description = (model.host, model.dimension)
+            self._index_descriptions[index_name] = description
+        return description
+    
+    def warmup(self):
+        """Authenticate and open the control-plane connection ahead of the first request."""
+        self.pc.list_indexes()
+    
+    def close(self):
+        """Close cached Index handles and the upsert thread pool (call at shutdown)."""
+        with self._index_lock:
+            indexes = list(self._index_cache.values())
+            self._index_cache.clear()
+        for index in indexes:
+            try:
+                index.close()
+            except Exception as e:
+                logger.warning("Error closing Pinecone index: %s", e)
+        self._executor.shutdown(wait=True)
     
     @staticmethod
     def _batch_chunks(chunks, batch_size=200):
+        if isinstance(chunks, list):
+            # Slice the list directly instead of rebuilding tuples item by item
+            for start in range(0, len(chunks), batch_size):
+                yield chunks[start:start + batch_size]
+            return
+        if isinstance(chunks, tuple):
+            for start in range(0, len(chunks), batch_size):
+                yield list(chunks[start:start + batch_size])
+            return
         it = iter(chunks)
-        batch = tuple(itertools.islice(it, batch_size))
+        batch = list(itertools.islice(it, batch_size))
         while batch:
             yield batch
-            batch = tuple(itertools.islice(it, batch_size))
+            batch = list(itertools.islice(it, batch_size))
 
     async def upsert_chunks(self, index_host: str, chunks: List[Dict[str, Any]], namespace: str = "__default__", batch_size=200) -> bool:
         """
@@ -31,44 +95,72 @@ class VectorDbService:
             namespace (str, optional): The namespace to upsert into (default: '__default__')
             batch_size (int): Batch size for upserts
         Returns:
-            bool: True if successful, False otherwise
+            bool: True if every batch was upserted, False if any batch failed
+        Raises:
+            ValueError: If index_host or namespace is blank, or chunks is empty
         """
-        if not index_host or not index_host.strip():
-            print("Error: index_host cannot be blank")
-            return False
-        if not namespace or not namespace.strip():
-            print("Error: namespace cannot be blank")
-            return False
+        _require_nonblank(index_host=index_host, namespace=namespace)
         if not chunks:
-            print("Error: chunks list cannot be empty")
-            return False
+            raise ValueError("chunks list cannot be empty")
 
-        async_results = []
         errors = []
-        with self.pc.Index(host=index_host) as index:
-            for batch in self._batch_chunks(chunks, batch_size):
+        loop = asyncio.get_running_loop()
+        index = self._get_index(index_host)
+        # A fixed set of workers pulls from one batch generator, so at most
+        # `concurrency` batches are queued or in flight regardless of input size
+        batches = enumerate(self._batch_chunks(chunks, batch_size))
+        
+        async def worker():
+            for i, batch in batches:
                 try:
-                    async_results.append(
-                        index.upsert_records(namespace, list(batch), async_req=True)
-                    )
+                    await loop.run_in_executor(self._executor, index.upsert_records, namespace, batch)
                 except Exception as e:
-                    print(f"Error submitting upsert batch: {e}")
+                    logger.error("Error in upsert batch %s: %s", i, e)
                     errors.append(e)
-            # Wait for all upserts to complete
-            loop = asyncio.get_event_loop()
-            def wait_for_results():
-                for i, r in enumerate(async_results):
-                    try:
-                        r.get()
-                    except Exception as e:
-                        print(f"Error in upsert batch {i}: {e}")
-                        errors.append(e)
-            await loop.run_in_executor(None, wait_for_results)
+        
+        concurrency = self.pool_threads * 2
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
         if errors:
-            print(f"Encountered {len(errors)} errors during upsert.")
+            logger.error("Encountered %s errors during upsert", len(errors))
             return False
         return True
 
+    def vectorize_chunks_batch(self, chunks: List[str], document_id: str, index_name: str,
+                               start_index: int = 0, namespace: str = "__default__") -> Dict[str, Any]:
+        """
+        Embed and upsert one batch of a document's text chunks with a single
+        upsert_records call (the index's integrated embedding does the embedding).
+        Callers split a document's chunks into batches within the embedding
+        API's limit and run the batches concurrently.
+        Args:
+            chunks (List[str]): The batch's chunk texts
+            document_id (str): The document the chunks belong to
+            index_name (str): The tenant's Pinecone index name
+            start_index (int): Position of the batch's first chunk in the document,
+                so record ids stay unique across batches
+            namespace (str, optional): The namespace to upsert into (default: '__default__')
+        Returns:
+            dict: num_vectors upserted and the index's vector_dimension
+        Raises:
+            ValueError: If document_id, index_name or namespace is blank, or chunks is empty
+        """
+        _require_nonblank(document_id=document_id, index_name=index_name, namespace=namespace)
+        if not chunks:
+            raise ValueError("chunks list cannot be empty")
+
+        host, dimension = self._describe_index(index_name)
+        records = [
+            {
+                "_id": f"{document_id}-{start_index + offset}",
+                "chunk_text": chunk,
+                "document_id": document_id,
+                "chunk_index": start_index + offset,
+            }
+            for offset, chunk in enumerate(chunks)
+        ]
+        self._get_index(host).upsert_records(namespace, records)
+        return {"num_vectors": len(records), "vector_dimension": dimension}
+
     def semantic_search(self, index_host: str, query_text: str, top_k: int = 5, fields=None, namespace: str = "__default__"):
         """
         Perform a semantic (dense vector) search using Pinecone's integrated embedding.
@@ -79,28 +171,22 @@ class VectorDbService:
             fields (List[str], optional): Which fields to return (default: all)
             namespace (str, optional): The namespace to search (default: '__default__')
         Returns:
-            dict: The search results from Pinecone
+            dict: The search results from Pinecone, or None if the search failed
+        Raises:
+            ValueError: If index_host, namespace or query_text is blank
         """
-        if not index_host or not index_host.strip():
-            print("Error: index_host cannot be blank")
-            return None
-        if not namespace or not namespace.strip():
-            print("Error: namespace cannot be blank")
-            return None
-        if not query_text or not query_text.strip():
-            print("Error: query_text cannot be blank")
-            return None
+        _require_nonblank(index_host=index_host, namespace=namespace, query_text=query_text)
         try:
-            with self.pc.Index(host=index_host) as index:
-                result = index.search(
-                    namespace=namespace,
-                    query={
-                        "inputs": {"text": query_text},
-                        "top_k": top_k
-                    },
-                    fields=fields
-                )
+            index = self._get_index(index_host)
+            result = index.search(
+                namespace=namespace,
+                query={
+                    "inputs": {"text": query_text},
+                    "top_k": top_k
+                },
+                fields=fields
+            )
             return result
         except Exception as e:
-            print(f"Error during semantic search: {e}")
+            logger.error("Error during semantic search: %s", e)
             return None
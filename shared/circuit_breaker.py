@@ -0,0 +1,174 @@
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Transport-level errors of the client libraries behind the breakers, when installed
+_TRANSPORT_ERRORS = (ConnectionError, TimeoutError, asyncio.TimeoutError)
+try:
+    from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+    _TRANSPORT_ERRORS += (ServiceRequestError, ServiceResponseError)
+except ImportError:
+    pass
+try:
+    from sqlalchemy.exc import InterfaceError, OperationalError
+    _TRANSPORT_ERRORS += (InterfaceError, OperationalError)
+except ImportError:
+    pass
+
+def is_dependency_failure(error: BaseException) -> bool:
+    """Whether an error means the dependency itself is unhealthy
+
+    Only transport errors and 5xx responses count; a dependency that answers
+    with e.g. not-found or rejects a bad request is up.
+    """
+    if isinstance(error, _TRANSPORT_ERRORS):
+        return True
+    # azure.core HttpResponseError has status_code, Pinecone's ApiException status
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return isinstance(status, int) and status >= 500
+
+class CircuitState(Enum):
+    """Circuit breaker states"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the dependency's circuit is open"""
+    pass
+
+class CircuitBreaker:
+    """Per-dependency circuit breaker with exponential backoff between probes"""
+
+    def __init__(self, name: str, failure_threshold: int = 5,
+                 initial_backoff: float = 1.0, max_backoff: float = 300.0,
+                 is_failure: Callable[[BaseException], bool] = is_dependency_failure):
+        """
+        Initialize circuit breaker
+
+        Args:
+            name: Dependency name, used in errors and logs
+            failure_threshold: Consecutive failures that open the circuit
+            initial_backoff: Seconds the circuit stays open after the first trip
+            max_backoff: Upper bound for the open period; it doubles on every
+                failed half-open probe (1s, 2s, 4s, ...)
+            is_failure: Decides whether an error raised by a call counts
+                against the dependency
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.is_failure = is_failure
+
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def _backoff(self) -> float:
+        return min(self.initial_backoff * (2 ** max(self._trips - 1, 0)), self.max_backoff)
+
+    def before_call(self) -> None:
+        """
+        Admit a call or reject it
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe
+                already in flight
+        """
+        with self._lock:
+            if self._state is CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self._backoff():
+                    raise CircuitOpenError(f"Circuit for {self.name} is open")
+                self._state = CircuitState.HALF_OPEN
+                self._probe_in_flight = False
+                logger.info("Circuit for %s is half-open, probing", self.name)
+
+            if self._state is CircuitState.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(f"Circuit for {self.name} is half-open")
+                self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        """Record a successful call; closes a half-open circuit"""
+        with self._lock:
+            if self._state is not CircuitState.CLOSED:
+                logger.info("Circuit for %s closed", self.name)
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._trips = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed call; opens the circuit at the threshold or on a failed probe"""
+        with self._lock:
+            self._failures += 1
+            if self._state is CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = CircuitState.OPEN
+                self._trips += 1
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                logger.warning("Circuit for %s opened for %.1fs after %s failures",
+                               self.name, self._backoff(), self._failures)
+
+    def release_probe(self) -> None:
+        """Give up an admitted call without an outcome, e.g. when it was cancelled
+
+        A half-open circuit then admits the next call as its probe.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Await func(*args, **kwargs) behind the breaker
+
+        Errors the dependency answered with (see is_failure) are re-raised
+        without counting against it.
+
+        Raises:
+            CircuitOpenError: If the call is rejected
+        """
+        self.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled (or interpreter exit): no verdict on the dependency, but a
+            # half-open probe must not stay in flight forever
+            self.release_probe()
+            raise
+        self.record_success()
+        return result
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str, **options) -> CircuitBreaker:
+    """Return the process-wide breaker for a dependency, creating it with options on first use"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, **options)
+                _breakers[name] = breaker
+    return breaker
@@ -1,5 +1,6 @@
 from enum import Enum
-from typing import List, Optional
+from types import MappingProxyType
+from typing import Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,6 +27,30 @@ class DocumentState(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+# Lookup tables built once at import; the classifier methods below are hit on
+# every state transition
+_STEP_FOR_STATE = MappingProxyType({
+    DocumentState.TEXT_EXTRACTING: "text_extraction",
+    DocumentState.CHUNKING: "chunking",
+    DocumentState.CLASSIFYING: "classification",
+    DocumentState.VECTORIZING: "vectorization",
+    DocumentState.SUMMARIZING: "summarization"
+})
+
+_PROCESSING_STATES = frozenset(_STEP_FOR_STATE)
+
+_TERMINAL_STATES = frozenset({DocumentState.COMPLETED, DocumentState.FAILED})
+
+_RETRY_STATE_FOR_STEP = MappingProxyType({
+    step: state for state, step in _STEP_FOR_STATE.items()
+})
+
+# One-time setup so get_retry_state is a plain attribute read on the member;
+# FAILED itself has no retry target (the workflow resolves it from error_details.step)
+for _state in DocumentState:
+    _state.retry_target = None if _state is DocumentState.FAILED else _RETRY_STATE_FOR_STEP.get(_state.value)
+del _state
+
 class DocumentStateMachine:
     """State machine for document processing"""
     
@@ -37,13 +62,20 @@ class DocumentStateMachine:
         DocumentState.TEXT_EXTRACTED: [DocumentState.CHUNKING, DocumentState.FAILED],
         
         DocumentState.CHUNKING: [DocumentState.CHUNKED, DocumentState.FAILED],
-        DocumentState.CHUNKED: [DocumentState.CLASSIFYING, DocumentState.FAILED],
+        # Classification, vectorization and summarization only read the stored
+        # chunks/text, so they may be fanned out concurrently after chunking
+        DocumentState.CHUNKED: [
+            DocumentState.CLASSIFYING,
+            DocumentState.VECTORIZING,
+            DocumentState.SUMMARIZING,
+            DocumentState.FAILED
+        ],
         
         DocumentState.CLASSIFYING: [DocumentState.CLASSIFIED, DocumentState.FAILED],
-        DocumentState.CLASSIFIED: [DocumentState.VECTORIZING, DocumentState.FAILED],
+        DocumentState.CLASSIFIED: [DocumentState.VECTORIZING, DocumentState.COMPLETED, DocumentState.FAILED],
         
         DocumentState.VECTORIZING: [DocumentState.VECTORIZED, DocumentState.FAILED],
-        DocumentState.VECTORIZED: [DocumentState.SUMMARIZING, DocumentState.FAILED],
+        DocumentState.VECTORIZED: [DocumentState.SUMMARIZING, DocumentState.COMPLETED, DocumentState.FAILED],
         
         DocumentState.SUMMARIZING: [DocumentState.SUMMARIZED, DocumentState.FAILED],
         DocumentState.SUMMARIZED: [DocumentState.COMPLETED],
@@ -61,6 +93,17 @@ class DocumentStateMachine:
         DocumentState.COMPLETED: []
     }
     
+    # Precomputed lookups: one hash probe per check, immutable targets per state
+    _ALLOWED_PAIRS = frozenset(
+        (from_state, to_state)
+        for from_state, to_states in ALLOWED_TRANSITIONS.items()
+        for to_state in to_states
+    )
+    _ALLOWED_TARGETS = {
+        from_state: tuple(to_states)
+        for from_state, to_states in ALLOWED_TRANSITIONS.items()
+    }
+    
     @classmethod
     def can_transition(cls, from_state: DocumentState, to_state: DocumentState) -> bool:
         """
@@ -73,21 +116,20 @@ class DocumentStateMachine:
         Returns:
             True if transition is allowed, False otherwise
         """
-        allowed_transitions = cls.ALLOWED_TRANSITIONS.get(from_state, [])
-        return to_state in allowed_transitions
+        return (from_state, to_state) in cls._ALLOWED_PAIRS
     
     @classmethod
-    def get_allowed_transitions(cls, current_state: DocumentState) -> List[DocumentState]:
+    def get_allowed_transitions(cls, current_state: DocumentState) -> Tuple[DocumentState, ...]:
         """
-        Get list of allowed transitions from current state
+        Get allowed transitions from current state
         
         Args:
             current_state: Current document state
             
         Returns:
-            List of allowed target states
+            Tuple of allowed target states
         """
-        return cls.ALLOWED_TRANSITIONS.get(current_state, [])
+        return cls._ALLOWED_TARGETS.get(current_state, ())
     
     @classmethod
     def validate_transition(cls, from_state: DocumentState, to_state: DocumentState) -> None:
@@ -119,14 +161,7 @@ class DocumentStateMachine:
         Returns:
             Processing step name or None if not a processing state
         """
-        processing_states = {
-            DocumentState.TEXT_EXTRACTING: "text_extraction",
-            DocumentState.CHUNKING: "chunking",
-            DocumentState.CLASSIFYING: "classification",
-            DocumentState.VECTORIZING: "vectorization",
-            DocumentState.SUMMARIZING: "summarization"
-        }
-        return processing_states.get(state)
+        return _STEP_FOR_STATE.get(state)
     
     @classmethod
     def is_processing_state(cls, state: DocumentState) -> bool:
@@ -139,14 +174,7 @@ class DocumentStateMachine:
         Returns:
             True if state is a processing state
         """
-        processing_states = {
-            DocumentState.TEXT_EXTRACTING,
-            DocumentState.CHUNKING,
-            DocumentState.CLASSIFYING,
-            DocumentState.VECTORIZING,
-            DocumentState.SUMMARIZING
-        }
-        return state in processing_states
+        return state in _PROCESSING_STATES
     
     @classmethod
     def is_terminal_state(cls, state: DocumentState) -> bool:
@@ -159,8 +187,7 @@ class DocumentStateMachine:
         Returns:
             True if state is terminal
         """
-        terminal_states = {DocumentState.COMPLETED, DocumentState.FAILED}
-        return state in terminal_states
+        return state in _TERMINAL_STATES
     
     @classmethod
     def get_retry_state(cls, failed_state: DocumentState) -> Optional[DocumentState]:
@@ -173,21 +200,7 @@ class DocumentStateMachine:
         Returns:
             State to retry from, or None if no retry possible
         """
-        # Map failed states to their retry states
-        retry_mapping = {
-            "text_extraction": DocumentState.TEXT_EXTRACTING,
-            "chunking": DocumentState.CHUNKING,
-            "classification": DocumentState.CLASSIFYING,
-            "vectorization": DocumentState.VECTORIZING,
-            "summarization": DocumentState.SUMMARIZING
-        }
-        
-        if failed_state == DocumentState.FAILED:
-            # This would be determined by the error_details.step field
-            # For now, return None - the workflow will need to determine this
-            return None
-        
-        return retry_mapping.get(failed_state.value)
+        return failed_state.retry_target
 
 class InvalidStateTransitionError(Exception):
     """Raised when an invalid state transition is attempted"""
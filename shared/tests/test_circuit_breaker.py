@@ -0,0 +1,159 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the repository root to the path so we can import the shared package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from shared import circuit_breaker
+from shared.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+class ResponseError(Exception):
+    """Stands in for an HTTP error raised by a client library"""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+async def _succeed():
+    return "ok"
+
+async def _raise(error):
+    raise error
+
+def _call(breaker, func, *args):
+    return asyncio.run(breaker.call(func, *args))
+
+def _fail(breaker, error):
+    with pytest.raises(type(error)):
+        _call(breaker, _raise, error)
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        _fail(breaker, ConnectionError("refused"))
+    assert breaker.state is CircuitState.OPEN
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3)
+    for _ in range(2):
+        _fail(breaker, ConnectionError("refused"))
+    assert breaker.state is CircuitState.CLOSED
+
+    _fail(breaker, TimeoutError("timed out"))
+    assert breaker.state is CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        _call(breaker, _succeed)
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    _fail(breaker, ConnectionError("refused"))
+    assert _call(breaker, _succeed) == "ok"
+    _fail(breaker, ConnectionError("refused"))
+    assert breaker.state is CircuitState.CLOSED
+
+def test_answered_errors_do_not_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    _fail(breaker, ValueError("bad input"))
+    _fail(breaker, ResponseError(404))
+    _fail(breaker, ResponseError(409))
+    assert breaker.state is CircuitState.CLOSED
+
+def test_server_errors_count(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    _fail(breaker, ResponseError(503))
+    assert breaker.state is CircuitState.OPEN
+
+def test_custom_failure_predicate(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, is_failure=lambda e: isinstance(e, KeyError))
+    _fail(breaker, ConnectionError("refused"))
+    assert breaker.state is CircuitState.CLOSED
+    _fail(breaker, KeyError("missing"))
+    assert breaker.state is CircuitState.OPEN
+
+def test_half_open_admits_a_single_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, initial_backoff=1.0)
+    _open(breaker)
+    clock.now += 1.0
+
+    breaker.before_call()
+    assert breaker.state is CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, initial_backoff=1.0)
+    _open(breaker)
+    clock.now += 1.0
+    assert _call(breaker, _succeed) == "ok"
+    assert breaker.state is CircuitState.CLOSED
+
+def test_failed_probe_reopens_with_doubled_backoff(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, initial_backoff=1.0, max_backoff=3.0)
+    _open(breaker)
+    clock.now += 1.0
+    _fail(breaker, ConnectionError("refused"))
+    assert breaker.state is CircuitState.OPEN
+
+    clock.now += 1.5
+    with pytest.raises(CircuitOpenError):
+        _call(breaker, _succeed)
+    clock.now += 0.5
+    _fail(breaker, ConnectionError("refused"))
+
+    # Capped at max_backoff rather than 4s
+    clock.now += 3.0
+    assert _call(breaker, _succeed) == "ok"
+
+def test_answered_error_on_probe_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, initial_backoff=1.0)
+    _open(breaker)
+    clock.now += 1.0
+    _fail(breaker, ResponseError(404))
+    assert breaker.state is CircuitState.CLOSED
+
+def test_cancelled_probe_is_released(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, initial_backoff=1.0)
+    _open(breaker)
+    clock.now += 1.0
+
+    async def cancel_probe():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.Event().wait()
+
+        task = asyncio.ensure_future(breaker.call(hang))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert breaker.state is CircuitState.HALF_OPEN
+    # The next call becomes the probe instead of being rejected
+    assert _call(breaker, _succeed) == "ok"
+    assert breaker.state is CircuitState.CLOSED
+
+def test_get_breaker_returns_one_instance_per_name():
+    first = circuit_breaker.get_breaker("test-registry", failure_threshold=2)
+    assert circuit_breaker.get_breaker("test-registry") is first
+    assert first.failure_threshold == 2
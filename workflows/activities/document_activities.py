@@ -1,17 +1,69 @@
 from typing import Dict, Any
+import asyncio
 import logging
+import time
 from temporalio import activity
 
+from shared.circuit_breaker import get_breaker
+from shared.document_state_machine import DocumentState
+
+from ..config import WorkflowConfig
 from ..factories.service_factory import get_service_factory
+from .status_batcher import StatusUpdateBatcher
 
 logger = logging.getLogger(__name__)
 
+# Placeholder summary length; only this much of the extracted text is fetched
+SUMMARY_MAX_CHARS = WorkflowConfig.SUMMARY_MAX_CHARS
+# Enough UTF-8 bytes for SUMMARY_MAX_CHARS + 1 characters, so a longer text is recognized
+SUMMARY_HEAD_BYTES = 4 * (SUMMARY_MAX_CHARS + 1)
+
+# Status strings written by the activities, resolved from the enum once
+_S_EXTRACTING = DocumentState.TEXT_EXTRACTING.value
+_S_EXTRACTED = DocumentState.TEXT_EXTRACTED.value
+_S_CHUNKING = DocumentState.CHUNKING.value
+_S_CHUNKED = DocumentState.CHUNKED.value
+_S_CLASSIFYING = DocumentState.CLASSIFYING.value
+_S_CLASSIFIED = DocumentState.CLASSIFIED.value
+_S_VECTORIZING = DocumentState.VECTORIZING.value
+_S_VECTORIZED = DocumentState.VECTORIZED.value
+_S_SUMMARIZING = DocumentState.SUMMARIZING.value
+_S_SUMMARIZED = DocumentState.SUMMARIZED.value
+
 class DocumentActivities:
     """Temporal activities for document processing using factory pattern"""
     
     def __init__(self):
         # Get service factory for dependency injection
         self.service_factory = get_service_factory()
+        
+        # Resolve the singleton services once instead of on every activity call
+        self._tenant_service = self.service_factory.get_tenant_service()
+        self._text_extraction_service = self.service_factory.get_text_extraction_service()
+        self._chunking_service = self.service_factory.get_chunking_service()
+        self._classification_service = self.service_factory.get_classification_service()
+        self._vector_service = self.service_factory.get_vector_service()
+        self._blob_service = self.service_factory.get_blob_service()
+        # Tenant-scoped document services; the factory keeps them in a bounded
+        # LRU and closes evicted ones, so no second cache is held here
+        self._get_document_service = self.service_factory.get_document_service
+        
+        # Back-pressure per external service: bounds in-flight calls from every
+        # gather/fan-out in this worker, independent of Temporal's activity slots
+        self._semaphores = {
+            "blob": asyncio.Semaphore(WorkflowConfig.BLOB_MAX_CONCURRENCY),
+            "vector": asyncio.Semaphore(WorkflowConfig.VECTOR_MAX_CONCURRENCY),
+            "db": asyncio.Semaphore(WorkflowConfig.DB_MAX_CONCURRENCY)
+        }
+        # chunks blob path -> in-flight download shared by the concurrently
+        # running classification and vectorization of the same document
+        self._chunk_loads: Dict[str, asyncio.Future] = {}
+        # Status-only writes are coalesced into one bulk UPDATE per tenant database
+        self.status_batcher = StatusUpdateBatcher(
+            self._flush_status_updates,
+            max_batch=WorkflowConfig.STATUS_BATCH_SIZE,
+            max_delay=WorkflowConfig.STATUS_BATCH_DELAY_MS / 1000
+        )
     
     @activity.defn
     async def extract_text_activity(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -22,50 +74,62 @@ class DocumentActivities:
             file_path = input_data["file_path"]
             mime_type = input_data["mime_type"]
             
-            logger.info(f"Starting text extraction for document {document_id}")
+            logger.info("Starting text extraction for document %s", document_id)
             
-            # Get services from factory
-            tenant_service = self.service_factory.get_tenant_service()
-            document_service = self.service_factory.get_document_service(tenant_id)
-            text_extraction_service = self.service_factory.get_text_extraction_service()
-            blob_service = self.service_factory.get_blob_service()
+            document_service = self._get_document_service(tenant_id)
             
-            # Get tenant info
-            tenant_info = tenant_service.get_tenant(tenant_id)
+            def extract():
+                started = time.monotonic()
+                text, extraction_metadata = self._text_extraction_service.extract_text(file_path)
+                return text, extraction_metadata, time.monotonic() - started
+            
+            # Tenant lookup, the step's start status and extraction are independent;
+            # run them concurrently. Extraction finishes before anything is uploaded,
+            # so a failed extraction never leaves a partial text blob behind and
+            # never holds a blob slot or counts against the blob circuit breaker
+            tenant_info, (extracted_text, extraction_metadata, processing_time), _ = await asyncio.gather(
+                self._call("tenant", self._tenant_service.get_tenant, tenant_id),
+                asyncio.to_thread(extract),
+                self._start_step(tenant_id, document_id, _S_EXTRACTING, "text_extraction")
+            )
             if not tenant_info:
                 raise ValueError(f"Tenant {tenant_id} not found")
             
-            # Extract text
-            extraction_result = text_extraction_service.extract_text(file_path, mime_type)
+            # Store extracted text in blob storage
+            blob_path = f"documents/{document_id}/extracted_text.txt"
+            text_length = len(extracted_text)
+            await self._call("blob", self._blob_service.upload_text, blob_path, extracted_text)
             
-            # Store extraction metadata
+            # Extraction metadata
             metadata_data = {
                 "document_id": document_id,
                 "key": "text_extraction",
                 "value": {
-                    "extracted_text_length": len(extraction_result.extracted_text),
+                    "extracted_text_length": text_length,
                     "file_path": file_path,
                     "mime_type": mime_type,
-                    "extraction_method": extraction_result.extraction_method,
-                    "processing_time": extraction_result.processing_time
+                    "extraction_method": extraction_metadata.get("extraction_method"),
+                    "processing_time": processing_time
                 }
             }
-            document_service.add_metadata(metadata_data)
             
-            # Store extracted text in blob storage
-            blob_path = f"documents/{document_id}/extracted_text.txt"
-            blob_service.upload_text(blob_path, extraction_result.extracted_text)
+            # Record metadata and the step's completed status in one transaction
+            await self._call(
+                f"document:{tenant_id}", document_service.add_metadata_and_update_status,
+                document_id, [metadata_data], _S_EXTRACTED
+            )
             
-            logger.info(f"Text extraction completed for document {document_id}")
+            logger.info("Text extraction completed for document %s", document_id)
             
             return {
                 "status": "success",
-                "extracted_text_length": len(extraction_result.extracted_text),
+                "state": _S_EXTRACTED,
+                "extracted_text_length": text_length,
                 "blob_path": blob_path
             }
             
         except Exception as e:
-            logger.error(f"Text extraction failed for document {document_id}: {str(e)}")
+            logger.error("Text extraction failed for document %s: %s", document_id, e)
             raise
     
     @activity.defn
@@ -75,114 +139,203 @@ class DocumentActivities:
             document_id = input_data["document_id"]
             tenant_id = input_data["tenant_id"]
             
-            logger.info(f"Starting chunking for document {document_id}")
+            logger.info("Starting chunking for document %s", document_id)
             
-            # Get services from factory
-            tenant_service = self.service_factory.get_tenant_service()
-            document_service = self.service_factory.get_document_service(tenant_id)
-            chunking_service = self.service_factory.get_chunking_service()
-            blob_service = self.service_factory.get_blob_service()
+            document_service = self._get_document_service(tenant_id)
             
-            # Get tenant info
-            tenant_info = tenant_service.get_tenant(tenant_id)
+            # Get tenant info and extracted text, and record the step's start, concurrently
+            blob_path = f"documents/{document_id}/extracted_text.txt"
+            tenant_info, extracted_text, _ = await asyncio.gather(
+                self._call("tenant", self._tenant_service.get_tenant, tenant_id),
+                self._call("blob", self._blob_service.download_text, blob_path),
+                self._start_step(tenant_id, document_id, _S_CHUNKING, "chunking")
+            )
             if not tenant_info:
                 raise ValueError(f"Tenant {tenant_id} not found")
             
-            # Get extracted text from blob storage
-            blob_path = f"documents/{document_id}/extracted_text.txt"
-            extracted_text = blob_service.download_text(blob_path)
-            
             # Chunk the text
-            chunking_result = chunking_service.chunk_text(extracted_text)
+            chunks, chunking_metadata = await asyncio.to_thread(self._chunking_service.chunk_text, extracted_text)
             
-            # Store chunks in blob storage
             chunks_blob_path = f"documents/{document_id}/chunks.json"
-            blob_service.upload_json(chunks_blob_path, chunking_result.chunks)
             
             # Store chunk metadata
             metadata_data = {
                 "document_id": document_id,
                 "key": "chunking",
                 "value": {
-                    "num_chunks": len(chunking_result.chunks),
-                    "chunk_size": chunking_result.chunk_size,
-                    "overlap_size": chunking_result.overlap_size,
-                    "total_tokens": chunking_result.total_tokens,
+                    "num_chunks": len(chunks),
+                    "chunk_size": chunking_metadata["chunk_size_limit"],
+                    "overlap_size": chunking_metadata["chunk_overlap"],
+                    "total_tokens": chunking_metadata["total_tokens"],
                     "blob_path": chunks_blob_path
                 }
             }
-            document_service.add_metadata(metadata_data)
             
-            logger.info(f"Chunking completed for document {document_id}: {len(chunking_result.chunks)} chunks")
+            # Store chunks in blob storage, then chunk metadata and status together
+            await self._call("blob", self._blob_service.upload_json, chunks_blob_path, chunks)
+            await self._call(
+                f"document:{tenant_id}", document_service.add_metadata_and_update_status,
+                document_id, [metadata_data], _S_CHUNKED
+            )
+            
+            logger.info("Chunking completed for document %s: %s chunks", document_id, len(chunks))
             
             return {
                 "status": "success",
-                "num_chunks": len(chunking_result.chunks),
-                "blob_path": chunks_blob_path
+                "state": _S_CHUNKED,
+                "num_chunks": len(chunks),
+                "blob_path": chunks_blob_path,
+                "chunks_blob_path": chunks_blob_path
             }
             
         except Exception as e:
-            logger.error(f"Chunking failed for document {document_id}: {str(e)}")
+            logger.error("Chunking failed for document %s: %s", document_id, e)
             raise
     
     @activity.defn
-    async def classify_document_activity(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Classify document based on chunks"""
+    async def extract_and_chunk_activity(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract and chunk a small document in one activity, handing the text over in memory"""
         try:
             document_id = input_data["document_id"]
             tenant_id = input_data["tenant_id"]
+            file_path = input_data["file_path"]
+            mime_type = input_data["mime_type"]
+            
+            logger.info("Starting fused extraction and chunking for document %s", document_id)
             
-            logger.info(f"Starting classification for document {document_id}")
+            document_service = self._get_document_service(tenant_id)
             
-            # Get services from factory
-            tenant_service = self.service_factory.get_tenant_service()
-            document_service = self.service_factory.get_document_service(tenant_id)
-            classification_service = self.service_factory.get_classification_service()
-            blob_service = self.service_factory.get_blob_service()
+            # Tenant lookup, the step's start status and extraction are independent;
+            # run them concurrently
+            def extract():
+                started = time.monotonic()
+                text, extraction_metadata = self._text_extraction_service.extract_text(file_path)
+                return text, extraction_metadata, time.monotonic() - started
             
-            # Get tenant info
-            tenant_info = tenant_service.get_tenant(tenant_id)
+            tenant_info, (extracted_text, extraction_metadata, processing_time), _ = await asyncio.gather(
+                self._call("tenant", self._tenant_service.get_tenant, tenant_id),
+                asyncio.to_thread(extract),
+                self._start_step(tenant_id, document_id, _S_EXTRACTING, "text_extraction")
+            )
             if not tenant_info:
                 raise ValueError(f"Tenant {tenant_id} not found")
             
-            # Get chunks from blob storage
+            # Chunk the in-memory text; no extracted-text download
+            chunks, chunking_metadata = await asyncio.to_thread(self._chunking_service.chunk_text, extracted_text)
+            
+            blob_path = f"documents/{document_id}/extracted_text.txt"
             chunks_blob_path = f"documents/{document_id}/chunks.json"
-            chunks_data = blob_service.download_json(chunks_blob_path)
-            chunks = [chunk["text"] for chunk in chunks_data]
             
-            # Classify document
-            classification_result = classification_service.classify_document(chunks)
+            metadata_entries = [
+                {
+                    "key": "text_extraction",
+                    "value": {
+                        "extracted_text_length": len(extracted_text),
+                        "file_path": file_path,
+                        "mime_type": mime_type,
+                        "extraction_method": extraction_metadata.get("extraction_method"),
+                        "processing_time": processing_time
+                    }
+                },
+                {
+                    "key": "chunking",
+                    "value": {
+                        "num_chunks": len(chunks),
+                        "chunk_size": chunking_metadata["chunk_size_limit"],
+                        "overlap_size": chunking_metadata["chunk_overlap"],
+                        "total_tokens": chunking_metadata["total_tokens"],
+                        "blob_path": chunks_blob_path
+                    }
+                }
+            ]
+            
+            # Summarization still reads the extracted text, so store it alongside
+            # the chunks, then record both steps' metadata and the chunked status together
+            await asyncio.gather(
+                self._call("blob", self._blob_service.upload_text, blob_path, extracted_text),
+                self._call("blob", self._blob_service.upload_json, chunks_blob_path, chunks)
+            )
+            await self._call(
+                f"document:{tenant_id}", document_service.add_metadata_and_update_status,
+                document_id, metadata_entries, _S_CHUNKED
+            )
             
-            # Update document with classification result
-            document = document_service.get_document(document_id)
-            if document:
-                document.document_type = classification_result.document_type
-                document.confidence_score = classification_result.confidence_score
-                document_service.update_document(document)
+            logger.info("Fused extraction and chunking completed for document %s: %s chunks", document_id, len(chunks))
+            
+            return {
+                "status": "success",
+                "state": _S_CHUNKED,
+                "extracted_text_length": len(extracted_text),
+                "blob_path": blob_path,
+                "num_chunks": len(chunks),
+                "chunks_blob_path": chunks_blob_path
+            }
+            
+        except Exception as e:
+            logger.error("Fused extraction and chunking failed for document %s: %s", document_id, e)
+            raise
+    
+    @activity.defn
+    async def classify_document_activity(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Classify document based on chunks"""
+        try:
+            document_id = input_data["document_id"]
+            tenant_id = input_data["tenant_id"]
+            
+            logger.info("Starting classification for document %s", document_id)
+            
+            document_service = self._get_document_service(tenant_id)
+            
+            # Get tenant info and chunks, and record the step's start, concurrently
+            chunks_blob_path = input_data.get("chunks_blob_path") or f"documents/{document_id}/chunks.json"
+            tenant_info, chunks_data, _ = await asyncio.gather(
+                self._call("tenant", self._tenant_service.get_tenant, tenant_id),
+                self._load_chunks(chunks_blob_path),
+                self._start_step(tenant_id, document_id, _S_CLASSIFYING, "classification")
+            )
+            if not tenant_info:
+                raise ValueError(f"Tenant {tenant_id} not found")
+            # Classify a representative sample of chunks; the service's
+            # confidence-weighted vote merges their predictions
+            chunks = self._sample_chunks(chunks_data, WorkflowConfig.CLASSIFY_SAMPLE_CHUNKS)
+            document_type, classification_metadata = await asyncio.to_thread(
+                self._classification_service.classify_document, chunks
+            )
+            confidence_score = classification_metadata["overall_confidence"]
             
             # Store classification metadata
             metadata_data = {
                 "document_id": document_id,
                 "key": "classification",
                 "value": {
-                    "document_type": classification_result.document_type,
-                    "confidence_score": classification_result.confidence_score,
+                    "document_type": document_type,
+                    "confidence_score": confidence_score,
                     "num_chunks_classified": len(chunks),
                     "classification_method": "bart-large-mnli"
                 }
             }
-            document_service.add_metadata(metadata_data)
             
-            logger.info(f"Classification completed for document {document_id}: {classification_result.document_type}")
+            # Classification result, metadata and status in one transaction
+            await self._call(
+                f"document:{tenant_id}", document_service.add_metadata_and_update_status,
+                document_id, [metadata_data], _S_CLASSIFIED,
+                document_fields={
+                    "document_type": document_type,
+                    "confidence_score": confidence_score
+                }
+            )
+            
+            logger.info("Classification completed for document %s: %s", document_id, document_type)
             
             return {
                 "status": "success",
-                "document_type": classification_result.document_type,
-                "confidence_score": classification_result.confidence_score
+                "state": _S_CLASSIFIED,
+                "document_type": document_type,
+                "confidence_score": confidence_score
             }
             
         except Exception as e:
-            logger.error(f"Classification failed for document {document_id}: {str(e)}")
+            logger.error("Classification failed for document %s: %s", document_id, e)
             raise
     
     @activity.defn
@@ -192,54 +345,65 @@ class DocumentActivities:
             document_id = input_data["document_id"]
             tenant_id = input_data["tenant_id"]
             
-            logger.info(f"Starting vectorization for document {document_id}")
+            logger.info("Starting vectorization for document %s", document_id)
             
-            # Get services from factory
-            tenant_service = self.service_factory.get_tenant_service()
-            document_service = self.service_factory.get_document_service(tenant_id)
-            vector_service = self.service_factory.get_vector_service()
-            blob_service = self.service_factory.get_blob_service()
+            document_service = self._get_document_service(tenant_id)
             
-            # Get tenant info
-            tenant_info = tenant_service.get_tenant(tenant_id)
+            # Get tenant info and chunks, and record the step's start, concurrently
+            chunks_blob_path = input_data.get("chunks_blob_path") or f"documents/{document_id}/chunks.json"
+            tenant_info, chunks_data, _ = await asyncio.gather(
+                self._call("tenant", self._tenant_service.get_tenant, tenant_id),
+                self._load_chunks(chunks_blob_path),
+                self._start_step(tenant_id, document_id, _S_VECTORIZING, "vectorization")
+            )
             if not tenant_info:
                 raise ValueError(f"Tenant {tenant_id} not found")
             
-            # Get chunks from blob storage
-            chunks_blob_path = f"documents/{document_id}/chunks.json"
-            chunks_data = blob_service.download_json(chunks_blob_path)
-            
-            # Vectorize chunks
-            vectorization_result = vector_service.vectorize_chunks(
-                chunks_data, 
-                document_id, 
-                tenant_info.pinecone_index_name,
-                tenant_info.pinecone_region
-            )
+            # Vectorize chunks in concurrent batches; the worker-wide vector
+            # semaphore bounds how many are in flight
+            batch_size = WorkflowConfig.VECTORIZE_BATCH_SIZE
+            started = time.monotonic()
+            batch_results = await asyncio.gather(*(
+                self._call(
+                    "vector", self._vector_service.vectorize_chunks_batch,
+                    chunks_data[start:start + batch_size],
+                    document_id,
+                    tenant_info.pinecone_index_name,
+                    start
+                )
+                for start in range(0, len(chunks_data), batch_size)
+            ))
+            processing_time = time.monotonic() - started
+            num_vectors = sum(result["num_vectors"] for result in batch_results)
+            vector_dimension = batch_results[0]["vector_dimension"] if batch_results else 0
             
             # Store vectorization metadata
             metadata_data = {
                 "document_id": document_id,
                 "key": "vectorization",
                 "value": {
-                    "num_vectors_created": vectorization_result.num_vectors,
-                    "vector_dimension": vectorization_result.vector_dimension,
+                    "num_vectors_created": num_vectors,
+                    "vector_dimension": vector_dimension,
                     "index_name": tenant_info.pinecone_index_name,
-                    "processing_time": vectorization_result.processing_time
+                    "processing_time": processing_time
                 }
             }
-            document_service.add_metadata(metadata_data)
+            await self._call(
+                f"document:{tenant_id}", document_service.add_metadata_and_update_status,
+                document_id, [metadata_data], _S_VECTORIZED
+            )
             
-            logger.info(f"Vectorization completed for document {document_id}: {vectorization_result.num_vectors} vectors")
+            logger.info("Vectorization completed for document %s: %s vectors", document_id, num_vectors)
             
             return {
                 "status": "success",
-                "num_vectors": vectorization_result.num_vectors,
-                "vector_dimension": vectorization_result.vector_dimension
+                "state": _S_VECTORIZED,
+                "num_vectors": num_vectors,
+                "vector_dimension": vector_dimension
             }
             
         except Exception as e:
-            logger.error(f"Vectorization failed for document {document_id}: {str(e)}")
+            logger.error("Vectorization failed for document %s: %s", document_id, e)
             raise
     
     @activity.defn
@@ -249,28 +413,26 @@ class DocumentActivities:
             document_id = input_data["document_id"]
             tenant_id = input_data["tenant_id"]
             
-            logger.info(f"Starting summarization for document {document_id}")
+            logger.info("Starting summarization for document %s", document_id)
             
-            # Get services from factory
-            tenant_service = self.service_factory.get_tenant_service()
-            document_service = self.service_factory.get_document_service(tenant_id)
-            blob_service = self.service_factory.get_blob_service()
+            document_service = self._get_document_service(tenant_id)
             
-            # Get tenant info
-            tenant_info = tenant_service.get_tenant(tenant_id)
+            # The placeholder summary only needs the head of the text, so fetch
+            # it with a range GET rather than downloading the whole blob
+            blob_path = input_data.get("extracted_text_blob_path") or f"documents/{document_id}/extracted_text.txt"
+            original_text_length = input_data.get("extracted_text_length")
+            tenant_info, extracted_head, _ = await asyncio.gather(
+                self._call("tenant", self._tenant_service.get_tenant, tenant_id),
+                self._call("blob", self._blob_service.download_text_range, blob_path, 0, SUMMARY_HEAD_BYTES),
+                self._start_step(tenant_id, document_id, _S_SUMMARIZING, "summarization")
+            )
             if not tenant_info:
                 raise ValueError(f"Tenant {tenant_id} not found")
             
-            # Get extracted text from blob storage
-            blob_path = f"documents/{document_id}/extracted_text.txt"
-            extracted_text = blob_service.download_text(blob_path)
-            
             # For now, create a simple summary (you can integrate with an LLM service later)
-            summary = self._create_simple_summary(extracted_text)
+            summary = self._create_simple_summary(extracted_head)
             
-            # Store summary in blob storage
             summary_blob_path = f"documents/{document_id}/summary.txt"
-            blob_service.upload_text(summary_blob_path, summary)
             
             # Store summarization metadata
             metadata_data = {
@@ -278,23 +440,30 @@ class DocumentActivities:
                 "key": "summarization",
                 "value": {
                     "summary_length": len(summary),
-                    "original_text_length": len(extracted_text),
-                    "compression_ratio": len(summary) / len(extracted_text) if extracted_text else 0,
+                    "original_text_length": original_text_length,
+                    "compression_ratio": len(summary) / original_text_length if original_text_length else 0,
                     "blob_path": summary_blob_path
                 }
             }
-            document_service.add_metadata(metadata_data)
             
-            logger.info(f"Summarization completed for document {document_id}")
+            # Store summary in blob storage, then metadata and status together
+            await self._call("blob", self._blob_service.upload_text, summary_blob_path, summary)
+            await self._call(
+                f"document:{tenant_id}", document_service.add_metadata_and_update_status,
+                document_id, [metadata_data], _S_SUMMARIZED
+            )
+            
+            logger.info("Summarization completed for document %s", document_id)
             
             return {
                 "status": "success",
+                "state": _S_SUMMARIZED,
                 "summary_length": len(summary),
                 "blob_path": summary_blob_path
             }
             
         except Exception as e:
-            logger.error(f"Summarization failed for document {document_id}: {str(e)}")
+            logger.error("Summarization failed for document %s: %s", document_id, e)
             raise
     
     @activity.defn
@@ -305,36 +474,18 @@ class DocumentActivities:
             status = input_data["status"]
             step = input_data.get("step")
             
-            logger.info(f"Updating document {document_id} status to {status}")
+            logger.info("Updating document %s status to %s", document_id, status)
             
-            # Get document to find tenant
-            tenant_service = self.service_factory.get_tenant_service()
-            document = None
-            tenant_id = None
-            
-            # Try to find the document in any tenant (for status updates)
-            # This is a bit inefficient but necessary for status updates
-            for tenant in tenant_service.list_tenants():
-                try:
-                    document_service = self.service_factory.get_document_service(tenant.id)
-                    document = document_service.get_document(document_id)
-                    if document:
-                        tenant_id = tenant.id
-                        break
-                except:
-                    continue
-            
-            if not document:
-                raise ValueError(f"Document {document_id} not found in any tenant")
+            # The workflow always passes the owning tenant, so no tenant lookup is needed
+            tenant_id = input_data["tenant_id"]
             
-            # Update status
-            document_service = self.service_factory.get_document_service(tenant_id)
-            document_service.update_document_status(document_id, status, step)
+            # Update status along with other pending status writes for the tenant
+            await self._submit_status(tenant_id, document_id, status, step)
             
             return {"status": "success"}
             
         except Exception as e:
-            logger.error(f"Failed to update document status: {str(e)}")
+            logger.error("Failed to update document status: %s", e)
             raise
     
     @activity.defn
@@ -347,44 +498,78 @@ class DocumentActivities:
             error_message = input_data["error_message"]
             retryable = input_data.get("retryable", True)
             
-            logger.error(f"Marking document {document_id} as failed at step {step}: {error_message}")
-            
-            # Get document to find tenant
-            tenant_service = self.service_factory.get_tenant_service()
-            document = None
-            tenant_id = None
-            
-            # Try to find the document in any tenant
-            for tenant in tenant_service.list_tenants():
-                try:
-                    document_service = self.service_factory.get_document_service(tenant.id)
-                    document = document_service.get_document(document_id)
-                    if document:
-                        tenant_id = tenant.id
-                        break
-                except:
-                    continue
+            logger.error("Marking document %s as failed at step %s: %s", document_id, step, error_message)
             
-            if not document:
-                raise ValueError(f"Document {document_id} not found in any tenant")
+            tenant_id = input_data["tenant_id"]
             
             # Mark as failed
-            document_service = self.service_factory.get_document_service(tenant_id)
-            document_service.mark_document_failed(
+            document_service = self._get_document_service(tenant_id)
+            await self._call(
+                f"document:{tenant_id}", document_service.mark_document_failed,
                 document_id, step, error_type, error_message, retryable
             )
             
             return {"status": "success"}
             
         except Exception as e:
-            logger.error(f"Failed to mark document as failed: {str(e)}")
+            logger.error("Failed to mark document as failed: %s", e)
             raise
     
+    async def _start_step(self, tenant_id: str, document_id: str, status: str, step: str) -> None:
+        """Record the step's in-progress status from inside its activity"""
+        await self._submit_status(tenant_id, document_id, status, step)
+    
+    async def _submit_status(self, tenant_id: str, document_id: str, status: str, step: str = None) -> None:
+        """Queue a status write and wait for the batch holding it to be committed"""
+        await self.status_batcher.submit(tenant_id, {"id": document_id, "status": status, "processing_step": step})
+    
+    async def _flush_status_updates(self, tenant_id: str, rows) -> None:
+        document_service = self._get_document_service(tenant_id)
+        await self._call(f"document:{tenant_id}", document_service.update_document_statuses, rows)
+    
+    async def _load_chunks(self, chunks_blob_path: str):
+        """Download a chunks blob, joining a download of the same blob already in flight
+        
+        The chunks are shared read-only between the callers.
+        """
+        future = self._chunk_loads.get(chunks_blob_path)
+        if future is None:
+            future = asyncio.ensure_future(self._call("blob", self._blob_service.download_json, chunks_blob_path))
+            self._chunk_loads[chunks_blob_path] = future
+            future.add_done_callback(lambda done: self._chunk_loads.pop(chunks_blob_path, None))
+        # One caller's cancellation must not cancel the download for the others
+        return await asyncio.shield(future)
+    
+    async def _call(self, dependency: str, func, *args, **kwargs):
+        """Run a blocking service call in a thread behind the dependency's circuit breaker
+        
+        The call first waits for a slot on its service's semaphore (tenant and
+        document DBs share the "db" pool). Raises CircuitOpenError without
+        calling func while the dependency's circuit is open.
+        """
+        breaker = get_breaker(
+            dependency,
+            failure_threshold=WorkflowConfig.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            initial_backoff=WorkflowConfig.CIRCUIT_BREAKER_INITIAL_BACKOFF,
+            max_backoff=WorkflowConfig.MAX_RETRY_INTERVAL
+        )
+        semaphore = self._semaphores.get(dependency) or self._semaphores["db"]
+        async with semaphore:
+            return await breaker.call(asyncio.to_thread, func, *args, **kwargs)
+    
+    @staticmethod
+    def _sample_chunks(chunks: list, k: int) -> list:
+        """Pick k evenly spaced chunks, always including the first; all chunks if k <= 0"""
+        if k <= 0 or len(chunks) <= k:
+            return chunks
+        step = len(chunks) / k
+        return [chunks[int(i * step)] for i in range(k)]
+    
     def _create_simple_summary(self, text: str) -> str:
         """Create a simple summary of the text (placeholder for LLM integration)"""
         # This is a placeholder - you can integrate with OpenAI, Anthropic, etc.
-        if len(text) <= 500:
+        if len(text) <= SUMMARY_MAX_CHARS:
             return text
         
-        # Simple approach: take first 500 characters + "..."
-        return text[:500] + "..." 
\ No newline at end of file
+        # Simple approach: take first SUMMARY_MAX_CHARS characters + "..."
+        return text[:SUMMARY_MAX_CHARS] + "..." 
\ No newline at end of file
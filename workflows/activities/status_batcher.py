@@ -0,0 +1,109 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class StatusUpdateBatcher:
+    """Coalesces status writes from concurrent activities into batched flushes
+
+    submit() queues a (key, row) pair and waits until it has been written. A
+    background task drains the queue until max_batch items are held or
+    max_delay seconds have passed since the first one, then calls
+    flush(key, rows) once per key (e.g. per tenant database) in the batch.
+    Rows for the same document are coalesced, the latest one winning.
+    """
+
+    def __init__(self, flush: Callable[[Hashable, List[Dict[str, Any]]], Awaitable[Any]],
+                 max_batch: int = 64, max_delay: float = 0.1):
+        self._flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        """Start the background drain task on the running event loop"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush whatever is queued and stop the drain task"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def submit(self, key: Hashable, row: Dict[str, Any]) -> None:
+        """Queue a row for key and wait until its batch has been written
+
+        Raises:
+            Exception: Whatever the flush for this row's key raised
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((key, row, future))
+        await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[Hashable, Dict[str, Any], asyncio.Future]] = []
+        try:
+            while True:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                self._spawn_flush(batch)
+                batch = []
+        except asyncio.CancelledError:
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if batch:
+                self._spawn_flush(batch)
+            raise
+
+    def _spawn_flush(self, batch) -> None:
+        # Flushes run as their own tasks so one slow database does not hold up
+        # the next batch; the callers' service semaphores bound them
+        task = asyncio.get_running_loop().create_task(self._flush_batch(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush_batch(self, batch) -> None:
+        groups: Dict[Hashable, Dict[Any, Dict[str, Any]]] = {}
+        futures: Dict[Hashable, List[asyncio.Future]] = {}
+        for key, row, future in batch:
+            groups.setdefault(key, {})[row["id"]] = row
+            futures.setdefault(key, []).append(future)
+
+        keys = list(groups)
+        results = await asyncio.gather(
+            *(self._flush(key, list(groups[key].values())) for key in keys),
+            return_exceptions=True
+        )
+        for key, result in zip(keys, results):
+            if isinstance(result, BaseException):
+                logger.error("Batched status update for %s failed: %s", key, result)
+            for future in futures[key]:
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(None)
@@ -1,5 +1,8 @@
+import dataclasses
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
+from temporalio.common import RetryPolicy
 
 # Load environment variables
 load_dotenv()
@@ -15,40 +18,106 @@ class WorkflowConfig:
     # Worker configuration
     WORKER_MAX_CONCURRENT_ACTIVITIES = int(os.getenv("WORKER_MAX_CONCURRENT_ACTIVITIES", "10"))
     WORKER_MAX_CONCURRENT_WORKFLOWS = int(os.getenv("WORKER_MAX_CONCURRENT_WORKFLOWS", "5"))
+    # Threads for blocking service calls made from async activities
+    WORKER_IO_THREADS = int(os.getenv("WORKER_IO_THREADS", str(max(32, (os.cpu_count() or 1) * 4))))
+    # Status writes run as local activities with their own slots, so heavy
+    # step activities filling the slots above never queue them
+    WORKER_MAX_CONCURRENT_LOCAL_ACTIVITIES = int(os.getenv("WORKER_MAX_CONCURRENT_LOCAL_ACTIVITIES", "256"))
+    # Create missing tenant tables at worker startup; turn off where a separate
+    # deploy step runs TenantService.init_schema
+    WORKER_INIT_TENANT_SCHEMA = os.getenv("WORKER_INIT_TENANT_SCHEMA", "1").lower() in ("1", "true")
+    
+    # Per-tenant DocumentServices (each with its own DB pool) kept by a worker; least recently used are closed
+    MAX_TENANT_SERVICES = int(os.getenv("WORKER_MAX_TENANT_SERVICES", "128"))
+    
+    # Files up to this size run extraction and chunking as one activity
+    FUSED_EXTRACT_CHUNK_MAX_BYTES = int(os.getenv("WORKFLOW_FUSED_EXTRACT_CHUNK_MAX_BYTES", str(5 * 1024 * 1024)))
+    
+    # Chunks sampled (evenly spaced, first included) for classification; 0 classifies all
+    CLASSIFY_SAMPLE_CHUNKS = int(os.getenv("WORKFLOW_CLASSIFY_SAMPLE_CHUNKS", "5"))
+    
+    # Length of the placeholder summary; only enough of the extracted text for it is fetched
+    SUMMARY_MAX_CHARS = int(os.getenv("WORKFLOW_SUMMARY_MAX_CHARS", "500"))
+    
+    # Status writes from concurrent activities are flushed together once this
+    # many are queued or the oldest has waited STATUS_BATCH_DELAY_MS
+    STATUS_BATCH_SIZE = int(os.getenv("WORKFLOW_STATUS_BATCH_SIZE", "64"))
+    STATUS_BATCH_DELAY_MS = int(os.getenv("WORKFLOW_STATUS_BATCH_DELAY_MS", "100"))
+    
+    # Batch ingest: documents processed at once, and the history length at which
+    # the batch workflow continues as new with the documents still pending
+    BATCH_MAX_CONCURRENT_DOCUMENTS = int(os.getenv("WORKFLOW_BATCH_MAX_CONCURRENT_DOCUMENTS", "10"))
+    BATCH_HISTORY_EVENT_LIMIT = int(os.getenv("WORKFLOW_BATCH_HISTORY_EVENT_LIMIT", "1000"))
+    
+    # Vectorization fan-out: chunks per embedding call (concurrency is bounded
+    # by VECTOR_MAX_CONCURRENCY)
+    VECTORIZE_BATCH_SIZE = int(os.getenv("WORKFLOW_VECTORIZE_BATCH_SIZE", "96"))
     
     # Timeout configuration
     ACTIVITY_START_TO_CLOSE_TIMEOUT = int(os.getenv("ACTIVITY_START_TO_CLOSE_TIMEOUT", "600"))  # 10 minutes
     WORKFLOW_EXECUTION_TIMEOUT = int(os.getenv("WORKFLOW_EXECUTION_TIMEOUT", "3600"))  # 1 hour
     
     # Retry configuration
-    MAX_RETRY_ATTEMPTS = int(os.getenv("MAX_RETRY_ATTEMPTS", "3"))
+    MAX_RETRY_ATTEMPTS = int(os.getenv("MAX_RETRY_ATTEMPTS", "5"))
     INITIAL_RETRY_INTERVAL = int(os.getenv("INITIAL_RETRY_INTERVAL", "5"))  # seconds
     MAX_RETRY_INTERVAL = int(os.getenv("MAX_RETRY_INTERVAL", "300"))  # 5 minutes
+    RETRY_BACKOFF_COEFFICIENT = float(os.getenv("RETRY_BACKOFF_COEFFICIENT", "2.0"))
+    RETRY_JITTER = float(os.getenv("RETRY_JITTER", "0.1"))  # +/- fraction of INITIAL_RETRY_INTERVAL
+    # Errors that retrying cannot fix; Temporal matches these by exception class name
+    NON_RETRYABLE_ERROR_TYPES = ["ValueError", "InvalidStateTransitionError", "CircuitOpenError"]
+    
+    # Per-worker caps on concurrent calls into each external service, across all activities
+    BLOB_MAX_CONCURRENCY = int(os.getenv("WORKER_BLOB_MAX_CONCURRENCY", "16"))
+    VECTOR_MAX_CONCURRENCY = int(os.getenv("WORKER_VECTOR_MAX_CONCURRENCY", "8"))
+    DB_MAX_CONCURRENCY = int(os.getenv("WORKER_DB_MAX_CONCURRENCY", "32"))
+    
+    # Circuit breakers around blob store, vector DB, tenant and document DBs
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_BREAKER_INITIAL_BACKOFF = float(os.getenv("CIRCUIT_BREAKER_INITIAL_BACKOFF", "1"))  # seconds, doubles per trip up to MAX_RETRY_INTERVAL
     
     # Logging configuration
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT = os.getenv("LOG_FORMAT", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # An explicit datefmt makes asctime a plain strftime, skipping the ",msecs" suffix
+    LOG_DATE_FORMAT = os.getenv("LOG_DATE_FORMAT", "%Y-%m-%d %H:%M:%S")
     
     @classmethod
-    def get_retry_policy(cls):
-        """Get retry policy configuration"""
-        from temporalio.common import RetryPolicy
-        from datetime import timedelta
+    def get_retry_policy(cls, rand=None):
+        """
+        Get retry policy configuration
         
-        return RetryPolicy(
-            initial_interval=timedelta(seconds=cls.INITIAL_RETRY_INTERVAL),
-            maximum_interval=timedelta(seconds=cls.MAX_RETRY_INTERVAL),
-            maximum_attempts=cls.MAX_RETRY_ATTEMPTS
-        )
+        Returns the shared policy built at import. Pass rand (e.g.
+        workflow.random().random, which keeps replays deterministic) to get a
+        copy whose initial interval is jittered by RETRY_JITTER, so workflows
+        that fail together do not retry in lockstep.
+        """
+        if rand is None:
+            return _RETRY_POLICY
+        return cls.jitter_retry_policy(_RETRY_POLICY, rand)
+    
+    @classmethod
+    def jitter_retry_policy(cls, policy, rand):
+        """Copy of policy with its initial interval scaled by a random 1 +/- RETRY_JITTER"""
+        jitter = 1 + cls.RETRY_JITTER * (2 * rand() - 1)
+        return dataclasses.replace(policy, initial_interval=policy.initial_interval * jitter)
     
     @classmethod
     def get_activity_timeout(cls):
         """Get activity timeout configuration"""
-        from datetime import timedelta
-        return timedelta(seconds=cls.ACTIVITY_START_TO_CLOSE_TIMEOUT)
+        return _ACTIVITY_TIMEOUT
     
     @classmethod
     def get_workflow_timeout(cls):
         """Get workflow timeout configuration"""
-        from datetime import timedelta
-        return timedelta(seconds=cls.WORKFLOW_EXECUTION_TIMEOUT) 
\ No newline at end of file
+        return _WORKFLOW_TIMEOUT
+
+# Built once at import; the getters above hand out these shared (immutable) objects
+_RETRY_POLICY = RetryPolicy(
+    initial_interval=timedelta(seconds=WorkflowConfig.INITIAL_RETRY_INTERVAL),
+    backoff_coefficient=WorkflowConfig.RETRY_BACKOFF_COEFFICIENT,
+    maximum_interval=timedelta(seconds=WorkflowConfig.MAX_RETRY_INTERVAL),
+    maximum_attempts=WorkflowConfig.MAX_RETRY_ATTEMPTS,
+    non_retryable_error_types=WorkflowConfig.NON_RETRYABLE_ERROR_TYPES
+)
+_ACTIVITY_TIMEOUT = timedelta(seconds=WorkflowConfig.ACTIVITY_START_TO_CLOSE_TIMEOUT)
+_WORKFLOW_TIMEOUT = timedelta(seconds=WorkflowConfig.WORKFLOW_EXECUTION_TIMEOUT)
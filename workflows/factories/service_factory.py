@@ -1,77 +1,100 @@
-from typing import Optional
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+import importlib
 import logging
 import sys
+import threading
 import os
 
-# Add service paths to sys.path for imports
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'services'))
+# The services are standalone projects importing their own modules top-level
+# (config, models, repositories), so they are reached through a path entry
+# rather than as a package; add it once, even if this module is reloaded
+_SERVICES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services'))
+if _SERVICES_DIR not in sys.path:
+    sys.path.append(_SERVICES_DIR)
+
+# Service modules are imported when the service is first built, so a
+# process only loads (and pays for) the services it actually uses
+if TYPE_CHECKING:
+    from DocumentService.document_service import DocumentService
+    from DocumentProcessing.text_extraction_service import TextExtractionService
+    from DocumentProcessing.chunking_service import ChunkingService
+    from DocumentProcessing.document_classification_service import DocumentClassificationService
+    from VectorDbService.vector_service import VectorDbService
+    from BlobStorageService.blob_service import BlobService
+    from TenantService.tenant_service import TenantService
 
-from DocumentService.document_service import DocumentService
-from DocumentProcessing.text_extraction_service import TextExtractionService
-from DocumentProcessing.chunking_service import ChunkingService
-from DocumentProcessing.document_classification_service import DocumentClassificationService
-from VectorDbService.vector_service import VectorService
-from BlobStorageService.blob_service import BlobStorageService
-from TenantService.tenant_service import TenantService
+from ..config import WorkflowConfig
 
 logger = logging.getLogger(__name__)
 
+# Process-wide services built on first use: name -> (module, class)
+_SERVICE_CLASSES = {
+    "text_extraction": ("DocumentProcessing.text_extraction_service", "TextExtractionService"),
+    "chunking": ("DocumentProcessing.chunking_service", "ChunkingService"),
+    "classification": ("DocumentProcessing.document_classification_service", "DocumentClassificationService"),
+    "vector": ("VectorDbService.vector_service", "VectorDbService"),
+    "blob": ("BlobStorageService.blob_service", "BlobService"),
+    "tenant": ("TenantService.tenant_service", "TenantService"),
+}
+
 class ServiceFactory:
     """Factory for creating and managing service instances"""
     
     def __init__(self):
-        # Singleton instances for stateless services
-        self._text_extraction_service: Optional[TextExtractionService] = None
-        self._chunking_service: Optional[ChunkingService] = None
-        self._classification_service: Optional[DocumentClassificationService] = None
-        self._vector_service: Optional[VectorService] = None
-        self._blob_service: Optional[BlobStorageService] = None
-        self._tenant_service: Optional[TenantService] = None
+        # Singleton instances for stateless services, keyed by _SERVICE_CLASSES name
+        self._services: dict = {}
+        
+        # Document services are created per-tenant (stateful); LRU-bounded by
+        # MAX_TENANT_SERVICES so tenant churn cannot grow DB pools without limit
+        self._document_services: OrderedDict = OrderedDict()
         
-        # Document services are created per-tenant (stateful)
-        self._document_services: dict = {}
+        # _get_service checks without a lock and only locks (and re-checks) on
+        # first use, so concurrent activities never build a service twice
+        self._locks = {name: threading.Lock() for name in _SERVICE_CLASSES}
+        # Guards only the dict operations on _document_services and _tenant_locks
+        self._doc_lock = threading.Lock()
+        # tenant_id -> lock held while that tenant's DocumentService is being built
+        self._tenant_locks: dict = {}
+    
+    def _get_service(self, name: str):
+        """Get or create the singleton service registered under name"""
+        service = self._services.get(name)
+        if service is None:
+            with self._locks[name]:
+                service = self._services.get(name)
+                if service is None:
+                    module_name, class_name = _SERVICE_CLASSES[name]
+                    logger.info("Creating %s instance", class_name)
+                    service = getattr(importlib.import_module(module_name), class_name)()
+                    self._services[name] = service
+        return service
     
     def get_text_extraction_service(self) -> TextExtractionService:
         """Get or create text extraction service (singleton)"""
-        if self._text_extraction_service is None:
-            logger.info("Creating TextExtractionService instance")
-            self._text_extraction_service = TextExtractionService()
-        return self._text_extraction_service
+        return self._get_service("text_extraction")
     
     def get_chunking_service(self) -> ChunkingService:
         """Get or create chunking service (singleton)"""
-        if self._chunking_service is None:
-            logger.info("Creating ChunkingService instance")
-            self._chunking_service = ChunkingService()
-        return self._chunking_service
+        return self._get_service("chunking")
     
     def get_classification_service(self) -> DocumentClassificationService:
         """Get or create classification service (singleton)"""
-        if self._classification_service is None:
-            logger.info("Creating DocumentClassificationService instance")
-            self._classification_service = DocumentClassificationService()
-        return self._classification_service
+        return self._get_service("classification")
     
-    def get_vector_service(self) -> VectorService:
+    def get_vector_service(self) -> VectorDbService:
         """Get or create vector service (singleton)"""
-        if self._vector_service is None:
-            logger.info("Creating VectorService instance")
-            self._vector_service = VectorService()
-        return self._vector_service
+        return self._get_service("vector")
     
-    def get_blob_service(self) -> BlobStorageService:
+    def get_blob_service(self) -> BlobService:
         """Get or create blob service (singleton)"""
-        if self._blob_service is None:
-            logger.info("Creating BlobStorageService instance")
-            self._blob_service = BlobStorageService()
-        return self._blob_service
+        return self._get_service("blob")
     
     def get_tenant_service(self) -> TenantService:
         """Get or create tenant service (singleton)"""
-        if self._tenant_service is None:
-            logger.info("Creating TenantService instance")
-            self._tenant_service = TenantService()
-        return self._tenant_service
+        return self._get_service("tenant")
     
     def get_document_service(self, tenant_id: str) -> DocumentService:
         """
@@ -83,20 +106,57 @@ class ServiceFactory:
         Returns:
             DocumentService instance for the tenant
         """
-        if tenant_id not in self._document_services:
-            logger.info(f"Creating DocumentService instance for tenant {tenant_id}")
-            
-            # Get tenant info to get database URL
-            tenant_service = self.get_tenant_service()
-            tenant_info = tenant_service.get_tenant(tenant_id)
-            
-            if not tenant_info:
-                raise ValueError(f"Tenant {tenant_id} not found")
-            
-            # Create document service with tenant-specific database
-            self._document_services[tenant_id] = DocumentService(tenant_info.database_url)
+        with self._doc_lock:
+            document_service = self._document_services.get(tenant_id)
+            if document_service is not None:
+                self._document_services.move_to_end(tenant_id)
+                return document_service
+            tenant_lock = self._tenant_locks.setdefault(tenant_id, threading.Lock())
+        
+        # The tenant lookup and DocumentService (engine) construction run under
+        # this tenant's lock only, so other tenants' lookups are never held up
+        with tenant_lock:
+            try:
+                with self._doc_lock:
+                    document_service = self._document_services.get(tenant_id)
+                    if document_service is not None:
+                        self._document_services.move_to_end(tenant_id)
+                        return document_service
+                
+                logger.info("Creating DocumentService instance for tenant %s", tenant_id)
+                
+                # Get tenant info to get database URL
+                tenant_service = self.get_tenant_service()
+                tenant_info = tenant_service.get_tenant(tenant_id)
+                
+                if not tenant_info:
+                    raise ValueError(f"Tenant {tenant_id} not found")
+                
+                # Create document service with tenant-specific database
+                from DocumentService.document_service import DocumentService
+                document_service = DocumentService(tenant_info.database_url)
+                
+                evicted = []
+                with self._doc_lock:
+                    existing = self._document_services.get(tenant_id)
+                    if existing is not None:
+                        # Built concurrently through a newer lock for this tenant
+                        evicted.append((tenant_id, document_service))
+                        document_service = existing
+                    else:
+                        self._document_services[tenant_id] = document_service
+                    while len(self._document_services) > WorkflowConfig.MAX_TENANT_SERVICES:
+                        evicted.append(self._document_services.popitem(last=False))
+            finally:
+                with self._doc_lock:
+                    if self._tenant_locks.get(tenant_id) is tenant_lock:
+                        del self._tenant_locks[tenant_id]
         
-        return self._document_services[tenant_id]
+        for evicted_tenant_id, evicted_service in evicted:
+            logger.info("Closing DocumentService instance for tenant %s", evicted_tenant_id)
+            evicted_service.close()
+        
+        return document_service
     
     def create_document_service(self, database_url: str) -> DocumentService:
         """
@@ -108,38 +168,51 @@ class ServiceFactory:
         Returns:
             New DocumentService instance
         """
-        logger.info(f"Creating new DocumentService instance with database URL")
+        from DocumentService.document_service import DocumentService
+        logger.info("Creating new DocumentService instance with database URL")
         return DocumentService(database_url)
     
     def clear_document_services(self):
         """Clear cached document services (useful for testing)"""
-        self._document_services.clear()
+        with self._doc_lock:
+            for document_service in self._document_services.values():
+                document_service.close()
+            self._document_services.clear()
         logger.info("Cleared cached document services")
     
-    def get_service_summary(self) -> dict:
-        """Get summary of created services for monitoring"""
-        return {
-            "text_extraction_service": self._text_extraction_service is not None,
-            "chunking_service": self._chunking_service is not None,
-            "classification_service": self._classification_service is not None,
-            "vector_service": self._vector_service is not None,
-            "blob_service": self._blob_service is not None,
-            "tenant_service": self._tenant_service is not None,
-            "document_services_count": len(self._document_services),
-            "document_services_tenants": list(self._document_services.keys())
+    def get_service_summary(self, include_tenant_ids: bool = False) -> dict:
+        """
+        Get summary of created services for monitoring
+        
+        Args:
+            include_tenant_ids: Also list the tenants with a cached DocumentService
+                (O(tenants), taken under the cache lock; for debugging); by default
+                only counts are returned and no lock is taken
+        """
+        summary = {
+            **{f"{name}_service": name in self._services for name in _SERVICE_CLASSES},
+            "document_services_count": len(self._document_services)
         }
+        if include_tenant_ids:
+            with self._doc_lock:
+                summary["document_services_tenants"] = list(self._document_services)
+        return summary
 
 # Global factory instance
 _service_factory: Optional[ServiceFactory] = None
+_factory_lock = threading.Lock()
 
 def get_service_factory() -> ServiceFactory:
     """Get the global service factory instance"""
     global _service_factory
     if _service_factory is None:
-        _service_factory = ServiceFactory()
+        with _factory_lock:
+            if _service_factory is None:
+                _service_factory = ServiceFactory()
     return _service_factory
 
 def reset_service_factory():
     """Reset the global service factory (useful for testing)"""
     global _service_factory
-    _service_factory = None 
\ No newline at end of file
+    with _factory_lock:
+        _service_factory = None 
\ No newline at end of file
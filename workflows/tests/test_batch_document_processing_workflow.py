@@ -0,0 +1,132 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the repository root to the path so we can import the workflows package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from workflows.config import WorkflowConfig
+from workflows.workflows import batch_document_processing_workflow as batch_module
+from workflows.workflows.batch_document_processing_workflow import (
+    BatchDocumentProcessingInput,
+    BatchDocumentProcessingWorkflow,
+)
+from workflows.workflows.document_processing_workflow import DocumentProcessingInput
+
+class ContinuedAsNew(Exception):
+    """Raised by the fake continue_as_new, which never returns in a real workflow"""
+
+    def __init__(self, input_data):
+        super().__init__("continue as new")
+        self.input_data = input_data
+
+class FakeInfo:
+    def __init__(self, history):
+        self.history = history
+        self.suggested = False
+
+    def get_current_history_length(self):
+        return self.history["length"]
+
+    def is_continue_as_new_suggested(self):
+        return self.suggested
+
+class FakeWorkflow:
+    """Stands in for the temporalio workflow module inside the batch workflow"""
+
+    def __init__(self, fail_ids=(), events_per_child=0):
+        self.fail_ids = set(fail_ids)
+        self.events_per_child = events_per_child
+        self.history = {"length": 0}
+        self.info_result = FakeInfo(self.history)
+        self.windows = []
+        self._current = None
+
+    def info(self):
+        # Each call to info() opens a new window of children
+        self._current = []
+        self.windows.append(self._current)
+        return self.info_result
+
+    def continue_as_new(self, input_data):
+        raise ContinuedAsNew(input_data)
+
+    async def execute_child_workflow(self, run, document, id):
+        self._current.append(id)
+        await asyncio.sleep(0)
+        self.history["length"] += self.events_per_child
+        if document.document_id in self.fail_ids:
+            raise RuntimeError(f"{document.document_id} failed")
+        return {"status": "completed"}
+
+@pytest.fixture
+def fake_workflow(monkeypatch):
+    fake = FakeWorkflow()
+    monkeypatch.setattr(batch_module, "workflow", fake)
+    monkeypatch.setattr(WorkflowConfig, "BATCH_MAX_CONCURRENT_DOCUMENTS", 2)
+    monkeypatch.setattr(WorkflowConfig, "BATCH_HISTORY_EVENT_LIMIT", 100)
+    return fake
+
+def _documents(count):
+    return [
+        DocumentProcessingInput(
+            document_id=f"doc-{i}", tenant_id="tenant-a", file_path=f"documents/doc-{i}.pdf",
+            file_name=f"doc-{i}.pdf", mime_type="application/pdf", file_size=1024, created_by="tester"
+        )
+        for i in range(count)
+    ]
+
+def _run(input_data):
+    return asyncio.run(BatchDocumentProcessingWorkflow().run(input_data))
+
+def test_processes_documents_a_window_at_a_time(fake_workflow):
+    result = _run(BatchDocumentProcessingInput(documents=_documents(5)))
+    assert fake_workflow.windows == [
+        ["document-processing-doc-0", "document-processing-doc-1"],
+        ["document-processing-doc-2", "document-processing-doc-3"],
+        ["document-processing-doc-4"],
+    ]
+    assert result == {
+        "status": "completed",
+        "completed_count": 5,
+        "failed_count": 0,
+        "failed_document_ids": [],
+    }
+
+def test_counts_failed_children(fake_workflow):
+    fake_workflow.fail_ids = {"doc-1", "doc-2"}
+    result = _run(BatchDocumentProcessingInput(documents=_documents(4)))
+    assert result["completed_count"] == 2
+    assert result["failed_count"] == 2
+    assert result["failed_document_ids"] == ["doc-1", "doc-2"]
+
+def test_carries_totals_from_previous_runs(fake_workflow):
+    fake_workflow.fail_ids = {"doc-0"}
+    result = _run(BatchDocumentProcessingInput(
+        documents=_documents(2), completed_count=10, failed_count=1, failed_document_ids=["doc-earlier"]
+    ))
+    assert result["completed_count"] == 11
+    assert result["failed_count"] == 2
+    assert result["failed_document_ids"] == ["doc-earlier", "doc-0"]
+
+def test_continues_as_new_at_the_history_limit(fake_workflow):
+    fake_workflow.fail_ids = {"doc-1"}
+    fake_workflow.events_per_child = 50
+    with pytest.raises(ContinuedAsNew) as continued:
+        _run(BatchDocumentProcessingInput(documents=_documents(5)))
+
+    carried = continued.value.input_data
+    # The first window took history to the limit, so the second never started
+    assert [document.document_id for document in carried.documents] == ["doc-2", "doc-3", "doc-4"]
+    assert carried.completed_count == 1
+    assert carried.failed_count == 1
+    assert carried.failed_document_ids == ["doc-1"]
+
+def test_continues_as_new_when_suggested(fake_workflow):
+    fake_workflow.info_result.suggested = True
+    with pytest.raises(ContinuedAsNew) as continued:
+        _run(BatchDocumentProcessingInput(documents=_documents(3)))
+    assert len(continued.value.input_data.documents) == 3
+    assert fake_workflow.windows == [[]]
@@ -0,0 +1,31 @@
+import os
+import random
+import sys
+from datetime import timedelta
+
+# Add the repository root to the path so we can import the workflows package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from workflows.config import WorkflowConfig
+
+def test_get_retry_policy_without_rand_is_shared():
+    assert WorkflowConfig.get_retry_policy() is WorkflowConfig.get_retry_policy()
+    assert WorkflowConfig.get_retry_policy().maximum_attempts == WorkflowConfig.MAX_RETRY_ATTEMPTS
+
+def test_jittered_interval_stays_within_bounds():
+    base = WorkflowConfig.get_retry_policy()
+    low = base.initial_interval * (1 - WorkflowConfig.RETRY_JITTER)
+    high = base.initial_interval * (1 + WorkflowConfig.RETRY_JITTER)
+    rand = random.Random(7).random
+    intervals = {WorkflowConfig.get_retry_policy(rand).initial_interval for _ in range(50)}
+    assert all(low <= interval <= high for interval in intervals)
+    assert len(intervals) > 1
+
+def test_jitter_keeps_the_rest_of_the_policy():
+    base = WorkflowConfig.get_retry_policy()
+    jittered = WorkflowConfig.jitter_retry_policy(base, lambda: 1.0)
+    assert jittered.initial_interval == base.initial_interval * (1 + WorkflowConfig.RETRY_JITTER)
+    assert jittered.maximum_interval == base.maximum_interval
+    assert jittered.maximum_attempts == base.maximum_attempts
+    assert jittered.non_retryable_error_types == base.non_retryable_error_types
+    assert base.initial_interval == timedelta(seconds=WorkflowConfig.INITIAL_RETRY_INTERVAL)
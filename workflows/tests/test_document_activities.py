@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# Add the repository root to the path so we can import the workflows package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from workflows.activities import document_activities
+from workflows.activities.document_activities import DocumentActivities
+from workflows.config import WorkflowConfig
+
+# A chunks.json blob as written by the chunking activities
+CHUNKS_JSON = json.dumps([f"Section {i} of the agreement." for i in range(12)])
+
+class FakeTenantService:
+    def get_tenant(self, tenant_id):
+        return {"id": tenant_id}
+
+class FakeBlobService:
+    def __init__(self):
+        self.blobs = {"documents/doc-1/chunks.json": CHUNKS_JSON}
+
+    def download_json(self, blob_path):
+        return json.loads(self.blobs[blob_path])
+
+class FakeClassificationService:
+    def __init__(self):
+        self.calls = []
+
+    def classify_document(self, chunks):
+        self.calls.append(chunks)
+        return "contract", {"final_document_type": "contract", "overall_confidence": 0.87}
+
+class FakeDocumentService:
+    def __init__(self):
+        self.status_rows = []
+        self.completions = []
+
+    def update_document_statuses(self, rows):
+        self.status_rows.extend(rows)
+
+    def add_metadata_and_update_status(self, document_id, metadata_entries, status,
+                                       step=None, document_fields=None):
+        self.completions.append((document_id, metadata_entries, status, document_fields))
+        return True
+
+class FakeServiceFactory:
+    def __init__(self):
+        self.blob_service = FakeBlobService()
+        self.classification_service = FakeClassificationService()
+        self.document_service = FakeDocumentService()
+        self.document_service_tenants = []
+
+    def get_tenant_service(self):
+        return FakeTenantService()
+
+    def get_text_extraction_service(self):
+        return None
+
+    def get_chunking_service(self):
+        return None
+
+    def get_classification_service(self):
+        return self.classification_service
+
+    def get_vector_service(self):
+        return None
+
+    def get_blob_service(self):
+        return self.blob_service
+
+    def get_document_service(self, tenant_id):
+        self.document_service_tenants.append(tenant_id)
+        return self.document_service
+
+@pytest.fixture
+def factory(monkeypatch):
+    fake = FakeServiceFactory()
+    monkeypatch.setattr(document_activities, "get_service_factory", lambda: fake)
+    monkeypatch.setattr(WorkflowConfig, "CLASSIFY_SAMPLE_CHUNKS", 4)
+    return fake
+
+def test_classify_document_activity_classifies_a_chunks_json_payload(factory):
+    async def run():
+        activities = DocumentActivities()
+        try:
+            return await activities.classify_document_activity({"document_id": "doc-1", "tenant_id": "tenant-a"})
+        finally:
+            await activities.status_batcher.stop()
+
+    result = asyncio.run(run())
+    assert result["document_type"] == "contract"
+    assert result["confidence_score"] == 0.87
+
+    chunks = json.loads(CHUNKS_JSON)
+    assert factory.classification_service.calls == [[chunks[0], chunks[3], chunks[6], chunks[9]]]
+
+    assert factory.document_service.status_rows[0]["status"] == "classifying"
+    [(document_id, metadata_entries, status, document_fields)] = factory.document_service.completions
+    assert document_id == "doc-1"
+    assert status == "classified"
+    assert document_fields == {"document_type": "contract", "confidence_score": 0.87}
+    assert metadata_entries[0]["value"]["num_chunks_classified"] == 4
+
+def test_update_document_status_activity_writes_to_the_given_tenant(factory):
+    async def run():
+        activities = DocumentActivities()
+        try:
+            await activities.update_document_status_activity(
+                {"document_id": "doc-1", "tenant_id": "tenant-b", "status": "completed"}
+            )
+        finally:
+            await activities.status_batcher.stop()
+
+    asyncio.run(run())
+    assert factory.document_service_tenants == ["tenant-b"]
+    assert factory.document_service.status_rows == [{"id": "doc-1", "status": "completed", "processing_step": None}]
+
+def test_sample_chunks_keeps_all_when_k_covers_them():
+    chunks = ["a", "b", "c"]
+    assert DocumentActivities._sample_chunks(chunks, 3) == chunks
+    assert DocumentActivities._sample_chunks(chunks, 10) == chunks
+
+def test_sample_chunks_keeps_all_when_k_is_not_positive():
+    chunks = ["a", "b", "c"]
+    assert DocumentActivities._sample_chunks(chunks, 0) == chunks
+    assert DocumentActivities._sample_chunks(chunks, -1) == chunks
+
+def test_sample_chunks_picks_evenly_spaced_chunks():
+    chunks = list(range(10))
+    assert DocumentActivities._sample_chunks(chunks, 5) == [0, 2, 4, 6, 8]
+    assert DocumentActivities._sample_chunks(chunks, 3) == [0, 3, 6]
+
+def test_sample_chunks_always_includes_the_first_chunk():
+    chunks = list(range(7))
+    for k in range(1, 7):
+        sample = DocumentActivities._sample_chunks(chunks, k)
+        assert len(sample) == k
+        assert sample[0] == 0
+        assert sample == sorted(set(sample))
+
+def test_sample_chunks_of_empty_list():
+    assert DocumentActivities._sample_chunks([], 4) == []
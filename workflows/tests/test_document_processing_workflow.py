@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add the repository root to the path so we can import the workflows package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from shared.document_state_machine import DocumentState
+from workflows.workflows.document_processing_workflow import DocumentProcessingWorkflow, WorkflowState
+
+class StepError(Exception):
+    pass
+
+def _workflow(events):
+    """A workflow whose step-failure write is recorded in events instead of run"""
+    workflow = DocumentProcessingWorkflow()
+
+    async def record_failure(state, step, error_message):
+        events.append(f"marked failed at {step}: {error_message}")
+        state.current_state = DocumentState.FAILED
+
+    workflow._handle_step_failure = record_failure
+    return workflow
+
+def _state():
+    return WorkflowState(document_id="doc-1", tenant_id="tenant-a", current_state=DocumentState.CHUNKED)
+
+def test_run_branches_runs_all_branches():
+    finished = []
+
+    async def branch(name, delay):
+        await asyncio.sleep(delay)
+        finished.append(name)
+
+    events = []
+    asyncio.run(_workflow(events)._run_branches(
+        _state(),
+        ("classification", branch("classify", 0.02)),
+        ("vectorization", branch("vectorize", 0.01)),
+        ("summarization", branch("summarize", 0))
+    ))
+    assert sorted(finished) == ["classify", "summarize", "vectorize"]
+    assert events == []
+
+def test_run_branches_marks_failed_after_siblings_settle():
+    events = []
+
+    async def failing():
+        await asyncio.sleep(0)
+        events.append("failed")
+        raise StepError("classification failed")
+
+    async def slow(name):
+        try:
+            await asyncio.sleep(10)
+            events.append(f"{name} finished")
+        except asyncio.CancelledError:
+            # Stands in for waiting on the activity, which writes its status as it finishes
+            await asyncio.sleep(0.01)
+            events.append(f"{name} cancelled")
+            raise
+
+    state = _state()
+
+    async def run():
+        with pytest.raises(StepError, match="classification failed"):
+            await _workflow(events)._run_branches(
+                state,
+                ("classification", failing()),
+                ("vectorization", slow("vectorize")),
+                ("summarization", slow("summarize"))
+            )
+        events.append("raised")
+
+    asyncio.run(run())
+    assert events[0] == "failed"
+    assert sorted(events[1:3]) == ["summarize cancelled", "vectorize cancelled"]
+    assert events[3:] == ["marked failed at classification: classification failed", "raised"]
+    assert state.current_state is DocumentState.FAILED
+
+def test_run_branches_marks_first_failure_in_branch_order_once():
+    async def failing(message):
+        raise StepError(message)
+
+    events = []
+    with pytest.raises(StepError, match="vectorization failed"):
+        asyncio.run(_workflow(events)._run_branches(
+            _state(),
+            ("vectorization", failing("vectorization failed")),
+            ("summarization", failing("summarization failed"))
+        ))
+    assert events == ["marked failed at vectorization: vectorization failed"]
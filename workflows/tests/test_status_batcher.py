@@ -0,0 +1,114 @@
+import asyncio
+import os
+import sys
+
+# Add the repository root to the path so we can import the workflows package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from workflows.activities.status_batcher import StatusUpdateBatcher
+
+class FlushError(Exception):
+    pass
+
+class RecordingFlush:
+    """Records each flush(key, rows) call, failing for the keys in fail_keys"""
+
+    def __init__(self, fail_keys=()):
+        self.calls = []
+        self.fail_keys = set(fail_keys)
+
+    async def __call__(self, key, rows):
+        self.calls.append((key, rows))
+        if key in self.fail_keys:
+            raise FlushError(f"flush for {key} failed")
+
+def test_coalesces_rows_for_the_same_document():
+    flush = RecordingFlush()
+
+    async def run():
+        batcher = StatusUpdateBatcher(flush, max_batch=10, max_delay=0.05)
+        await asyncio.gather(
+            batcher.submit("tenant-a", {"id": "doc-1", "status": "chunking"}),
+            batcher.submit("tenant-a", {"id": "doc-2", "status": "chunking"}),
+            batcher.submit("tenant-a", {"id": "doc-1", "status": "chunked"}),
+        )
+        await batcher.stop()
+
+    asyncio.run(run())
+    assert len(flush.calls) == 1
+    key, rows = flush.calls[0]
+    assert key == "tenant-a"
+    assert sorted(rows, key=lambda row: row["id"]) == [
+        {"id": "doc-1", "status": "chunked"},
+        {"id": "doc-2", "status": "chunking"},
+    ]
+
+def test_flushes_once_per_key():
+    flush = RecordingFlush()
+
+    async def run():
+        batcher = StatusUpdateBatcher(flush, max_batch=10, max_delay=0.05)
+        await asyncio.gather(
+            batcher.submit("tenant-a", {"id": "doc-1", "status": "chunked"}),
+            batcher.submit("tenant-b", {"id": "doc-2", "status": "chunked"}),
+            batcher.submit("tenant-a", {"id": "doc-3", "status": "chunked"}),
+        )
+        await batcher.stop()
+
+    asyncio.run(run())
+    calls = {key: sorted(row["id"] for row in rows) for key, rows in flush.calls}
+    assert len(flush.calls) == 2
+    assert calls == {"tenant-a": ["doc-1", "doc-3"], "tenant-b": ["doc-2"]}
+
+def test_full_batch_flushes_without_waiting_for_the_delay():
+    flush = RecordingFlush()
+
+    async def run():
+        batcher = StatusUpdateBatcher(flush, max_batch=2, max_delay=10)
+        await asyncio.wait_for(asyncio.gather(
+            batcher.submit("tenant-a", {"id": "doc-1", "status": "chunked"}),
+            batcher.submit("tenant-a", {"id": "doc-2", "status": "chunked"}),
+        ), timeout=1)
+        await batcher.stop()
+
+    asyncio.run(run())
+    assert len(flush.calls) == 1
+
+def test_flush_error_reaches_only_that_keys_submitters():
+    flush = RecordingFlush(fail_keys={"tenant-b"})
+
+    async def run():
+        batcher = StatusUpdateBatcher(flush, max_batch=10, max_delay=0.05)
+        results = await asyncio.gather(
+            batcher.submit("tenant-a", {"id": "doc-1", "status": "chunked"}),
+            batcher.submit("tenant-b", {"id": "doc-2", "status": "chunked"}),
+            batcher.submit("tenant-b", {"id": "doc-3", "status": "chunked"}),
+            return_exceptions=True
+        )
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert results[0] is None
+    assert all(isinstance(result, FlushError) for result in results[1:])
+
+def test_stop_drains_queued_rows():
+    flush = RecordingFlush()
+
+    async def run():
+        # A delay long enough that only stop() can flush the batch
+        batcher = StatusUpdateBatcher(flush, max_batch=10, max_delay=10)
+        submits = [
+            asyncio.ensure_future(batcher.submit("tenant-a", {"id": f"doc-{i}", "status": "chunked"}))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        assert flush.calls == []
+        await batcher.stop()
+        await asyncio.wait_for(asyncio.gather(*submits), timeout=1)
+
+    asyncio.run(run())
+    assert sum(len(rows) for _, rows in flush.calls) == 3
+
+def test_stop_without_start_is_a_no_op():
+    asyncio.run(StatusUpdateBatcher(RecordingFlush()).stop())
@@ -1,13 +1,16 @@
 import asyncio
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from temporalio.client import Client
 from temporalio.worker import Worker
 
 from workflows.workflows.document_processing_workflow import DocumentProcessingWorkflow
+from workflows.workflows.batch_document_processing_workflow import BatchDocumentProcessingWorkflow
 from workflows.activities.document_activities import DocumentActivities
 from workflows.factories.service_factory import get_service_factory
+from workflows.config import WorkflowConfig
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +21,7 @@ class DocumentProcessingWorker:
         self.temporal_server_url = temporal_server_url
         self.client: Optional[Client] = None
         self.worker: Optional[Worker] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
         
         # Get service factory for dependency injection
         self.service_factory = get_service_factory()
@@ -31,20 +35,52 @@ class DocumentProcessingWorker:
             self.service_factory.get_classification_service()
             self.service_factory.get_vector_service()
             self.service_factory.get_blob_service()
-            self.service_factory.get_tenant_service()
+            tenant_service = self.service_factory.get_tenant_service()
+            
+            # Tenant repositories no longer create their tables on construction
+            if WorkflowConfig.WORKER_INIT_TENANT_SCHEMA:
+                await asyncio.to_thread(tenant_service.init_schema)
             
             logger.info("All services initialized successfully")
             
+            await self.warmup_services()
+            
         except Exception as e:
-            logger.error(f"Failed to initialize services: {str(e)}")
+            logger.error("Failed to initialize services: %s", e)
             raise
     
+    async def warmup_services(self):
+        """Open remote connections for all network-backed services concurrently"""
+        services = [
+            self.service_factory.get_vector_service(),
+            self.service_factory.get_blob_service(),
+            self.service_factory.get_tenant_service(),
+        ]
+        # The clients are synchronous, so each probe runs in a worker thread
+        results = await asyncio.gather(
+            *(asyncio.to_thread(service.warmup) for service in services),
+            return_exceptions=True
+        )
+        # Warmup only moves connection cost to startup; a failed probe is retried
+        # lazily by the first activity instead of failing the worker
+        for service, result in zip(services, results):
+            if isinstance(result, Exception):
+                logger.warning("Warmup failed for %s: %s", type(service).__name__, result)
+    
     async def start(self, task_queue: str = "document-processing"):
         """Start the Temporal worker"""
         try:
+            # Every blocking service call (asyncio.to_thread in activities, the
+            # status batcher and warmup) runs on one bounded, named pool
+            self._executor = ThreadPoolExecutor(
+                max_workers=WorkflowConfig.WORKER_IO_THREADS,
+                thread_name_prefix="doc-io"
+            )
+            asyncio.get_running_loop().set_default_executor(self._executor)
+            
             # Connect to Temporal server
             self.client = await Client.connect(self.temporal_server_url)
-            logger.info(f"Connected to Temporal server at {self.temporal_server_url}")
+            logger.info("Connected to Temporal server at %s", self.temporal_server_url)
             
             # Initialize services
             await self.initialize_services()
@@ -56,23 +92,31 @@ class DocumentProcessingWorker:
             self.worker = Worker(
                 self.client,
                 task_queue=task_queue,
-                workflows=[DocumentProcessingWorkflow],
+                workflows=[DocumentProcessingWorkflow, BatchDocumentProcessingWorkflow],
                 activities=[
                     activities.extract_text_activity,
                     activities.chunk_document_activity,
+                    activities.extract_and_chunk_activity,
                     activities.classify_document_activity,
                     activities.vectorize_document_activity,
                     activities.summarize_document_activity,
                     activities.update_document_status_activity,
                     activities.mark_document_failed_activity,
-                ]
+                ],
+                max_concurrent_activities=WorkflowConfig.WORKER_MAX_CONCURRENT_ACTIVITIES,
+                max_concurrent_workflow_tasks=WorkflowConfig.WORKER_MAX_CONCURRENT_WORKFLOWS,
+                max_concurrent_local_activities=WorkflowConfig.WORKER_MAX_CONCURRENT_LOCAL_ACTIVITIES
             )
             
-            logger.info(f"Starting worker on task queue: {task_queue}")
-            await self.worker.run()
+            logger.info("Starting worker on task queue: %s", task_queue)
+            activities.status_batcher.start()
+            try:
+                await self.worker.run()
+            finally:
+                await activities.status_batcher.stop()
             
         except Exception as e:
-            logger.error(f"Failed to start worker: {str(e)}")
+            logger.error("Failed to start worker: %s", e)
             raise
     
     async def stop(self):
@@ -95,19 +139,40 @@ class DocumentProcessingWorker:
                 task_queue="document-processing"
             )
             
-            logger.info(f"Started document processing workflow: {handle.id}")
+            logger.info("Started document processing workflow: %s", handle.id)
+            return handle.id
+            
+        except Exception as e:
+            logger.error("Failed to start document processing workflow: %s", e)
+            raise
+    
+    async def start_batch_processing(self, batch_id: str, documents: list) -> str:
+        """Start a batch workflow processing documents (document processing input dicts) in windows"""
+        if not self.client:
+            raise RuntimeError("Worker not started. Call start() first.")
+        
+        try:
+            handle = await self.client.start_workflow(
+                BatchDocumentProcessingWorkflow.run,
+                {"documents": documents},
+                id=f"batch-document-processing-{batch_id}",
+                task_queue="document-processing"
+            )
+            
+            logger.info("Started batch document processing workflow: %s", handle.id)
             return handle.id
             
         except Exception as e:
-            logger.error(f"Failed to start document processing workflow: {str(e)}")
+            logger.error("Failed to start batch document processing workflow: %s", e)
             raise
 
 async def main():
     """Main function to run the worker"""
     # Configure logging
     logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        level=WorkflowConfig.LOG_LEVEL,
+        format=WorkflowConfig.LOG_FORMAT,
+        datefmt=WorkflowConfig.LOG_DATE_FORMAT
     )
     
     # Get configuration from environment
@@ -0,0 +1,89 @@
+from typing import Dict, Any, List
+import asyncio
+import logging
+from temporalio import workflow
+from dataclasses import dataclass, field
+
+from workflows.workflows.document_processing_workflow import DocumentProcessingInput, DocumentProcessingWorkflow
+
+with workflow.unsafe.imports_passed_through():
+    from workflows.config import WorkflowConfig
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BatchDocumentProcessingInput:
+    """Input data for batch document processing workflow"""
+    documents: List[DocumentProcessingInput]
+    # Totals carried across continue-as-new runs
+    completed_count: int = 0
+    failed_count: int = 0
+    failed_document_ids: List[str] = field(default_factory=list)
+
+@workflow.defn
+class BatchDocumentProcessingWorkflow:
+    """Temporal workflow for ingesting a tenant's documents as one long-running batch
+
+    Documents are processed as DocumentProcessingWorkflow children, a window at
+    a time. Between windows the workflow continues as new with the remaining
+    documents once its history nears BATCH_HISTORY_EVENT_LIMIT, so replay cost
+    stays bounded however many documents the batch holds.
+    """
+
+    @workflow.run
+    async def run(self, input_data: BatchDocumentProcessingInput) -> Dict[str, Any]:
+        """
+        Main workflow execution
+
+        Args:
+            input_data: Documents still to process and totals so far
+
+        Returns:
+            Batch result with completed/failed counts
+        """
+        pending = list(input_data.documents)
+        completed_count = input_data.completed_count
+        failed_count = input_data.failed_count
+        failed_document_ids = list(input_data.failed_document_ids)
+        window_size = max(WorkflowConfig.BATCH_MAX_CONCURRENT_DOCUMENTS, 1)
+
+        while pending:
+            info = workflow.info()
+            if (info.get_current_history_length() >= WorkflowConfig.BATCH_HISTORY_EVENT_LIMIT
+                    or info.is_continue_as_new_suggested()):
+                logger.info("Continuing batch as new with %s documents remaining", len(pending))
+                workflow.continue_as_new(BatchDocumentProcessingInput(
+                    documents=pending,
+                    completed_count=completed_count,
+                    failed_count=failed_count,
+                    failed_document_ids=failed_document_ids
+                ))
+
+            window, pending = pending[:window_size], pending[window_size:]
+            results = await asyncio.gather(
+                *(self._process_document(document) for document in window),
+                return_exceptions=True
+            )
+            for document, result in zip(window, results):
+                if isinstance(result, BaseException):
+                    failed_count += 1
+                    failed_document_ids.append(document.document_id)
+                else:
+                    completed_count += 1
+
+        return {
+            "status": "completed",
+            "completed_count": completed_count,
+            "failed_count": failed_count,
+            "failed_document_ids": failed_document_ids
+        }
+
+    async def _process_document(self, document: DocumentProcessingInput) -> Dict[str, Any]:
+        """Run the per-document pipeline as a child workflow"""
+        # Same ID scheme as single-document starts, so a document is never
+        # processed twice concurrently
+        return await workflow.execute_child_workflow(
+            DocumentProcessingWorkflow.run,
+            document,
+            id=f"document-processing-{document.document_id}"
+        )
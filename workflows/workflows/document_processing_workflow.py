@@ -1,15 +1,53 @@
 from datetime import timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set
+import asyncio
 import logging
+import sys
 from temporalio import workflow
 from temporalio.common import RetryPolicy
-from dataclasses import dataclass
+from temporalio.workflow import ActivityCancellationType
+from dataclasses import dataclass, field
 
 from shared.document_state_machine import DocumentState, DocumentStateMachine
 
+with workflow.unsafe.imports_passed_through():
+    from workflows.config import WorkflowConfig
+
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Slotted dataclasses (no per-instance __dict__) where supported; the package
+# still supports Python 3.9, which lacks dataclass(slots=True)
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Built once at import rather than on every step (and again on every replay).
+# Short single-call steps back off quickly; long steps calling the flaky
+# external services use the configured policy (MAX_RETRY_ATTEMPTS etc.). Both
+# skip errors retrying cannot fix, and each run jitters them (see run()).
+_RETRY_FAST = RetryPolicy(
+    initial_interval=timedelta(seconds=1),
+    backoff_coefficient=2.0,
+    maximum_interval=timedelta(seconds=15),
+    maximum_attempts=3,
+    non_retryable_error_types=WorkflowConfig.NON_RETRYABLE_ERROR_TYPES
+)
+_RETRY_LONG = WorkflowConfig.get_retry_policy()
+
+_TIMEOUT_EXTRACT = timedelta(minutes=10)
+_TIMEOUT_CHUNK = timedelta(minutes=5)
+_TIMEOUT_CLASSIFY = timedelta(minutes=5)
+_TIMEOUT_VECTORIZE = timedelta(minutes=10)
+_TIMEOUT_SUMMARIZE = timedelta(minutes=5)
+_TIMEOUT_STATUS = timedelta(seconds=5)
+
+# A cancelled fan-out branch waits for its activity to actually stop. The step
+# activities do not heartbeat, so they only stop once they finish (and write
+# their status); _run_branches marks the document failed after that
+_CANCEL_BRANCH = ActivityCancellationType.WAIT_CANCELLATION_COMPLETED
+
+# State strings sent to activities and returned, resolved from the enum once
+_S_COMPLETED = DocumentState.COMPLETED.value
+
+@dataclass(**_DATACLASS_OPTIONS)
 class DocumentProcessingInput:
     """Input data for document processing workflow"""
     document_id: str
@@ -20,12 +58,18 @@ class DocumentProcessingInput:
     file_size: int
     created_by: str
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class WorkflowState:
     """Workflow state for tracking progress"""
     document_id: str
     tenant_id: str
     current_state: DocumentState
+    # Fanned-out steps currently running; current_state stays at the last
+    # settled state while these are in flight
+    active_states: Set[DocumentState] = field(default_factory=set)
+    extracted_text_blob_path: Optional[str] = None
+    extracted_text_length: Optional[int] = None
+    chunks_blob_path: Optional[str] = None
     error_details: Optional[Dict[str, Any]] = None
     retry_count: int = 0
     max_retries: int = 3
@@ -34,6 +78,9 @@ class WorkflowState:
 class DocumentProcessingWorkflow:
     """Temporal workflow for orchestrating document processing pipeline"""
     
+    _retry_fast = _RETRY_FAST
+    _retry_long = _RETRY_LONG
+    
     @workflow.run
     async def run(self, input_data: DocumentProcessingInput) -> Dict[str, Any]:
         """
@@ -45,6 +92,12 @@ class DocumentProcessingWorkflow:
         Returns:
             Processing result with final status and metadata
         """
+        # Jitter the retry intervals per run, so documents failing together do
+        # not retry in lockstep; workflow.random() replays deterministically
+        rand = workflow.random().random
+        self._retry_fast = WorkflowConfig.jitter_retry_policy(_RETRY_FAST, rand)
+        self._retry_long = WorkflowConfig.jitter_retry_policy(_RETRY_LONG, rand)
+        
         # Initialize workflow state
         state = WorkflowState(
             document_id=input_data.document_id,
@@ -53,47 +106,69 @@ class DocumentProcessingWorkflow:
         )
         
         try:
-            # Step 1: Text Extraction
-            await self._extract_text(state, input_data)
-            
-            # Step 2: Chunking
-            await self._chunk_document(state)
-            
-            # Step 3: Classification
-            await self._classify_document(state)
-            
-            # Step 4: Vectorization
-            await self._vectorize_document(state)
+            if input_data.file_size <= WorkflowConfig.FUSED_EXTRACT_CHUNK_MAX_BYTES:
+                # Steps 1+2: small documents are extracted and chunked in one activity
+                await self._extract_and_chunk(state, input_data)
+            else:
+                # Step 1: Text Extraction
+                await self._extract_text(state, input_data)
+                
+                # Step 2: Chunking
+                await self._chunk_document(state)
             
-            # Step 5: Summarization
-            await self._summarize_document(state)
+            # Steps 3-5: classification, vectorization and summarization only read
+            # the stored chunks/text, so fan them out concurrently
+            await self._run_branches(
+                state,
+                ("classification", self._classify_document(state)),
+                ("vectorization", self._vectorize_document(state)),
+                ("summarization", self._summarize_document(state))
+            )
             
             # Mark as completed
             await self._update_document_status(
-                state.document_id, 
-                DocumentState.COMPLETED.value
+                state, 
+                _S_COMPLETED
             )
             
             return {
                 "status": "completed",
                 "document_id": state.document_id,
-                "final_state": DocumentState.COMPLETED.value
+                "final_state": _S_COMPLETED
             }
             
         except Exception as e:
-            # Handle workflow failure
-            await self._handle_workflow_failure(state, str(e))
+            # A failed step has already marked the document with its own error
+            # details; only failures outside a step are marked here
+            if state.current_state != DocumentState.FAILED:
+                await self._handle_workflow_failure(state, str(e))
             raise
     
+    async def _run_branches(self, state: WorkflowState, *branches):
+        """Run fanned-out (step, coroutine) branches concurrently, cancelling the rest once one fails
+        
+        The branches do not record their own failure. The document is marked
+        failed for the first failed step only after the cancelled branches have
+        settled, so a sibling's completed status cannot land after FAILED.
+        """
+        steps = [step for step, _ in branches]
+        tasks = [asyncio.ensure_future(branch) for _, branch in branches]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        # Inspect in branch order rather than the done set's order, to stay deterministic
+        failed = next((i for i, task in enumerate(tasks) if task.done() and not task.cancelled() and task.exception()), None)
+        if failed is None:
+            return
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        error = tasks[failed].exception()
+        await self._handle_step_failure(state, steps[failed], str(error))
+        raise error
+    
     async def _extract_text(self, state: WorkflowState, input_data: DocumentProcessingInput):
         """Extract text from document"""
         try:
-            # Update state to extracting
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.TEXT_EXTRACTING.value,
-                step="text_extraction"
-            )
+            # The activity records the in-progress status as it starts
             state.current_state = DocumentState.TEXT_EXTRACTING
             
             # Call text extraction activity
@@ -105,198 +180,163 @@ class DocumentProcessingWorkflow:
                     "file_path": input_data.file_path,
                     "mime_type": input_data.mime_type
                 },
-                start_to_close_timeout=timedelta(minutes=10),
-                retry_policy=RetryPolicy(
-                    initial_interval=timedelta(seconds=5),
-                    maximum_interval=timedelta(minutes=2),
-                    maximum_attempts=3
-                )
+                start_to_close_timeout=_TIMEOUT_EXTRACT,
+                retry_policy=self._retry_long
             )
             
-            # Update state to extracted
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.TEXT_EXTRACTED.value
-            )
-            state.current_state = DocumentState.TEXT_EXTRACTED
+            # The activity recorded the extracted status with its metadata
+            state.current_state = DocumentState(extraction_result["state"])
+            state.extracted_text_blob_path = extraction_result["blob_path"]
+            state.extracted_text_length = extraction_result["extracted_text_length"]
             
-            logger.info(f"Text extraction completed for document {state.document_id}")
+            logger.info("Text extraction completed for document %s", state.document_id)
             
         except Exception as e:
             await self._handle_step_failure(state, "text_extraction", str(e))
             raise
     
-    async def _chunk_document(self, state: WorkflowState):
-        """Chunk the extracted text"""
+    async def _extract_and_chunk(self, state: WorkflowState, input_data: DocumentProcessingInput):
+        """Extract and chunk a small document in a single activity"""
         try:
-            # Update state to chunking
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.CHUNKING.value,
-                step="chunking"
-            )
-            state.current_state = DocumentState.CHUNKING
+            # The activity records the in-progress status as it starts
+            state.current_state = DocumentState.TEXT_EXTRACTING
             
-            # Call chunking activity
-            chunking_result = await workflow.execute_activity(
-                "chunk_document_activity",
+            # Call fused extraction + chunking activity
+            result = await workflow.execute_activity(
+                "extract_and_chunk_activity",
                 {
                     "document_id": state.document_id,
-                    "tenant_id": state.tenant_id
+                    "tenant_id": state.tenant_id,
+                    "file_path": input_data.file_path,
+                    "mime_type": input_data.mime_type
                 },
-                start_to_close_timeout=timedelta(minutes=5),
-                retry_policy=RetryPolicy(
-                    initial_interval=timedelta(seconds=5),
-                    maximum_interval=timedelta(minutes=1),
-                    maximum_attempts=3
-                )
+                start_to_close_timeout=_TIMEOUT_EXTRACT,
+                retry_policy=self._retry_long
             )
             
-            # Update state to chunked
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.CHUNKED.value
-            )
-            state.current_state = DocumentState.CHUNKED
+            # The activity recorded both steps' metadata and the chunked status
+            state.current_state = DocumentState(result["state"])
+            state.extracted_text_blob_path = result["blob_path"]
+            state.extracted_text_length = result["extracted_text_length"]
+            state.chunks_blob_path = result["chunks_blob_path"]
             
-            logger.info(f"Chunking completed for document {state.document_id}")
+            logger.info("Extraction and chunking completed for document %s", state.document_id)
             
         except Exception as e:
-            await self._handle_step_failure(state, "chunking", str(e))
+            await self._handle_step_failure(state, "text_extraction", str(e))
             raise
     
-    async def _classify_document(self, state: WorkflowState):
-        """Classify document based on chunks"""
+    async def _chunk_document(self, state: WorkflowState):
+        """Chunk the extracted text"""
         try:
-            # Update state to classifying
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.CLASSIFYING.value,
-                step="classification"
-            )
-            state.current_state = DocumentState.CLASSIFYING
+            # The activity records the in-progress status as it starts
+            state.current_state = DocumentState.CHUNKING
             
-            # Call classification activity
-            classification_result = await workflow.execute_activity(
-                "classify_document_activity",
+            # Call chunking activity
+            chunking_result = await workflow.execute_activity(
+                "chunk_document_activity",
                 {
                     "document_id": state.document_id,
                     "tenant_id": state.tenant_id
                 },
-                start_to_close_timeout=timedelta(minutes=5),
-                retry_policy=RetryPolicy(
-                    initial_interval=timedelta(seconds=5),
-                    maximum_interval=timedelta(minutes=1),
-                    maximum_attempts=3
-                )
+                start_to_close_timeout=_TIMEOUT_CHUNK,
+                retry_policy=self._retry_fast
             )
             
-            # Update state to classified
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.CLASSIFIED.value
-            )
-            state.current_state = DocumentState.CLASSIFIED
+            # The activity recorded the chunked status with its metadata
+            state.current_state = DocumentState(chunking_result["state"])
+            state.chunks_blob_path = chunking_result["chunks_blob_path"]
             
-            logger.info(f"Classification completed for document {state.document_id}")
+            logger.info("Chunking completed for document %s", state.document_id)
             
         except Exception as e:
-            await self._handle_step_failure(state, "classification", str(e))
+            await self._handle_step_failure(state, "chunking", str(e))
             raise
     
+    async def _classify_document(self, state: WorkflowState):
+        """Classify document based on chunks"""
+        # The activity records the in-progress status as it starts
+        state.active_states.add(DocumentState.CLASSIFYING)
+        
+        # Call classification activity
+        classification_result = await workflow.execute_activity(
+            "classify_document_activity",
+            {
+                "document_id": state.document_id,
+                "tenant_id": state.tenant_id,
+                "chunks_blob_path": state.chunks_blob_path
+            },
+            start_to_close_timeout=_TIMEOUT_CLASSIFY,
+            retry_policy=self._retry_fast,
+            cancellation_type=_CANCEL_BRANCH
+        )
+        
+        # The activity recorded the classified status with its metadata
+        state.active_states.discard(DocumentState.CLASSIFYING)
+        
+        logger.info("Classification completed for document %s", state.document_id)
+    
     async def _vectorize_document(self, state: WorkflowState):
         """Vectorize document chunks"""
-        try:
-            # Update state to vectorizing
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.VECTORIZING.value,
-                step="vectorization"
-            )
-            state.current_state = DocumentState.VECTORIZING
-            
-            # Call vectorization activity
-            vectorization_result = await workflow.execute_activity(
-                "vectorize_document_activity",
-                {
-                    "document_id": state.document_id,
-                    "tenant_id": state.tenant_id
-                },
-                start_to_close_timeout=timedelta(minutes=10),
-                retry_policy=RetryPolicy(
-                    initial_interval=timedelta(seconds=5),
-                    maximum_interval=timedelta(minutes=2),
-                    maximum_attempts=3
-                )
-            )
-            
-            # Update state to vectorized
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.VECTORIZED.value
-            )
-            state.current_state = DocumentState.VECTORIZED
-            
-            logger.info(f"Vectorization completed for document {state.document_id}")
-            
-        except Exception as e:
-            await self._handle_step_failure(state, "vectorization", str(e))
-            raise
+        # The activity records the in-progress status as it starts
+        state.active_states.add(DocumentState.VECTORIZING)
+        
+        # Call vectorization activity
+        vectorization_result = await workflow.execute_activity(
+            "vectorize_document_activity",
+            {
+                "document_id": state.document_id,
+                "tenant_id": state.tenant_id,
+                "chunks_blob_path": state.chunks_blob_path
+            },
+            start_to_close_timeout=_TIMEOUT_VECTORIZE,
+            retry_policy=self._retry_long,
+            cancellation_type=_CANCEL_BRANCH
+        )
+        
+        # The activity recorded the vectorized status with its metadata
+        state.active_states.discard(DocumentState.VECTORIZING)
+        
+        logger.info("Vectorization completed for document %s", state.document_id)
     
     async def _summarize_document(self, state: WorkflowState):
         """Summarize document"""
-        try:
-            # Update state to summarizing
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.SUMMARIZING.value,
-                step="summarization"
-            )
-            state.current_state = DocumentState.SUMMARIZING
-            
-            # Call summarization activity
-            summarization_result = await workflow.execute_activity(
-                "summarize_document_activity",
-                {
-                    "document_id": state.document_id,
-                    "tenant_id": state.tenant_id
-                },
-                start_to_close_timeout=timedelta(minutes=5),
-                retry_policy=RetryPolicy(
-                    initial_interval=timedelta(seconds=5),
-                    maximum_interval=timedelta(minutes=1),
-                    maximum_attempts=3
-                )
-            )
-            
-            # Update state to summarized
-            await self._update_document_status(
-                state.document_id, 
-                DocumentState.SUMMARIZED.value
-            )
-            state.current_state = DocumentState.SUMMARIZED
-            
-            logger.info(f"Summarization completed for document {state.document_id}")
-            
-        except Exception as e:
-            await self._handle_step_failure(state, "summarization", str(e))
-            raise
+        # The activity records the in-progress status as it starts
+        state.active_states.add(DocumentState.SUMMARIZING)
+        
+        # Call summarization activity
+        summarization_result = await workflow.execute_activity(
+            "summarize_document_activity",
+            {
+                "document_id": state.document_id,
+                "tenant_id": state.tenant_id,
+                "extracted_text_blob_path": state.extracted_text_blob_path,
+                "extracted_text_length": state.extracted_text_length
+            },
+            start_to_close_timeout=_TIMEOUT_SUMMARIZE,
+            retry_policy=self._retry_fast,
+            cancellation_type=_CANCEL_BRANCH
+        )
+        
+        # The activity recorded the summarized status with its metadata
+        state.active_states.discard(DocumentState.SUMMARIZING)
+        
+        logger.info("Summarization completed for document %s", state.document_id)
     
-    async def _update_document_status(self, document_id: str, status: str, step: str = None):
+    async def _update_document_status(self, state: WorkflowState, status: str, step: str = None):
         """Update document status in database"""
-        await workflow.execute_activity(
+        # Single idempotent DB write: run as a local activity to skip the task
+        # queue round-trip
+        await workflow.execute_local_activity(
             "update_document_status_activity",
             {
-                "document_id": document_id,
+                "document_id": state.document_id,
+                "tenant_id": state.tenant_id,
                 "status": status,
                 "step": step
             },
-            start_to_close_timeout=timedelta(seconds=30),
-            retry_policy=RetryPolicy(
-                initial_interval=timedelta(seconds=1),
-                maximum_interval=timedelta(seconds=10),
-                maximum_attempts=3
-            )
+            start_to_close_timeout=_TIMEOUT_STATUS,
+            retry_policy=self._retry_fast
         )
     
     async def _handle_step_failure(self, state: WorkflowState, step: str, error_message: str):
@@ -306,26 +346,29 @@ class DocumentProcessingWorkflow:
             "error_type": "processing_error",
             "message": error_message,
             "retryable": True,
-            "workflow_state": state.current_state.value
+            "workflow_state": state.current_state.value,
+            "active_states": sorted(s.value for s in state.active_states)
         }
         
-        # Mark document as failed
-        await workflow.execute_activity(
+        # Mark document as failed (idempotent write, run locally)
+        await workflow.execute_local_activity(
             "mark_document_failed_activity",
             {
                 "document_id": state.document_id,
+                "tenant_id": state.tenant_id,
                 "step": step,
                 "error_type": "processing_error",
                 "error_message": error_message,
                 "retryable": True
             },
-            start_to_close_timeout=timedelta(seconds=30)
+            start_to_close_timeout=_TIMEOUT_STATUS,
+            retry_policy=self._retry_fast
         )
         
         # Update workflow state
         state.current_state = DocumentState.FAILED
         
-        logger.error(f"Step {step} failed for document {state.document_id}: {error_message}")
+        logger.error("Step %s failed for document %s: %s", step, state.document_id, error_message)
     
     async def _handle_workflow_failure(self, state: WorkflowState, error_message: str):
         """Handle workflow-level failure"""
@@ -337,17 +380,19 @@ class DocumentProcessingWorkflow:
             "workflow_state": state.current_state.value
         }
         
-        # Mark document as failed
-        await workflow.execute_activity(
+        # Mark document as failed (idempotent write, run locally)
+        await workflow.execute_local_activity(
             "mark_document_failed_activity",
             {
                 "document_id": state.document_id,
+                "tenant_id": state.tenant_id,
                 "step": "workflow",
                 "error_type": "workflow_error",
                 "error_message": error_message,
                 "retryable": False
             },
-            start_to_close_timeout=timedelta(seconds=30)
+            start_to_close_timeout=_TIMEOUT_STATUS,
+            retry_policy=self._retry_fast
         )
         
-        logger.error(f"Workflow failed for document {state.document_id}: {error_message}") 
\ No newline at end of file
+        logger.error("Workflow failed for document %s: %s", state.document_id, error_message) 
\ No newline at end of file